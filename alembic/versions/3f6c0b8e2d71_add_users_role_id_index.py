@@ -0,0 +1,26 @@
+"""Add users (role_id, id) index for the reverse permission index
+
+Revision ID: 3f6c0b8e2d71
+Revises: e7f19a2d5b34
+ Create Date: 2026-10-18 20:12:55.904117
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c0b8e2d71'
+down_revision: str | Sequence[str] | None = 'e7f19a2d5b34'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Пользователи ролей keyset-страницами: role_id IN (...) AND id > :after
+    op.create_index('ix_users_role_id', 'users', ['role_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_role_id', table_name='users')
@@ -0,0 +1,41 @@
+"""Add authorization audit log
+
+Revision ID: 5e8b7d41c2a9
+Revises: a93f0d2c6b15
+ Create Date: 2026-10-18 12:31:55.804126
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b7d41c2a9'
+down_revision: str | Sequence[str] | None = 'a93f0d2c6b15'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('authz_audit_log',
+                    sa.Column('id', sa.BigInteger(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+                    sa.Column('user_id', sa.Integer(), nullable=True),
+                    sa.Column('role_id', sa.Integer(), nullable=True),
+                    sa.Column('resource_key', sa.String(length=50), nullable=False),
+                    sa.Column('action', sa.String(length=20), nullable=False),
+                    sa.Column('owner_id', sa.Integer(), nullable=True),
+                    sa.Column('allowed', sa.Boolean(), nullable=False),
+                    sa.Column('source', sa.String(length=20), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index(op.f('ix_authz_audit_log_created_at'), 'authz_audit_log', ['created_at'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_authz_audit_log_created_at'), table_name='authz_audit_log')
+    op.drop_table('authz_audit_log')
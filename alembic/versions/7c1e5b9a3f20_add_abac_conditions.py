@@ -0,0 +1,32 @@
+"""Add ABAC conditions to rules and user attributes
+
+Revision ID: 7c1e5b9a3f20
+Revises: d4a2ca31ff4a
+ Create Date: 2026-10-18 10:12:41.203511
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5b9a3f20'
+down_revision: str | Sequence[str] | None = 'd4a2ca31ff4a'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('access_roles_rules', sa.Column('conditions', sa.JSON(), nullable=True))
+    op.add_column('access_roles_rules',
+                  sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('users', sa.Column('attributes', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'attributes')
+    op.drop_column('access_roles_rules', 'version')
+    op.drop_column('access_roles_rules', 'conditions')
@@ -0,0 +1,157 @@
+"""Add trigger-maintained effective permissions
+
+Revision ID: 9b3e4f7a1c58
+Revises: c61d2f8e4a07
+ Create Date: 2026-10-18 16:02:41.338210
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e4f7a1c58'
+down_revision: str | Sequence[str] | None = 'c61d2f8e4a07'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Биты совпадают с app/models/rbac.py (CREATE ... HAS_CONDITIONS)
+MASK_FUNCTION = """
+CREATE FUNCTION effective_permission_mask(r access_roles_rules) RETURNS integer
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT (CASE WHEN r.create_permission THEN 1 ELSE 0 END)
+         | (CASE WHEN r.read_permission THEN 2 ELSE 0 END)
+         | (CASE WHEN r.read_all_permission THEN 4 ELSE 0 END)
+         | (CASE WHEN r.update_permission THEN 8 ELSE 0 END)
+         | (CASE WHEN r.update_all_permission THEN 16 ELSE 0 END)
+         | (CASE WHEN r.delete_permission THEN 32 ELSE 0 END)
+         | (CASE WHEN r.delete_all_permission THEN 64 ELSE 0 END)
+         | (CASE WHEN json_typeof(r.conditions) = 'array'
+                      AND json_array_length(r.conditions) > 0 THEN 128 ELSE 0 END)
+$$
+"""
+
+RULE_TRIGGER_FUNCTION = """
+CREATE FUNCTION effective_permissions_sync_rule() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND (OLD.role_id <> NEW.role_id OR OLD.element_id <> NEW.element_id) THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+    END IF;
+
+    INSERT INTO effective_permissions (role_id, element_key, rule_id, mask,
+                                       conditions, version, role_name, element_name)
+    SELECT NEW.role_id, e.key, NEW.id, effective_permission_mask(NEW),
+           NEW.conditions, NEW.version, r.name, e.name
+    FROM roles r, business_elements e
+    WHERE r.id = NEW.role_id AND e.id = NEW.element_id
+    ON CONFLICT (role_id, element_key) DO UPDATE
+        SET rule_id = EXCLUDED.rule_id,
+            mask = EXCLUDED.mask,
+            conditions = EXCLUDED.conditions,
+            version = EXCLUDED.version,
+            role_name = EXCLUDED.role_name,
+            element_name = EXCLUDED.element_name;
+    RETURN NEW;
+END
+$$
+"""
+
+ROLE_TRIGGER_FUNCTION = """
+CREATE FUNCTION effective_permissions_sync_role() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE effective_permissions SET role_name = NEW.name WHERE role_id = NEW.id;
+    RETURN NEW;
+END
+$$
+"""
+
+ELEMENT_TRIGGER_FUNCTION = """
+CREATE FUNCTION effective_permissions_sync_element() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE effective_permissions ep
+    SET element_key = NEW.key, element_name = NEW.name
+    FROM access_roles_rules ar
+    WHERE ar.element_id = NEW.id AND ep.rule_id = ar.id;
+    RETURN NEW;
+END
+$$
+"""
+
+BACKFILL = """
+INSERT INTO effective_permissions (role_id, element_key, rule_id, mask,
+                                   conditions, version, role_name, element_name)
+SELECT ar.role_id, e.key, ar.id, effective_permission_mask(ar),
+       ar.conditions, ar.version, r.name, e.name
+FROM access_roles_rules ar
+JOIN roles r ON r.id = ar.role_id
+JOIN business_elements e ON e.id = ar.element_id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('effective_permissions',
+                    sa.Column('role_id', sa.Integer(), nullable=False),
+                    sa.Column('element_key', sa.String(length=50), nullable=False),
+                    sa.Column('rule_id', sa.Integer(), nullable=False),
+                    sa.Column('mask', sa.Integer(), nullable=False),
+                    sa.Column('conditions', sa.JSON(), nullable=True),
+                    sa.Column('version', sa.Integer(), nullable=False),
+                    sa.Column('role_name', sa.String(length=50), nullable=False),
+                    sa.Column('element_name', sa.String(length=100), nullable=False),
+                    sa.UniqueConstraint('rule_id')
+                    )
+    # Один составной индекс покрывает проверку маски: index-only scan
+    op.execute(
+        'ALTER TABLE effective_permissions ADD CONSTRAINT pk_effective_permissions '
+        'PRIMARY KEY (role_id, element_key) INCLUDE (mask, rule_id, version)'
+    )
+    op.create_index(op.f('ix_effective_permissions_version'), 'effective_permissions',
+                    ['version'], unique=False)
+
+    op.execute(MASK_FUNCTION)
+    op.execute(RULE_TRIGGER_FUNCTION)
+    op.execute(ROLE_TRIGGER_FUNCTION)
+    op.execute(ELEMENT_TRIGGER_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER trg_effective_permissions_rule '
+        'AFTER INSERT OR UPDATE OR DELETE ON access_roles_rules '
+        'FOR EACH ROW EXECUTE FUNCTION effective_permissions_sync_rule()'
+    )
+    op.execute(
+        'CREATE TRIGGER trg_effective_permissions_role '
+        'AFTER UPDATE OF name ON roles '
+        'FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name) '
+        'EXECUTE FUNCTION effective_permissions_sync_role()'
+    )
+    op.execute(
+        'CREATE TRIGGER trg_effective_permissions_element '
+        'AFTER UPDATE OF key, name ON business_elements '
+        'FOR EACH ROW WHEN (OLD.key IS DISTINCT FROM NEW.key '
+        'OR OLD.name IS DISTINCT FROM NEW.name) '
+        'EXECUTE FUNCTION effective_permissions_sync_element()'
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER trg_effective_permissions_element ON business_elements')
+    op.execute('DROP TRIGGER trg_effective_permissions_role ON roles')
+    op.execute('DROP TRIGGER trg_effective_permissions_rule ON access_roles_rules')
+    op.execute('DROP FUNCTION effective_permissions_sync_element()')
+    op.execute('DROP FUNCTION effective_permissions_sync_role()')
+    op.execute('DROP FUNCTION effective_permissions_sync_rule()')
+    op.execute('DROP FUNCTION effective_permission_mask(access_roles_rules)')
+    op.drop_index(op.f('ix_effective_permissions_version'), table_name='effective_permissions')
+    op.drop_table('effective_permissions')
@@ -0,0 +1,36 @@
+"""Add policy version counter
+
+Revision ID: a93f0d2c6b15
+Revises: 7c1e5b9a3f20
+ Create Date: 2026-10-18 11:04:09.517302
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93f0d2c6b15'
+down_revision: str | Sequence[str] | None = '7c1e5b9a3f20'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    policy_version = op.create_table('policy_version',
+                                     sa.Column('id', sa.Integer(), nullable=False),
+                                     sa.Column('version', sa.BigInteger(), nullable=False),
+                                     sa.PrimaryKeyConstraint('id')
+                                     )
+    # Существующие правила имеют version=1
+    op.bulk_insert(policy_version, [{'id': 1, 'version': 1}])
+    op.create_index(op.f('ix_access_roles_rules_version'), 'access_roles_rules', ['version'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_access_roles_rules_version'), table_name='access_roles_rules')
+    op.drop_table('policy_version')
@@ -0,0 +1,28 @@
+"""Add users.version for profile ETags
+
+Revision ID: b2d94e6f1a83
+Revises: 3f6c0b8e2d71
+ Create Date: 2026-10-18 21:05:13.640281
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d94e6f1a83'
+down_revision: str | Sequence[str] | None = '3f6c0b8e2d71'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1',
+                                     nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'version')
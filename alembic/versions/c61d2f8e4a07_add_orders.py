@@ -0,0 +1,35 @@
+"""Add orders
+
+Revision ID: c61d2f8e4a07
+Revises: 5e8b7d41c2a9
+ Create Date: 2026-10-18 13:47:20.118745
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c61d2f8e4a07'
+down_revision: str | Sequence[str] | None = '5e8b7d41c2a9'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('orders',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('title', sa.String(length=255), nullable=False),
+                    sa.Column('owner_id', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_orders_owner_id', 'orders', ['owner_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_owner_id', table_name='orders')
+    op.drop_table('orders')
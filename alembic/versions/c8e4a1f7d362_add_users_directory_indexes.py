@@ -0,0 +1,46 @@
+"""Add users indexes for the admin user directory
+
+Revision ID: c8e4a1f7d362
+Revises: b2d94e6f1a83
+ Create Date: 2026-10-18 23:04:37.215806
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e4a1f7d362'
+down_revision: str | Sequence[str] | None = 'b2d94e6f1a83'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # users - ~1M строк: CONCURRENTLY не блокирует запись, но требует autocommit
+    with op.get_context().autocommit_block():
+        # Все пользователи тенанта: tenant_id = :tid AND id > :after ORDER BY id
+        op.create_index('ix_users_tenant_id_id', 'users', ['tenant_id', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        # Активные пользователи роли (справочник и обратный индекс прав)
+        op.create_index('ix_users_role_id_active', 'users', ['role_id', 'id'],
+                        unique=False, postgresql_where=sa.text('is_active'),
+                        postgresql_concurrently=True)
+        # Префикс email: email ~>=~ :prefix AND email ~<~ :upper
+        op.create_index('ix_users_tenant_id_email_pattern', 'users',
+                        ['tenant_id', 'email'], unique=False,
+                        postgresql_ops={'email': 'varchar_pattern_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_tenant_id_email_pattern', table_name='users',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_users_role_id_active', table_name='users',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_users_tenant_id_id', table_name='users',
+                      postgresql_concurrently=True)
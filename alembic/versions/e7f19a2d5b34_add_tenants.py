@@ -0,0 +1,164 @@
+"""Add tenants and tenant-leading indexes
+
+Revision ID: e7f19a2d5b34
+Revises: 9b3e4f7a1c58
+ Create Date: 2026-10-18 18:41:07.512904
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f19a2d5b34'
+down_revision: str | Sequence[str] | None = '9b3e4f7a1c58'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Существующие данные переезжают в тенант по умолчанию
+DEFAULT_TENANT_ID = 1
+
+# Таблицы, у которых тенант - собственная колонка с FK
+TENANT_TABLES = ('users', 'roles', 'orders', 'policy_version')
+
+# Тенант строки матрицы - тенант роли правила
+RULE_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_rule() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND (OLD.role_id <> NEW.role_id OR OLD.element_id <> NEW.element_id) THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+    END IF;
+
+    INSERT INTO effective_permissions (role_id, element_key, tenant_id, rule_id, mask,
+                                       conditions, version, role_name, element_name)
+    SELECT NEW.role_id, e.key, r.tenant_id, NEW.id, effective_permission_mask(NEW),
+           NEW.conditions, NEW.version, r.name, e.name
+    FROM roles r, business_elements e
+    WHERE r.id = NEW.role_id AND e.id = NEW.element_id
+    ON CONFLICT (role_id, element_key) DO UPDATE
+        SET tenant_id = EXCLUDED.tenant_id,
+            rule_id = EXCLUDED.rule_id,
+            mask = EXCLUDED.mask,
+            conditions = EXCLUDED.conditions,
+            version = EXCLUDED.version,
+            role_name = EXCLUDED.role_name,
+            element_name = EXCLUDED.element_name;
+    RETURN NEW;
+END
+$$
+"""
+
+PREVIOUS_RULE_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_rule() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND (OLD.role_id <> NEW.role_id OR OLD.element_id <> NEW.element_id) THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+    END IF;
+
+    INSERT INTO effective_permissions (role_id, element_key, rule_id, mask,
+                                       conditions, version, role_name, element_name)
+    SELECT NEW.role_id, e.key, NEW.id, effective_permission_mask(NEW),
+           NEW.conditions, NEW.version, r.name, e.name
+    FROM roles r, business_elements e
+    WHERE r.id = NEW.role_id AND e.id = NEW.element_id
+    ON CONFLICT (role_id, element_key) DO UPDATE
+        SET rule_id = EXCLUDED.rule_id,
+            mask = EXCLUDED.mask,
+            conditions = EXCLUDED.conditions,
+            version = EXCLUDED.version,
+            role_name = EXCLUDED.role_name,
+            element_name = EXCLUDED.element_name;
+    RETURN NEW;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tenants = op.create_table('tenants',
+                              sa.Column('id', sa.Integer(), nullable=False),
+                              sa.Column('slug', sa.String(length=50), nullable=False),
+                              sa.Column('name', sa.String(length=100), nullable=False),
+                              sa.PrimaryKeyConstraint('id')
+                              )
+    op.create_index(op.f('ix_tenants_slug'), 'tenants', ['slug'], unique=True)
+    op.bulk_insert(tenants, [{'id': DEFAULT_TENANT_ID, 'slug': 'default',
+                              'name': 'Default'}])
+    op.execute("SELECT setval('tenants_id_seq', (SELECT max(id) FROM tenants))")
+
+    for table in TENANT_TABLES:
+        op.add_column(table, sa.Column('tenant_id', sa.Integer(), nullable=False,
+                                       server_default=str(DEFAULT_TENANT_ID)))
+        op.alter_column(table, 'tenant_id', server_default=None)
+        op.create_foreign_key(f'fk_{table}_tenant_id', table, 'tenants',
+                              ['tenant_id'], ['id'])
+
+    # Уникальность email и имени роли - в пределах тенанта
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.create_index('ix_users_tenant_id_email', 'users', ['tenant_id', 'email'],
+                    unique=True)
+    op.drop_index(op.f('ix_roles_name'), table_name='roles')
+    op.create_index('ix_roles_tenant_id_name', 'roles', ['tenant_id', 'name'],
+                    unique=True)
+    op.create_index('ix_orders_tenant_id', 'orders', ['tenant_id', 'id'], unique=False)
+    op.create_unique_constraint('uq_policy_version_tenant_id', 'policy_version',
+                                ['tenant_id'])
+    # Строка id=1 вставлялась явным id: следующие тенанты получат id из sequence
+    op.execute("SELECT setval('policy_version_id_seq', "
+               "(SELECT max(id) FROM policy_version))")
+
+    # Матрица: тенант из роли, догрузка кэша по (tenant_id, version)
+    op.add_column('effective_permissions', sa.Column('tenant_id', sa.Integer(),
+                                                     nullable=True))
+    op.execute(
+        'UPDATE effective_permissions ep SET tenant_id = r.tenant_id '
+        'FROM roles r WHERE r.id = ep.role_id'
+    )
+    op.alter_column('effective_permissions', 'tenant_id', nullable=False)
+    op.drop_index(op.f('ix_effective_permissions_version'),
+                  table_name='effective_permissions')
+    op.create_index('ix_effective_permissions_tenant_id_version', 'effective_permissions',
+                    ['tenant_id', 'version'], unique=False)
+    op.execute(RULE_TRIGGER_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_RULE_TRIGGER_FUNCTION)
+    op.drop_index('ix_effective_permissions_tenant_id_version',
+                  table_name='effective_permissions')
+    op.create_index(op.f('ix_effective_permissions_version'), 'effective_permissions',
+                    ['version'], unique=False)
+    op.drop_column('effective_permissions', 'tenant_id')
+
+    # До миграции версия политики была одна - остается строка тенанта по умолчанию
+    op.execute(f'DELETE FROM policy_version WHERE tenant_id <> {DEFAULT_TENANT_ID}')
+    op.drop_constraint('uq_policy_version_tenant_id', 'policy_version', type_='unique')
+    op.drop_index('ix_orders_tenant_id', table_name='orders')
+    op.drop_index('ix_roles_tenant_id_name', table_name='roles')
+    op.create_index(op.f('ix_roles_name'), 'roles', ['name'], unique=True)
+    op.drop_index('ix_users_tenant_id_email', table_name='users')
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+
+    for table in reversed(TENANT_TABLES):
+        op.drop_constraint(f'fk_{table}_tenant_id', table, type_='foreignkey')
+        op.drop_column(table, 'tenant_id')
+
+    op.drop_index(op.f('ix_tenants_slug'), table_name='tenants')
+    op.drop_table('tenants')
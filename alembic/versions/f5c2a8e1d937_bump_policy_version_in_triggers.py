@@ -0,0 +1,199 @@
+"""Bump tenant policy version on rule deletion and role/element renames
+
+Revision ID: f5c2a8e1d937
+Revises: c8e4a1f7d362
+ Create Date: 2026-10-19 09:12:48.604117
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c2a8e1d937'
+down_revision: str | Sequence[str] | None = 'c8e4a1f7d362'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Изменения матрицы мимо admin.update_rule (удаление правила, переименование
+# роли или элемента) тоже поднимают версию политики тенанта, иначе кэши узлов
+# их не увидят. Payload - как у PostgresNotifier, доставка после commit
+BUMP_FUNCTION = """
+CREATE FUNCTION bump_policy_version(p_tenant_id integer) RETURNS bigint
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_version bigint;
+BEGIN
+    UPDATE policy_version SET version = version + 1
+    WHERE tenant_id = p_tenant_id
+    RETURNING version INTO new_version;
+    IF new_version IS NULL THEN
+        INSERT INTO policy_version (tenant_id, version) VALUES (p_tenant_id, 1);
+        new_version := 1;
+    END IF;
+    PERFORM pg_notify('policy_version', p_tenant_id || ':' || new_version);
+    RETURN new_version;
+END
+$$
+"""
+
+# Удаленная строка не видна догрузке по version - версия тенанта растет,
+# а узел перезагружает партицию, у которой разошлось число строк
+RULE_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_rule() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    old_tenant_id integer;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id
+        RETURNING tenant_id INTO old_tenant_id;
+        IF old_tenant_id IS NOT NULL THEN
+            PERFORM bump_policy_version(old_tenant_id);
+        END IF;
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND (OLD.role_id <> NEW.role_id OR OLD.element_id <> NEW.element_id) THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id
+        RETURNING tenant_id INTO old_tenant_id;
+        IF old_tenant_id IS NOT NULL THEN
+            PERFORM bump_policy_version(old_tenant_id);
+        END IF;
+    END IF;
+
+    INSERT INTO effective_permissions (role_id, element_key, tenant_id, rule_id, mask,
+                                       conditions, version, role_name, element_name)
+    SELECT NEW.role_id, e.key, r.tenant_id, NEW.id, effective_permission_mask(NEW),
+           NEW.conditions, NEW.version, r.name, e.name
+    FROM roles r, business_elements e
+    WHERE r.id = NEW.role_id AND e.id = NEW.element_id
+    ON CONFLICT (role_id, element_key) DO UPDATE
+        SET tenant_id = EXCLUDED.tenant_id,
+            rule_id = EXCLUDED.rule_id,
+            mask = EXCLUDED.mask,
+            conditions = EXCLUDED.conditions,
+            version = EXCLUDED.version,
+            role_name = EXCLUDED.role_name,
+            element_name = EXCLUDED.element_name;
+    RETURN NEW;
+END
+$$
+"""
+
+# Строки роли получают новую версию тенанта: догрузка увидит новое имя
+ROLE_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_role() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_version bigint;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM effective_permissions WHERE role_id = NEW.id) THEN
+        RETURN NEW;
+    END IF;
+    new_version := bump_policy_version(NEW.tenant_id);
+    UPDATE effective_permissions SET role_name = NEW.name, version = new_version
+    WHERE role_id = NEW.id;
+    RETURN NEW;
+END
+$$
+"""
+
+# Элементы общие: версия растет у каждого тенанта, у которого есть правила
+# на элемент. Смена ключа меняет ключ строки - узел перезагрузит партицию
+ELEMENT_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_element() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    affected_tenant_id integer;
+    new_version bigint;
+BEGIN
+    FOR affected_tenant_id IN
+        SELECT DISTINCT ep.tenant_id
+        FROM effective_permissions ep
+        JOIN access_roles_rules ar ON ep.rule_id = ar.id
+        WHERE ar.element_id = NEW.id
+    LOOP
+        new_version := bump_policy_version(affected_tenant_id);
+        UPDATE effective_permissions ep
+        SET element_key = NEW.key, element_name = NEW.name, version = new_version
+        FROM access_roles_rules ar
+        WHERE ar.element_id = NEW.id AND ep.rule_id = ar.id
+          AND ep.tenant_id = affected_tenant_id;
+    END LOOP;
+    RETURN NEW;
+END
+$$
+"""
+
+PREVIOUS_RULE_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_rule() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF TG_OP = 'UPDATE'
+       AND (OLD.role_id <> NEW.role_id OR OLD.element_id <> NEW.element_id) THEN
+        DELETE FROM effective_permissions WHERE rule_id = OLD.id;
+    END IF;
+
+    INSERT INTO effective_permissions (role_id, element_key, tenant_id, rule_id, mask,
+                                       conditions, version, role_name, element_name)
+    SELECT NEW.role_id, e.key, r.tenant_id, NEW.id, effective_permission_mask(NEW),
+           NEW.conditions, NEW.version, r.name, e.name
+    FROM roles r, business_elements e
+    WHERE r.id = NEW.role_id AND e.id = NEW.element_id
+    ON CONFLICT (role_id, element_key) DO UPDATE
+        SET tenant_id = EXCLUDED.tenant_id,
+            rule_id = EXCLUDED.rule_id,
+            mask = EXCLUDED.mask,
+            conditions = EXCLUDED.conditions,
+            version = EXCLUDED.version,
+            role_name = EXCLUDED.role_name,
+            element_name = EXCLUDED.element_name;
+    RETURN NEW;
+END
+$$
+"""
+
+PREVIOUS_ROLE_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_role() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE effective_permissions SET role_name = NEW.name WHERE role_id = NEW.id;
+    RETURN NEW;
+END
+$$
+"""
+
+PREVIOUS_ELEMENT_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION effective_permissions_sync_element() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE effective_permissions ep
+    SET element_key = NEW.key, element_name = NEW.name
+    FROM access_roles_rules ar
+    WHERE ar.element_id = NEW.id AND ep.rule_id = ar.id;
+    RETURN NEW;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(BUMP_FUNCTION)
+    op.execute(RULE_TRIGGER_FUNCTION)
+    op.execute(ROLE_TRIGGER_FUNCTION)
+    op.execute(ELEMENT_TRIGGER_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_ELEMENT_TRIGGER_FUNCTION)
+    op.execute(PREVIOUS_ROLE_TRIGGER_FUNCTION)
+    op.execute(PREVIOUS_RULE_TRIGGER_FUNCTION)
+    op.execute('DROP FUNCTION bump_policy_version(integer)')
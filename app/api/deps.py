@@ -1,10 +1,15 @@
 from fastapi import Depends, HTTPException, Request, status
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.models.rbac import AccessRolesRules, BusinessElement
 from app.models.users import User
+from app.services.audit_ops import audit_buffer
+from app.services.order_ops import OrderRepository, SqlOrderRepository
+from app.services.permission_ops import (
+    ACTION_BITS,
+    PermissionService,
+    mask_allows_any,
+)
 
 
 class RequirePermission:
@@ -17,9 +22,7 @@ class RequirePermission:
         self.key = key
         self.action = action
 
-    async def __call__(
-        self, request: Request, db: AsyncSession = Depends(get_db)
-    ) -> bool:
+    async def __call__(self, request: Request) -> bool:
         # Получение пользователя из request (положил Middleware)
         user: User = request.state.user
 
@@ -29,19 +32,26 @@ class RequirePermission:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated"
             )
 
-        # Поиск правила в БД
-        stmt = (
-            select(AccessRolesRules)
-            .join(BusinessElement)
-            .where(
-                AccessRolesRules.role_id == user.role_id,
-                BusinessElement.key == self.key,
+        if self.action not in ACTION_BITS:
+            # Если передан неизвестный экшен
+            raise HTTPException(
+                status_code=500, detail=f"Unknown action '{self.action}'"
             )
+
+        # Снимок/кэш матрицы, при их отсутствии - БД
+        mask = await PermissionService.get_mask(user.tenant_id, user.role_id, self.key)
+
+        allowed = bool(mask) and mask_allows_any(mask, self.action)
+        audit_buffer.record(
+            user.id,
+            user.role_id,
+            self.key,
+            self.action,
+            allowed,
+            source="dependency",
         )
-        result = await db.execute(stmt)
-        rule = result.scalar_one_or_none()
 
-        if not rule:
+        if not mask:
             # Если правил нет вообще - запрещено по умолчанию
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -49,27 +59,15 @@ class RequirePermission:
             )
 
         # Проверка флагов, впустить пользователя, если у него есть ЛИБО локальные, ЛИБО глобальные права.
-        is_allowed = False
-
-        match self.action:
-            case "create":
-                is_allowed = rule.create_permission
-            case "read":
-                is_allowed = rule.read_permission or rule.read_all_permission
-            case "update":
-                is_allowed = rule.update_permission or rule.update_all_permission
-            case "delete":
-                is_allowed = rule.delete_permission or rule.delete_all_permission
-            case _:
-                # Если передан неизвестный экшен
-                raise HTTPException(
-                    status_code=500, detail=f"Unknown action '{self.action}'"
-                )
-
-        if not is_allowed:
+        if not allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"You do not have permission to {self.action} {self.key}",
             )
 
         return True
+
+
+def get_order_repository(db: AsyncSession = Depends(get_db)) -> OrderRepository:
+    """Репозиторий заказов. В тестах подменяется через dependency_overrides."""
+    return SqlOrderRepository(db)
@@ -1,11 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+import sys
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from app.core.metrics import metrics
+from app.core.responses import (
+    FastJSONResponse,
+    etag_headers,
+    etag_matches,
+    not_modified,
+    rule_list_json,
+)
+from app.db.replicas import get_read_db, pin_primary
 from app.db.session import get_db
-from app.models.rbac import AccessRolesRules, BusinessElement, Role
-from app.schemas.rbac import RuleRead, RuleUpdate
+from app.models.rbac import AccessRolesRules, EffectivePermission, Role
+from app.models.users import User
+from app.schemas.profile import ProfileInfo
+from app.schemas.rbac import (
+    AuthorizedUser,
+    AuthorizedUserPage,
+    RuleRead,
+    RuleUpdate,
+)
+from app.schemas.user import UserDirectoryEntry, UserDirectoryPage
+from app.services.abac_ops import ConditionError, compile_conditions
+from app.services.policy_cache import policy_cache
+from app.services.policy_snapshot import rebuild_snapshot
+from app.services.policy_version_ops import PolicyVersionService, get_notifier
+from app.services.profiler_ops import profile_store, to_speedscope
+from app.services.reference_cache import reference_cache
+from app.services.reverse_index_ops import reverse_index
 
 router = APIRouter()
 
@@ -19,44 +47,236 @@ def check_admin_privileges(request: Request) -> None:
         raise HTTPException(status_code=403, detail="Admins only")
 
 
-@router.get("/rules", response_model=list[RuleRead])
+def rules_etag(tenant_id: int, version: int) -> str:
+    """Строгий ETag списка правил: тенант и версия его политики."""
+    return f'"rules-{tenant_id}-{version}"'
+
+
+@router.get("/metrics")
+async def get_metrics(
+    _: None = Depends(check_admin_privileges),
+) -> dict[str, float]:
+    """
+    Счетчики процесса (деградация БД, circuit breaker и т.д.).
+    """
+    return metrics.snapshot()
+
+
+@router.get("/profiles")
+async def list_profiles(
+    _: None = Depends(check_admin_privileges),
+) -> list[ProfileInfo]:
+    """
+    Сохраненные профили запросов (X-Profile: 1 или PROFILER_SAMPLE_RATE),
+    новые первыми.
+    """
+    entries = await asyncio.to_thread(profile_store.entries)
+    return [ProfileInfo.model_validate(entry) for entry in entries]
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Literal["collapsed", "speedscope"] = Query(default="collapsed"),
+    _: None = Depends(check_admin_privileges),
+) -> Response:
+    """
+    Профиль запроса: collapsed stacks (flamegraph.pl) или JSON для speedscope.
+    """
+    meta = await asyncio.to_thread(profile_store.meta, profile_id)
+    collapsed = await asyncio.to_thread(profile_store.collapsed, profile_id)
+    if meta is None or collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "speedscope":
+        name = f"{meta['method']} {meta['path']} ({meta['duration_ms']} ms)"
+        return FastJSONResponse(to_speedscope(name, collapsed, meta["interval_ms"]))
+    return PlainTextResponse(collapsed)
+
+
+@router.get("/rules", response_model=list[RuleRead], response_class=FastJSONResponse)
 async def get_all_rules(
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     _: None = Depends(check_admin_privileges),
-) -> list[RuleRead]:
+) -> Response:
     """
-    Получить список всех правил доступа.
+    Получить список всех правил доступа тенанта администратора.
     Показывает матрицу: Роль -> Элемент -> Права.
+    ETag - версия политики тенанта, If-None-Match сверяется до чтения правил.
     """
+    tenant_id = request.state.user.tenant_id
+
+    # Актуальный кэш матрицы знает версию без запроса в БД
+    matrix = policy_cache.matrix(tenant_id)
+    if matrix is not None:
+        etag = rules_etag(tenant_id, matrix[0])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    # Версия читается до правил: строки могут оказаться только новее нее,
+    # и тогда следующий опрос просто получит 200 еще раз
+    etag = rules_etag(tenant_id, await PolicyVersionService.current(db, tenant_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Денормализованная матрица: имена роли и элемента уже в строке
     stmt = (
-        select(AccessRolesRules)
-        .options(
-            selectinload(AccessRolesRules.role), selectinload(AccessRolesRules.element)
-        )
-        .order_by(AccessRolesRules.role_id)
+        select(EffectivePermission)
+        .where(EffectivePermission.tenant_id == tenant_id)
+        .order_by(EffectivePermission.role_id)
     )
     result = await db.execute(stmt)
     rules = result.scalars().all()
 
-    # Преобразование ORM модели в Pydantic
-    response = []
-    for r in rules:
-        response.append(
-            RuleRead(
-                role_name=r.role.name,
-                element_key=r.element.key,
-                element_name=r.element.name,
-                create_permission=r.create_permission,
-                read_permission=r.read_permission,
-                read_all_permission=r.read_all_permission,
-                update_permission=r.update_permission,
-                update_all_permission=r.update_all_permission,
-                delete_permission=r.delete_permission,
-                delete_all_permission=r.delete_all_permission,
-            )
+    # Преобразование строк матрицы в Pydantic
+    response = [
+        RuleRead(
+            role_name=r.role_name,
+            element_key=r.element_key,
+            element_name=r.element_name,
+            conditions=r.conditions,
+            **r.flags,
         )
-    return response
+        for r in rules
+    ]
+    return rule_list_json.response(response, headers=etag_headers(etag))
+
+
+@router.get("/authorized-users")
+async def get_authorized_users(
+    request: Request,
+    resource: str = Query(max_length=50),
+    action: Literal["create", "read", "update", "delete"] = Query(),
+    scope: Literal["all", "own"] | None = Query(default=None),
+    after_id: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    _: None = Depends(check_admin_privileges),
+) -> AuthorizedUserPage:
+    """
+    Активные пользователи тенанта, которым разрешено действие над ресурсом
+    (keyset-пагинация по id).
+    scope=all - только право на любые объекты, own - только на свои.
+    """
+    grants = await reverse_index.grants(
+        db, request.state.user.tenant_id, resource, action
+    )
+    if scope is not None:
+        grants = tuple(g for g in grants if g.all_scope == (scope == "all"))
+    by_role = {grant.role_id: grant for grant in grants}
+    if not by_role:
+        return AuthorizedUserPage(items=[])
+
+    # Один запрос по индексу (role_id, id), без join с ролями
+    stmt = (
+        select(User.id, User.email, User.role_id)
+        .where(User.role_id.in_(by_role), User.is_active)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    rows = (await db.execute(stmt)).tuples().all()
+
+    items = [
+        AuthorizedUser(
+            id=user_id,
+            email=email,
+            role_id=role_id,
+            all_scope=by_role[role_id].all_scope,
+            conditional=by_role[role_id].conditional,
+        )
+        for user_id, email, role_id in rows
+    ]
+    # Полная страница - возможно, есть следующая
+    next_after_id = items[-1].id if len(items) == limit else None
+    return AuthorizedUserPage(items=items, next_after_id=next_after_id)
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Наименьшая строка больше всех строк с префиксом (побайтовый порядок).
+    None - такой строки нет (префикс из одних U+10FFFF), верхней границы нет.
+    """
+    # У U+10FFFF нет следующего символа - он отбрасывается, увеличивается
+    # предыдущий
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    code = ord(stem[-1]) + 1
+    # Суррогаты не кодируются в UTF-8 - следующий символ после U+D7FF это U+E000
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return stem[:-1] + chr(code)
+
+
+@router.get("/users")
+async def list_users(
+    request: Request,
+    role: str | None = Query(default=None, max_length=50),
+    is_active: bool | None = Query(default=None),
+    email_prefix: str | None = Query(default=None, min_length=1, max_length=255),
+    after_id: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    _: None = Depends(check_admin_privileges),
+) -> UserDirectoryPage:
+    """
+    Пользователи тенанта администратора (keyset-пагинация по id).
+    Фильтры: имя роли, активность, префикс email (с учетом регистра).
+    """
+    tenant_id = request.state.user.tenant_id
+
+    # Только нужные колонки: без ORM-объектов, joined-роли и ее правил
+    stmt = (
+        select(
+            User.id,
+            User.email,
+            User.first_name,
+            User.last_name,
+            User.is_active,
+            User.role_id,
+            Role.name,
+        )
+        .join(Role, Role.id == User.role_id)
+        .where(User.tenant_id == tenant_id)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if role is not None:
+        role_id = await reference_cache.role_id(db, tenant_id, role)
+        if role_id is None:
+            return UserDirectoryPage(items=[])
+        # Индекс (role_id, id), при is_active=true - частичный по активным
+        stmt = stmt.where(User.role_id == role_id)
+    if is_active is not None:
+        stmt = stmt.where(User.is_active if is_active else ~User.is_active)
+    if email_prefix is not None:
+        # Диапазон вместо LIKE: без экранирования и по индексу varchar_pattern_ops
+        stmt = stmt.where(User.email.op("~>=~")(email_prefix))
+        upper_bound = _prefix_upper_bound(email_prefix)
+        if upper_bound is not None:
+            stmt = stmt.where(User.email.op("~<~")(upper_bound))
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    rows = (await db.execute(stmt)).tuples().all()
+
+    items = [
+        UserDirectoryEntry(
+            id=user_id,
+            email=email,
+            first_name=first_name,
+            last_name=last_name,
+            is_active=active,
+            role_id=role_id,
+            role_name=role_name,
+        )
+        for user_id, email, first_name, last_name, active, role_id, role_name in rows
+    ]
+    # Полная страница - возможно, есть следующая
+    next_after_id = items[-1].id if len(items) == limit else None
+    return UserDirectoryPage(items=items, next_after_id=next_after_id)
 
 
 @router.put("/rules/{role_name}/{element_key}", response_model=RuleRead)
@@ -70,29 +290,33 @@ async def update_rule(
 ) -> RuleRead:
     """
     Обновить или создать права для конкретной роли на конкретный элемент.
+    Роль ищется в тенанте администратора.
     """
-    # Поиск Роли и Элемена по имени
-    role = (
-        await db.execute(select(Role).where(Role.name == role_name))
-    ).scalar_one_or_none()
-    element = (
-        await db.execute(
-            select(BusinessElement).where(BusinessElement.key == element_key)
-        )
-    ).scalar_one_or_none()
+    tenant_id = request.state.user.tenant_id
+
+    # Поиск Роли и Элемента по имени (справочники закэшированы при старте)
+    role_id = await reference_cache.role_id(db, tenant_id, role_name)
+    element = await reference_cache.element(db, element_key)
 
-    if not role or not element:
+    if role_id is None or element is None:
         raise HTTPException(status_code=404, detail="Role or Element not found")
 
+    # Условия компилируются заранее, чтобы не сохранить нерабочее правило
+    if rule_in.conditions:
+        try:
+            compile_conditions(rule_in.conditions)
+        except ConditionError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
     # Поиск существующего правила
     stmt = select(AccessRolesRules).where(
-        AccessRolesRules.role_id == role.id, AccessRolesRules.element_id == element.id
+        AccessRolesRules.role_id == role_id, AccessRolesRules.element_id == element.id
     )
     rule = (await db.execute(stmt)).scalar_one_or_none()
 
     # Если правила нет - создать, если есть - обновить
     if not rule:
-        rule = AccessRolesRules(role_id=role.id, element_id=element.id)
+        rule = AccessRolesRules(role_id=role_id, element_id=element.id)
         db.add(rule)
 
     # Обновление полей
@@ -103,14 +327,26 @@ async def update_rule(
     rule.update_all_permission = rule_in.update_all_permission
     rule.delete_permission = rule_in.delete_permission
     rule.delete_all_permission = rule_in.delete_all_permission
+    rule.conditions = rule_in.conditions or None
+
+    # Версия политики тенанта растет в той же транзакции, что и само правило.
+    # Новая версия также инвалидирует скомпилированные условия
+    rule.version = await PolicyVersionService.bump(db, tenant_id)
 
     await db.commit()
     await db.refresh(rule)
+    # Список правил и проверки прав тенанта должны сразу видеть изменение
+    pin_primary(tenant_id=tenant_id)
+
+    # Публикация новой версии для кэшей узлов и матрицы для воркеров.
+    # Кэши других тенантов остаются актуальными
+    await get_notifier().publish(tenant_id, rule.version)
+    await rebuild_snapshot(db)
 
     # Для ответа подгрузка связи
     return RuleRead(
-        role_name=role.name,
-        element_key=element.key,
+        role_name=role_name,
+        element_key=element_key,
         element_name=element.name,
         **rule.__dict__,
     )
@@ -1,22 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, token_response_json
 from app.db.session import get_db
-from app.models.rbac import Role
 from app.models.users import User
-from app.schemas.auth import LoginRequest, TokenResponse
+from app.schemas.auth import IntrospectionResponse, LoginRequest, TokenResponse
 from app.schemas.user import UserCreate, UserRead
 from app.services.auth_ops import AuthService
+from app.services.introspection_ops import (
+    INACTIVE,
+    IntrospectionService,
+)
+from app.services.rate_limit_ops import login_throttle
+from app.services.reference_cache import reference_cache
 
 router = APIRouter()
 
 
+async def resolve_tenant(db: AsyncSession, slug: str | None) -> int:
+    """id тенанта по slug из запроса (по умолчанию - DEFAULT_TENANT)."""
+    tenant_id = await reference_cache.tenant_id(db, slug or settings.DEFAULT_TENANT)
+    if tenant_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Unknown tenant"
+        )
+    return tenant_id
+
+
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)) -> UserRead:
     """
     Регистрация нового пользователя.
     По умолчанию выдаем роль 'User'.
+    Публичная регистрация - только в DEFAULT_TENANT: пользователей других
+    тенантов заводит их администратор.
     """
     # Проверка паролей
     if user_in.password != user_in.password_confirm:
@@ -24,59 +54,90 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)) -> U
             status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords do not match"
         )
 
-    # Проверка уникальности email
-    stmt = select(User).where(User.email == user_in.email)
+    if user_in.tenant not in (None, settings.DEFAULT_TENANT):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Self-registration is not allowed in this tenant",
+        )
+    tenant_id = await resolve_tenant(db, settings.DEFAULT_TENANT)
+
+    # Проверка уникальности email в пределах тенанта
+    stmt = select(User).where(User.tenant_id == tenant_id, User.email == user_in.email)
     existing_user = (await db.execute(stmt)).scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
 
-    # Получение дефолтной роли
-    role_stmt = select(Role).where(Role.name == "User")
-    default_role = (await db.execute(role_stmt)).scalar_one_or_none()
+    # Получение дефолтной роли (из кэша справочников)
+    default_role_id = await reference_cache.default_role_id(db, tenant_id)
 
-    if not default_role:
+    if default_role_id is None:
         # Fallback на случай если БД пустая
         raise HTTPException(
             status_code=500, detail="Default role 'User' not found in DB"
         )
 
     # Создание пользователя
-    hashed_pw = AuthService.get_password_hash(user_in.password)
+    hashed_pw = await AuthService.get_password_hash_async(user_in.password)
 
     new_user = User(
         email=user_in.email,
         hashed_password=hashed_pw,
         first_name=user_in.first_name,
         last_name=user_in.last_name,
-        role_id=default_role.id,
+        role_id=default_role_id,
+        tenant_id=tenant_id,
         is_active=True,
     )
 
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)  # Подгружаем ID и другие поля из БД
+    # Без pin_primary: запрос анонимный, закреплять чтения не за кем.
+    # Нового пользователя, которого еще не видит реплика, AuthMiddleware
+    # перепроверяет в primary
 
     return UserRead.model_validate(new_user)
 
 
-@router.post("/login", response_model=TokenResponse)
+@router.post("/login", response_model=TokenResponse, response_class=FastJSONResponse)
 async def login(
-    login_data: LoginRequest, db: AsyncSession = Depends(get_db)
-) -> TokenResponse:
+    login_data: LoginRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
     """
     Вход в систему по Email/Password.
     Возвращает Access и Refresh токены.
     """
-    # Поиск пользователя
-    stmt = select(User).where(User.email == login_data.email)
-    user = (await db.execute(stmt)).scalar_one_or_none()
-
-    # Проверка пользователя и пароля
-    if not user or not AuthService.verify_password(
-        login_data.password, user.hashed_password
-    ):
+    # Лимит попыток проверяется до БД и bcrypt
+    client_ip = request.client.host if request.client else None
+    tenant = login_data.tenant or settings.DEFAULT_TENANT
+    retry_after = await login_throttle.check(tenant, login_data.email, client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    # Поиск пользователя в тенанте. Неизвестный тенант - как неизвестный email
+    tenant_id = await reference_cache.tenant_id(db, tenant)
+    user = None
+    if tenant_id is not None:
+        stmt = select(User).where(
+            User.tenant_id == tenant_id, User.email == login_data.email
+        )
+        user = (await db.execute(stmt)).scalar_one_or_none()
+
+    # Проверка пароля выполняется всегда: для неизвестного email - по заглушке,
+    # чтобы по времени ответа нельзя было определить существование аккаунта
+    password_ok = await AuthService.verify_password_async(
+        login_data.password, user.hashed_password if user else None
+    )
+    if not user or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -86,21 +147,78 @@ async def login(
     if not user.is_active:
         raise HTTPException(status_code=400, detail="User is inactive")
 
+    # Хеш со старой стоимостью пересчитывается после ответа клиенту
+    if AuthService.needs_rehash(user.hashed_password):
+        background_tasks.add_task(
+            AuthService.rehash_password,
+            user.id,
+            login_data.password,
+            user.hashed_password,
+        )
+
     # Генерация токенов
-    # В payload кладем ID и RoleID, чтобы не ходить в БД при каждой проверке прав
-    payload = {"sub": str(user.id), "role_id": user.role_id}
+    # В payload кладем ID, RoleID и тенант (tid), чтобы не ходить в БД
+    # при каждой проверке прав
+    payload = {"sub": str(user.id), "role_id": user.role_id, "tid": user.tenant_id}
 
     access_token = AuthService.create_access_token(payload)
     refresh_token = AuthService.create_refresh_token(payload)
 
-    return TokenResponse(access_token=access_token, refresh_token=refresh_token)
+    return token_response_json.response(
+        TokenResponse(access_token=access_token, refresh_token=refresh_token)
+    )
 
 
 @router.post("/logout")
-async def logout() -> dict[str, str]:
+async def logout(request: Request) -> dict[str, str]:
     """
     Выход из системы.
     Так как мы используем JWT (Stateless), сервер не хранит сессию.
     Клиент должен сам удалить токен из LocalStorage/Cookies.
+    Переданный токен отзывается для интроспекции во всех воркерах
+    (active=false до exp).
     """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = AuthService.decode_token(token)
+        exp = payload.get("exp") if payload is not None else None
+        if isinstance(exp, int):
+            await IntrospectionService.revoke(token, exp)
     return {"detail": "Logout successful. Please remove token from client storage."}
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectionResponse,
+    response_model_exclude_none=True,
+)
+async def introspect(
+    request: Request,
+    token: str = Form(max_length=4096),
+    token_type_hint: str | None = Form(default=None),
+) -> IntrospectionResponse:
+    """
+    Интроспекция токена (RFC 7662) для resource server-ов.
+    Вызывающий аутентифицируется своим токеном, и его роль должна быть
+    в INTROSPECTION_ROLES (Admin или сервисная учетная запись): иначе любой
+    пользователь узнавал бы роль и права чужих токенов своего тенанта.
+    Токены чужих тенантов для него неактивны.
+    token_type_hint принимается по RFC, но не нужен: тип определяется по токену.
+    """
+    caller = request.state.user
+    if caller is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if caller.role.name not in settings.INTROSPECTION_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token introspection is not allowed for this role",
+        )
+
+    response = await IntrospectionService.introspect(token)
+    if response.active and response.tid != caller.tenant_id:
+        return INACTIVE
+    return response
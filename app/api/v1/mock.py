@@ -1,56 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from pydantic import BaseModel
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
-from app.api.deps import RequirePermission
-from app.db.session import get_db
+from app.api.deps import RequirePermission, get_order_repository
+from app.models.rbac import HAS_CONDITIONS, READ_ALL
+from app.schemas.order import OrderPage, OrderRead
+from app.services.order_ops import OrderRepository
 from app.services.permission_ops import PermissionService
 
 router = APIRouter()
 
 
-# Имитация БД
-class Order(BaseModel):
-    id: int
-    title: str
-    owner_id: int
-
+# Endpoints
 
-# Создание пару заказов.
-# Admin имеет ID=1, а User имеет ID=2 как после сида
-MOCK_ORDERS = [
-    Order(id=1, title="Заказ Админа #1", owner_id=1),
-    Order(id=2, title="Заказ Юзера #2", owner_id=2),
-    Order(id=3, title="Заказ Юзера #3", owner_id=2),
-]
 
+@router.get("/")
+async def list_orders(
+    request: Request,
+    after_id: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+    orders: OrderRepository = Depends(get_order_repository),
+    _: bool = Depends(RequirePermission(key="orders", action="read")),
+) -> OrderPage:
+    """
+    Список заказов (keyset-пагинация по id).
+    С read_all - все заказы тенанта, иначе только свои.
+    """
+    user = request.state.user
 
-# Endpoints
+    mask = await PermissionService.get_mask(user.tenant_id, user.role_id, "orders")
+    owner_id = None if mask & READ_ALL else user.id
+    page = await orders.list(user.tenant_id, owner_id, after_id, limit)
+
+    items = [OrderRead.model_validate(order) for order in page]
+    if mask & HAS_CONDITIONS:
+        # ABAC-условия проверяются по каждому заказу страницы
+        items = [
+            item
+            for item in items
+            if await PermissionService.has_permission(
+                user,
+                "orders",
+                "read",
+                owner_id=item.owner_id,
+                resource=item.model_dump(),
+            )
+        ]
+
+    # Полная страница - возможно, есть следующая
+    next_after_id = page[-1].id if len(page) == limit else None
+    return OrderPage(items=items, next_after_id=next_after_id)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_order(
     request: Request,
     title: str,
+    orders: OrderRepository = Depends(get_order_repository),
     # Проверка: Есть ли право создавать
     _: bool = Depends(RequirePermission(key="orders", action="create")),
-) -> Order:
+) -> OrderRead:
     """
     Создание заказа.
     Доступно и Admin, и User согласно сиду
     """
     user = request.state.user
-    new_id = len(MOCK_ORDERS) + 1
-    new_order = Order(id=new_id, title=title, owner_id=user.id)
-    MOCK_ORDERS.append(new_order)
-    return new_order
+    order = await orders.create(title=title, owner_id=user.id, tenant_id=user.tenant_id)
+    return OrderRead.model_validate(order)
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_order(
     order_id: int,
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    orders: OrderRepository = Depends(get_order_repository),
     # Проверка: Есть ли право удалять
     # User отсеется, так как у него delete_permission=False
     _: bool = Depends(RequirePermission(key="orders", action="delete")),
@@ -61,21 +82,25 @@ async def delete_order(
     """
     user = request.state.user
 
-    # Найти заказ
-    order = next((o for o in MOCK_ORDERS if o.id == order_id), None)
+    # Найти заказ (заказ чужого тенанта не виден)
+    order = await orders.get(order_id, user.tenant_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
     # Доп. проверка прав
     # Здесь сервис для проверки конкретного объекта
     has_perm = await PermissionService.has_permission(
-        db, user, "orders", "delete", owner_id=order.owner_id
+        user,
+        "orders",
+        "delete",
+        owner_id=order.owner_id,
+        resource=OrderRead.model_validate(order).model_dump(),
     )
 
     if not has_perm:
         raise HTTPException(status_code=403, detail="Forbidden by logic")
 
-    MOCK_ORDERS.remove(order)
+    await orders.delete(order_id)
     return None
 
 
@@ -83,10 +108,10 @@ async def delete_order(
 async def get_order(
     order_id: int,
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    orders: OrderRepository = Depends(get_order_repository),
     # Проверка: Есть ли право читать (User пройдет, так как read_permission=True)
     _: bool = Depends(RequirePermission(key="orders", action="read")),
-) -> Order:
+) -> OrderRead:
     """
     Просмотр конкретного заказа.
     Admin видит любой.
@@ -94,15 +119,21 @@ async def get_order(
     """
     user = request.state.user
 
-    order = next((o for o in MOCK_ORDERS if o.id == order_id), None)
+    order = await orders.get(order_id, user.tenant_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
+    result = OrderRead.model_validate(order)
+
     #  Проверка ВЛАДЕНИЯ (User vs Admin)
     # Если это Admin -> у него read_all=True -> has_permission вернет True
     # Если это User -> у него read_all=False -> has_permission проверит owner_id == user.id
     has_perm = await PermissionService.has_permission(
-        db, user, "orders", "read", owner_id=order.owner_id
+        user,
+        "orders",
+        "read",
+        owner_id=result.owner_id,
+        resource=result.model_dump(),
     )
 
     if not has_perm:
@@ -110,4 +141,4 @@ async def get_order(
             status_code=403, detail="You do not have access to this order"
         )
 
-    return order
+    return result
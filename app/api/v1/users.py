@@ -1,16 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.responses import (
+    FastJSONResponse,
+    etag_headers,
+    etag_matches,
+    not_modified,
+    user_read_json,
+)
+from app.db.replicas import pin_primary
 from app.db.session import get_db
+from app.models.users import User
 from app.schemas.user import UserRead
+from app.services.degraded_ops import principal_cache
+from app.services.introspection_ops import introspection_cache
 
 router = APIRouter()
 
 
-@router.get("/profile", response_model=UserRead)
-async def read_profile(request: Request) -> UserRead:
+def profile_etag(user: User) -> str:
+    """Строгий ETag профиля: id и версия строки пользователя."""
+    return f'"user-{user.id}-{user.version}"'
+
+
+@router.get("/profile", response_model=UserRead, response_class=FastJSONResponse)
+async def read_profile(request: Request) -> Response:
     """
     Получить данные текущего пользователя.
+    Поддерживает If-None-Match: неизменный профиль - 304 без сериализации.
     """
     user = getattr(request.state, "user", None)
 
@@ -20,7 +38,14 @@ async def read_profile(request: Request) -> UserRead:
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required"
         )
 
-    return UserRead.model_validate(user)
+    # Пользователь уже загружен AuthMiddleware - сверка версии бесплатна
+    etag = profile_etag(user)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    return user_read_json.response(
+        UserRead.model_validate(user), headers=etag_headers(etag)
+    )
 
 
 @router.delete("/profile", status_code=status.HTTP_204_NO_CONTENT)
@@ -35,10 +60,19 @@ async def delete_profile(request: Request, db: AsyncSession = Depends(get_db)) -
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required"
         )
 
-    user.is_active = False
-
-    # добавляем user в текущую сессию, чтобы SQLAlchemy отследил изменения
-    db.add(user)
+    # UPDATE без загрузки строки; версия растет - ETag профиля меняется
+    await db.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(is_active=False, version=User.version + 1)
+    )
     await db.commit()
+    # Реплика может еще видеть профиль активным
+    pin_primary(user_id=user.id)
+
+    # Удаленный профиль не должен переживать деградацию БД в кэше
+    principal_cache.discard(user.id)
+    # Закэшированная интроспекция его токенов больше не действительна
+    introspection_cache.invalidate_user(user.id)
 
     return None
@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,12 +22,104 @@ class Settings(BaseSettings):
             f"{self.POSTGRES_DB}"
         )
 
+    # Пул соединений и число соединений, открываемых при старте
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PREWARM: int = 5
+    DB_WARMUP_TIMEOUT_SECONDS: float = 10.0
+
+    # Реплики для чтений авторизации (JSON-список URL), пусто - только primary.
+    # Реплика с отставанием больше REPLICA_MAX_LAG_SECONDS исключается
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 1.0
+    REPLICA_CHECK_TIMEOUT_SECONDS: float = 1.0
+
     # Auth Settings
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Тенант для входа/регистрации без явного указания организации
+    DEFAULT_TENANT: str = "default"
+
+    # Каталог для mmap-снимка матрицы прав (общий для воркеров), None - отключено
+    POLICY_SNAPSHOT_DIR: str | None = None
+
+    # Когерентность кэша правил: канал уведомлений и интервал опроса версии
+    POLICY_NOTIFIER: Literal["inprocess", "postgres"] = "inprocess"
+    POLICY_POLL_INTERVAL_SECONDS: float = 5.0
+    # Сколько тенантов держать в кэше правил (вытесняются целиком, LRU).
+    # Новый тенант вытесняет только партицию, простаивающую дольше IDLE
+    POLICY_CACHE_MAX_TENANTS: int = 1_000
+    POLICY_CACHE_IDLE_SECONDS: float = 300.0
+
+    # Деградация БД: бюджет на запрос, circuit breaker и last-known-good кэш
+    DB_LATENCY_BUDGET_MS: int = 250
+    # Бюджет фоновой загрузки (партиция тенанта в кэше правил)
+    DB_BACKGROUND_BUDGET_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: int = 10
+    DEGRADED_MAX_STALENESS_SECONDS: int = 300
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+
+    # Кэш проверенных JWT и свежесть пользователя для forward-auth
+    TOKEN_CACHE_SIZE: int = 100_000
+    FORWARD_AUTH_PRINCIPAL_TTL_SECONDS: float = 5.0
+
+    # Кэш ответов POST /auth/introspect (по дайджесту токена) и роли,
+    # которым интроспекция разрешена (Admin и сервисные учетные записи)
+    INTROSPECTION_CACHE_SIZE: int = 100_000
+    INTROSPECTION_ROLES: list[str] = ["Admin", "Service"]
+    INTROSPECTION_CACHE_TTL_SECONDS: float = 5.0
+
+    # Негативный кэш отвергнутых токенов и пользователей (отдельный от позитивных)
+    NEGATIVE_CACHE_SIZE: int = 50_000
+    NEGATIVE_CACHE_TTL_SECONDS: float = 30.0
+
+    # Admission control: общий лимит запросов в работе (0 - отключено),
+    # отдельный лимит для login/register; очереди ограничены длиной и дедлайном
+    ADMISSION_MAX_CONCURRENCY: int = Field(default=256, ge=0)
+    ADMISSION_QUEUE_SIZE: int = Field(default=1_000, ge=0)
+    ADMISSION_QUEUE_TIMEOUT_MS: int = Field(default=500, gt=0)
+    ADMISSION_CREDENTIALS_CONCURRENCY: int = Field(default=8, ge=1)
+    ADMISSION_CREDENTIALS_QUEUE_SIZE: int = Field(default=32, ge=0)
+    ADMISSION_CREDENTIALS_QUEUE_TIMEOUT_MS: int = Field(default=100, gt=0)
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+
+    # Профилирование запросов: заголовок X-Profile от Admin или доля всех
+    # запросов (0 - только по заголовку); кольцо последних профилей на диске
+    PROFILER_SAMPLE_RATE: float = Field(default=0.0, ge=0.0, le=1.0)
+    PROFILER_INTERVAL_MS: float = Field(default=5.0, gt=0)
+    PROFILER_DIR: str = "/tmp/policymesh-profiles"
+    PROFILER_RING_SIZE: int = Field(default=100, ge=1)
+
+    # Ограничение попыток входа (до проверки пароля)
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 10
+    LOGIN_RATE_LIMIT_PER_IP: int = 50
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: float = 60.0
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Стоимость bcrypt (log2 раундов) для новых хешей; старые хеши с другой
+    # стоимостью пересчитываются при успешном входе. Подбор: make calibrate-bcrypt
+    PASSWORD_HASH_ROUNDS: int = Field(default=12, ge=4, le=31)
+    # Пул bcrypt: число потоков и максимум запросов в работе + очереди
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Аудит решений авторизации: deny пишутся всегда, allow - с долей выборки
+    AUDIT_ALLOW_SAMPLE_RATE: float = 0.01
+    AUDIT_BUFFER_SIZE: int = 50_000
+    AUDIT_BATCH_SIZE: int = 1_000
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 2.0
+
+    # Логирование: уровень, JSON-формат, SQL-логи и доля выборки по логгерам
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SQL: bool = False
+    LOG_SAMPLING: dict[str, float] = {"sqlalchemy.engine": 0.01}
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -1,8 +1,25 @@
+import logging
+
 from fastapi import Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailableError(Exception):
+    """
+    Ресурс перегружен или недоступен (БД, пул хеширования),
+    а безопасного закэшированного ответа нет.
+    """
+
+    def __init__(self, message: str, retry_after: int | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
 # Хендлер для ошибок валидации (Pydantic)
 async def validation_exception_handler(
@@ -21,13 +38,33 @@ async def http_exception_handler(request: Request, exc: Exception) -> JSONRespon
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        # Retry-After, WWW-Authenticate и т.п. должны дойти до клиента
+        headers=exc.headers,
+    )
+
+
+# Хендлер для деградации БД (503)
+async def service_unavailable_handler(request: Request, exc: Exception) -> JSONResponse:
+    assert isinstance(exc, ServiceUnavailableError)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service temporarily unavailable"},
+        headers={
+            "Retry-After": str(
+                exc.retry_after or settings.CIRCUIT_BREAKER_RESET_SECONDS
+            )
+        },
     )
 
 
 # Хендлер для всех непредвиденных ошибок (500)
 async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
-    # Здесь можно добавить логирование ошибки в Sentry или файл
-    print(f"ERROR: {exc}")
+    logger.error(
+        "Unhandled error on %s %s",
+        request.method,
+        request.url.path,
+        exc_info=exc,
+    )
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error"},
@@ -0,0 +1,121 @@
+"""
+Неблокирующее логирование.
+
+Все логгеры пишут в QueueHandler: в event loop остается только
+постановка записи в очередь, а форматирование в JSON и запись в stdout
+выполняет QueueListener в отдельном потоке. Поэтому задержка запроса
+не зависит от скорости stdout/диска.
+
+Каждая запись получает request_id текущего запроса (contextvar,
+выставляется RequestContextMiddleware). Для шумных логгеров (например,
+SQL) можно задать долю выборки: записи ниже WARNING отбрасываются
+еще до постановки в очередь.
+"""
+
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.config import settings
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Служебные атрибуты LogRecord, которые не нужно дублировать в JSON
+_RESERVED = frozenset(logging.makeLogRecord({}).__dict__) | {"message"}
+
+_listener: QueueListener | None = None
+# Обработчики root-логгера до setup_logging - возвращаются при остановке
+_previous_handlers: list[logging.Handler] = []
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет request_id в запись (в потоке, где она создана)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Выборка записей по префиксу имени логгера. WARNING и выше не режутся."""
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        # Длинные префиксы проверяются первыми
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and value is not None:
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging() -> None:
+    """Подключить очередь логов к root-логгеру и запустить listener."""
+    global _listener, _previous_handlers
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLING))
+    queue_handler.addFilter(RequestIdFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        JsonFormatter()
+        if settings.LOG_JSON
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+
+    root = logging.getLogger()
+    _previous_handlers = root.handlers[:]
+    root.handlers[:] = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    # SQL пишется через тот же конвейер, а не через синхронный echo
+    logging.getLogger("sqlalchemy.engine").setLevel(
+        logging.INFO if settings.LOG_SQL else logging.WARNING
+    )
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Дописать очередь, остановить listener и вернуть прежние обработчики
+    root-логгера: записи после остановки не должны уходить в очередь,
+    которую никто не читает.
+    """
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.handlers[:] = _previous_handlers
+    _previous_handlers.clear()
+    _listener.stop()
+    _listener = None
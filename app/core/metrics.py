@@ -0,0 +1,35 @@
+"""
+Простейший реестр метрик процесса: счетчики и вычисляемые gauge.
+Снимок отдается админским эндпоинтом GET /api/v1/admin/metrics.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._counters: defaultdict[str, int] = defaultdict(int)
+        self._gauges: dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, getter: Callable[[], float]) -> None:
+        """Gauge вычисляется в момент снятия снимка."""
+        self._gauges[name] = getter
+
+    def snapshot(self) -> dict[str, float]:
+        values: dict[str, float] = dict(self._counters)
+        for name, getter in self._gauges.items():
+            values[name] = getter()
+        return values
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+metrics = Metrics()
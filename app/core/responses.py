@@ -0,0 +1,85 @@
+"""
+Быстрая сериализация ответов для горячих эндпоинтов.
+
+Обычный путь FastAPI для response_model: повторная валидация возвращенной
+модели, jsonable_encoder и stdlib json. Здесь модель, уже провалидированная
+в роуте, сразу кодируется в JSON сериализатором pydantic-core (Rust), без
+промежуточных dict. Подключается явно: роут возвращает готовый Response
+через JsonSerializer.response, а response_model остается только для OpenAPI.
+
+Условный GET: роут сравнивает If-None-Match с ETag (etag_matches) до
+загрузки и сериализации данных и при совпадении отвечает not_modified.
+"""
+
+from collections.abc import Mapping
+from typing import Any
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.schemas.auth import TokenResponse
+from app.schemas.rbac import RuleRead
+from app.schemas.user import UserRead
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse на pydantic-core: понимает модели, dict, list, datetime.
+    bytes считаются уже готовым JSON и отдаются как есть.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+class JsonSerializer[T]:
+    """Заранее собранный сериализатор типа ответа (схема строится один раз)."""
+
+    def __init__(self, tp: type[T]) -> None:
+        self._adapter = TypeAdapter(tp)
+
+    def dumps(self, value: T) -> bytes:
+        return self._adapter.dump_json(value)
+
+    def response(
+        self,
+        value: T,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+    ) -> FastJSONResponse:
+        return FastJSONResponse(
+            self.dumps(value), status_code=status_code, headers=headers
+        )
+
+
+# Ответ зависит от пользователя: только приватный кэш и всегда с ревалидацией
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match совпадает с ETag (для GET - слабое сравнение, RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+user_read_json = JsonSerializer(UserRead)
+rule_list_json = JsonSerializer(list[RuleRead])
+token_response_json = JsonSerializer(TokenResponse)
@@ -0,0 +1,207 @@
+"""
+Маршрутизация чтений на реплики.
+
+Чтения авторизации (пользователь в middleware, правила в RequirePermission,
+список правил в админке, синхронизация кэша политики) идут в сессию
+get_read_db: она открывается на одной из здоровых реплик по кругу.
+Записи и чтения после записи остаются на primary (get_db).
+
+Здоровье реплик проверяет фоновая задача: реплика с отставанием больше
+REPLICA_MAX_LAG_SECONDS или недоступная исключается из ротации.
+После записи, которую должны сразу увидеть следующие запросы, вызывается
+pin_primary() с тем, кого запись касается: тенант (правила) или
+пользователь (профиль). На REPLICA_MAX_LAG_SECONDS в primary идут чтения
+только запросов этого тенанта или пользователя - их AuthMiddleware
+выставляет из токена (set_read_principal). Остальной трафик процесса
+остается на репликах. Без реплик get_read_db == get_db.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# (тенант, пользователь) текущего запроса - по ним проверяется закрепление
+_principal: ContextVar[tuple[int | None, int | None]] = ContextVar(
+    "read_principal", default=(None, None)
+)
+
+# Отставание в секундах; догнавшая WAL реплика и сам primary дают 0
+_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE("
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+def _pin_keys(tenant_id: int | None, user_id: int | None) -> list[tuple[str, int]]:
+    keys = []
+    if tenant_id is not None:
+        keys.append(("tenant", tenant_id))
+    if user_id is not None:
+        keys.append(("user", user_id))
+    return keys
+
+
+class Replica:
+    __slots__ = ("url", "engine", "healthy", "lag")
+
+    def __init__(self, url: str, engine: AsyncEngine) -> None:
+        self.url = url
+        self.engine = engine
+        # До первой проверки реплика в ротацию не входит
+        self.healthy = False
+        self.lag: float | None = None
+
+
+class ReplicaRouter:
+    def __init__(self, max_lag: float) -> None:
+        self.max_lag = max_lag
+        self.replicas: list[Replica] = []
+        self._cycle = itertools.count()
+        # ("tenant" | "user", id) -> до какого момента читать из primary.
+        # Срок у всех закреплений одинаковый, поэтому порядок вставки -
+        # это порядок истечения
+        self._pins: OrderedDict[tuple[str, int], float] = OrderedDict()
+
+    def add(self, url: str) -> None:
+        engine = create_async_engine(
+            url,
+            echo=False,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        self.replicas.append(Replica(url, engine))
+
+    def pin_primary(
+        self, tenant_id: int | None = None, user_id: int | None = None
+    ) -> None:
+        """
+        Чтения запросов тенанта или пользователя идут в primary, пока
+        реплики могут не видеть их запись.
+        """
+        now = time.monotonic()
+        # Истекшие закрепления - в начале очереди
+        while self._pins and next(iter(self._pins.values())) <= now:
+            self._pins.popitem(last=False)
+        for key in _pin_keys(tenant_id, user_id):
+            self._pins.pop(key, None)
+            self._pins[key] = now + self.max_lag
+
+    def is_pinned(self, tenant_id: int | None, user_id: int | None) -> bool:
+        now = time.monotonic()
+        return any(
+            self._pins.get(key, 0.0) > now for key in _pin_keys(tenant_id, user_id)
+        )
+
+    def pick(self) -> AsyncEngine | None:
+        """Engine здоровой реплики по кругу или None (читать из primary)."""
+        if self._pins and self.is_pinned(*_principal.get()):
+            metrics.inc("replica_reads_pinned")
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        metrics.inc("replica_reads")
+        return healthy[next(self._cycle) % len(healthy)].engine
+
+    async def check(self) -> None:
+        """Обновить отставание и здоровье всех реплик."""
+        for replica in self.replicas:
+            try:
+                async with asyncio.timeout(settings.REPLICA_CHECK_TIMEOUT_SECONDS):
+                    async with replica.engine.connect() as conn:
+                        lag = float((await conn.execute(_LAG_QUERY)).scalar_one())
+            except Exception as exc:
+                if replica.healthy:
+                    logger.warning("Replica %s unavailable: %r", replica.url, exc)
+                replica.healthy = False
+                replica.lag = None
+                continue
+
+            healthy = lag <= self.max_lag
+            if replica.healthy and not healthy:
+                logger.warning("Replica %s lags %.1fs, excluded", replica.url, lag)
+            replica.healthy = healthy
+            replica.lag = lag
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+        self.replicas.clear()
+
+
+replica_router = ReplicaRouter(settings.REPLICA_MAX_LAG_SECONDS)
+metrics.register_gauge(
+    "replicas_healthy",
+    lambda: float(sum(replica.healthy for replica in replica_router.replicas)),
+)
+
+
+def pin_primary(tenant_id: int | None = None, user_id: int | None = None) -> None:
+    replica_router.pin_primary(tenant_id, user_id)
+
+
+def set_read_principal(tenant_id: int | None, user_id: int | None) -> None:
+    """Тенант и пользователь текущего запроса (из токена) для pick()."""
+    _principal.set((tenant_id, user_id))
+
+
+def read_session() -> AsyncSession:
+    """Сессия только для чтения: реплика, если есть здоровая, иначе primary."""
+    engine = replica_router.pick()
+    if engine is None:
+        return AsyncSessionLocal()
+    return AsyncSessionLocal(bind=engine)
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with read_session() as session:
+        yield session
+
+
+_monitor_task: asyncio.Task[None] | None = None
+
+
+async def _monitor_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.REPLICA_CHECK_INTERVAL_SECONDS)
+        await replica_router.check()
+
+
+async def start_replicas() -> None:
+    """Подключить реплики из настроек, проверить их и запустить мониторинг."""
+    global _monitor_task
+    if _monitor_task is not None or not settings.DATABASE_REPLICA_URLS:
+        return
+    for url in settings.DATABASE_REPLICA_URLS:
+        replica_router.add(url)
+    await replica_router.check()
+    _monitor_task = asyncio.create_task(_monitor_loop())
+
+
+async def stop_replicas() -> None:
+    global _monitor_task
+    if _monitor_task is not None:
+        _monitor_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _monitor_task
+        _monitor_task = None
+    await replica_router.dispose()
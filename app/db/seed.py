@@ -1,12 +1,16 @@
 import asyncio
 import logging
 
-import bcrypt
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.db.session import AsyncSessionLocal
+from app.models.orders import Order
 from app.models.rbac import AccessRolesRules, BusinessElement, Role
+from app.models.tenants import Tenant
 from app.models.users import User
+from app.services.auth_ops import AuthService
+from app.services.policy_version_ops import PolicyVersionService
 
 # логгер
 logging.basicConfig(level=logging.INFO)
@@ -17,17 +21,28 @@ async def seed_db() -> None:
     async with AsyncSessionLocal() as session:
         logger.info("Начало посева данных...")
 
-        # 1. Создание РОЛЕЙ
+        # 0. Тенант по умолчанию
+        stmt_tenant = select(Tenant).where(Tenant.slug == settings.DEFAULT_TENANT)
+        tenant = (await session.execute(stmt_tenant)).scalar_one_or_none()
+        if not tenant:
+            tenant = Tenant(slug=settings.DEFAULT_TENANT, name="Default")
+            session.add(tenant)
+            await session.flush()
+            logger.info(f"Tenant created: {settings.DEFAULT_TENANT}")
+
+        # 1. Создание РОЛЕЙ тенанта
         roles_data = ["Admin", "User", "Manager", "Guest"]
         roles_map: dict[str, Role] = {}
 
         for role_name in roles_data:
-            stmt = select(Role).where(Role.name == role_name)
+            stmt = select(Role).where(
+                Role.tenant_id == tenant.id, Role.name == role_name
+            )
             result = await session.execute(stmt)
             role: Role | None = result.scalar_one_or_none()
 
             if not role:
-                role = Role(name=role_name)
+                role = Role(tenant_id=tenant.id, name=role_name)
                 session.add(role)
                 await session.flush()
                 logger.info(f"Role created: {role_name}")
@@ -60,6 +75,9 @@ async def seed_db() -> None:
             elements_map[el["key"]] = element
 
         # Настройка ПРАВ (Rules)
+        # Новые правила получают следующую версию политики
+        policy_version = await PolicyVersionService.bump(session, tenant.id)
+
         # Правила для Admin
         admin_role = roles_map["Admin"]
 
@@ -81,6 +99,7 @@ async def seed_db() -> None:
                     update_all_permission=True,
                     delete_permission=True,
                     delete_all_permission=True,
+                    version=policy_version,
                 )
                 session.add(rule)
                 logger.info(f"Added FULL rights for Admin on {key}")
@@ -108,19 +127,20 @@ async def seed_db() -> None:
                 update_all_permission=False,
                 delete_permission=False,
                 delete_all_permission=False,
+                version=policy_version,
             )
             session.add(rule)
             logger.info("Added LIMITED rights for User on orders")
 
         # Создание АДМИНИСТРАТОРА
         admin_email = "admin@example.com"
-        stmt_user = select(User).where(User.email == admin_email)  # ← новое имя
+        stmt_user = select(User).where(
+            User.tenant_id == tenant.id, User.email == admin_email
+        )
         existing_admin = (await session.execute(stmt_user)).scalar_one_or_none()
 
         if not existing_admin:
-            password_bytes = b"admin123"
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(password_bytes, salt).decode("utf-8")
+            hashed_password = AuthService.get_password_hash("admin123")
 
             admin_user = User(
                 email=admin_email,
@@ -128,6 +148,7 @@ async def seed_db() -> None:
                 first_name="Super",
                 last_name="Admin",
                 role_id=admin_role.id,
+                tenant_id=tenant.id,
                 is_active=True,
             )
             session.add(admin_user)
@@ -135,6 +156,15 @@ async def seed_db() -> None:
         else:
             logger.info("Superuser already exists")
 
+        # Демонстрационный заказ для /api/v1/mock (если таблица пуста)
+        if (await session.execute(select(Order.id).limit(1))).first() is None:
+            await session.flush()
+            owner = existing_admin or admin_user
+            session.add(
+                Order(title="Заказ Админа #1", owner_id=owner.id, tenant_id=tenant.id)
+            )
+            logger.info("Added sample order")
+
         await session.commit()
         logger.info("Seeding completed successfully!")
 
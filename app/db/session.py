@@ -1,16 +1,92 @@
+import asyncio
+import logging
 from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+logger = logging.getLogger(__name__)
+
+_engine: AsyncEngine | None = None
+
+
+class _LazySessionmaker(async_sessionmaker[AsyncSession]):
+    """
+    Фабрика сессий, которая создает engine при первом обращении.
+    В приложении engine создается и прогревается в lifespan (init_engine),
+    а скрипты (seed, пересборка снимка) получают его лениво.
+    """
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    def __call__(self, **local_kw: Any) -> AsyncSession:
+        if self.kw.get("bind") is None:
+            init_engine()
+        return super().__call__(**local_kw)
+
+
+AsyncSessionLocal = _LazySessionmaker(
+    class_=AsyncSession, expire_on_commit=False, autoflush=False
 )
 
 
+def init_engine() -> AsyncEngine:
+    """Создать engine (драйвер asyncpg импортируется здесь, а не при импорте)."""
+    global _engine
+    if _engine is None:
+        # SQL-логи идут через общий логгер (LOG_SQL), а не через синхронный echo
+        _engine = create_async_engine(
+            settings.DATABASE_URL,
+            echo=False,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        AsyncSessionLocal.configure(bind=_engine)
+    return _engine
+
+
+async def prewarm_pool(connections: int) -> int:
+    """
+    Открыть до connections соединений одновременно и вернуть их в пул,
+    чтобы первые запросы не платили за TCP/TLS и аутентификацию.
+    :return: число прогретых соединений
+    """
+    engine = init_engine()
+    count = min(connections, settings.DB_POOL_SIZE)
+    if count <= 0:
+        return 0
+
+    results = await asyncio.gather(
+        *(engine.connect() for _ in range(count)), return_exceptions=True
+    )
+    opened = [conn for conn in results if not isinstance(conn, BaseException)]
+    try:
+        for conn in opened:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            await conn.close()
+
+    if len(opened) < count:
+        logger.warning("Pool prewarm: %s of %s connections opened", len(opened), count)
+    return len(opened)
+
+
+async def dispose_engine() -> None:
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        AsyncSessionLocal.configure(bind=None)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
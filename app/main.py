@@ -1,3 +1,9 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -5,20 +11,92 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.api.v1 import admin, auth, mock, users
 from app.core.config import settings
 from app.core.exceptions import (
+    ServiceUnavailableError,
     general_exception_handler,
     http_exception_handler,
+    service_unavailable_handler,
     validation_exception_handler,
 )
+from app.core.logging import setup_logging, stop_logging
+from app.db.replicas import start_replicas, stop_replicas
+from app.db.session import AsyncSessionLocal, dispose_engine, init_engine, prewarm_pool
+from app.middleware.admission import AdmissionMiddleware
 from app.middleware.authentication import AuthMiddleware
+from app.middleware.forward_auth import ForwardAuthMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.services.audit_ops import start_audit_writer, stop_audit_writer
+from app.services.auth_ops import AuthService
+from app.services.introspection_ops import start_revocation_sync
+from app.services.policy_cache import policy_cache, start_policy_sync, stop_policy_sync
+from app.services.reference_cache import reference_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """
+    Прогрев перед приемом трафика: хеш-заглушка для входа, соединения пула,
+    справочники, матрица прав и компиляция горячих запросов. Недоступная БД
+    старт не блокирует - первые запросы пойдут по обычному (холодному) пути.
+    """
+    started = time.perf_counter()
+    # Не зависит от БД: время ответа login не должно выдавать первый промах
+    await AuthService.prepare_dummy_hash()
+    try:
+        async with asyncio.timeout(settings.DB_WARMUP_TIMEOUT_SECONDS):
+            connections = await prewarm_pool(settings.DB_POOL_PREWARM)
+            async with AsyncSessionLocal() as session:
+                await reference_cache.load(session)
+                await policy_cache.sync(session, preload=True)
+            # Запрос principal из AuthMiddleware попадает в кэш компиляции
+            await AuthMiddleware.load_user(0)
+    except Exception:
+        logger.warning("Warm-up skipped: database unavailable", exc_info=True)
+        return
+    logger.info(
+        "Warm-up done in %.0f ms (%s pool connections)",
+        (time.perf_counter() - started) * 1000,
+        connections,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    setup_logging()
+    init_engine()
+    await start_replicas()
+    await warm_up()
+    # Отзывы токенов приходят тем же нотификатором, что и версии политики
+    start_revocation_sync()
+    # Фоновая синхронизация кэша правил по версии политики
+    await start_policy_sync()
+    # Фоновая пакетная запись аудита авторизации
+    await start_audit_writer()
+    yield
+    await stop_audit_writer()
+    await stop_policy_sync()
+    await stop_replicas()
+    await dispose_engine()
+    stop_logging()
+
 
-app = FastAPI(title=settings.PROJECT_NAME)
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
-# Middleware
+# Middleware (добавленный последним выполняется первым)
+# Профайлер - после AuthMiddleware: ему нужен пользователь запроса
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(AuthMiddleware)
+# Forward-auth для прокси отвечает до AuthMiddleware и роутинга
+app.add_middleware(ForwardAuthMiddleware)
+# Лимиты и приоритеты классов запросов - до всей работы, включая forward-auth
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 # Exception Handlers
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.add_exception_handler(ServiceUnavailableError, service_unavailable_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 # Routers
@@ -0,0 +1,70 @@
+"""
+Admission control на уровне ASGI, до аутентификации и роутинга.
+
+Классы запросов (app/services/admission_ops.py), по убыванию приоритета:
+    reads       - GET/HEAD с Authorization (в т.ч. forward-auth);
+    default     - все остальное;
+    credentials - POST /auth/login и /auth/register (bcrypt).
+Отброшенный запрос получает 503 с Retry-After без обращения к БД и
+без разбора тела.
+"""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.admission_ops import admission
+
+CREDENTIAL_PATHS = frozenset({"/api/v1/auth/login", "/api/v1/auth/register"})
+# Liveness-проверка не должна отбрасываться под нагрузкой
+UNMETERED_PATHS = frozenset({"/health"})
+
+_SHED_BODY = b'{"detail":"Service overloaded"}'
+
+
+def route_class(scope: Scope) -> str | None:
+    path = scope["path"]
+    if path in UNMETERED_PATHS:
+        return None
+    method = scope["method"]
+    if method == "POST" and path in CREDENTIAL_PATHS:
+        return "credentials"
+    if method in ("GET", "HEAD"):
+        for name, _ in scope["headers"]:
+            if name == b"authorization":
+                return "reads"
+    return "default"
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.enabled = settings.ADMISSION_MAX_CONCURRENCY > 0
+        self.retry_after = str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = route_class(scope) if self.enabled and scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await admission.acquire(name):
+            await self._shed(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(name)
+
+    async def _shed(self, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_SHED_BODY)).encode()),
+                    (b"retry-after", self.retry_after),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": _SHED_BODY})
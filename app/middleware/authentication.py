@@ -6,17 +6,25 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
 
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.db.replicas import read_session, replica_router, set_read_principal
 from app.db.session import AsyncSessionLocal
 from app.models.users import User
-from app.services.auth_ops import AuthService
+from app.services.degraded_ops import guarded, principal_cache
+from app.services.negative_cache import rejected_users
+from app.services.single_flight import user_loads
+from app.services.token_cache import token_cache
 
 
 class AuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(
         self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
     ) -> Response:
-        # Инициализируем user как None (для анонимов)
+        # Инициализируем user и тенант как None (для анонимов)
         request.state.user = None
+        request.state.tenant_id = None
 
         # Получаем заголовок
         auth_header = request.headers.get("Authorization")
@@ -39,7 +47,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
             )
 
         # Декодирование токена
-        payload = AuthService.decode_token(token)
+        payload = token_cache.decode(token)
         if not payload:
             return JSONResponse(
                 status_code=401, content={"detail": "Invalid or expired token"}
@@ -52,32 +60,96 @@ class AuthMiddleware(BaseHTTPMiddleware):
             )
         user_id_int = int(user_id)
 
-        # Поиск пользователя в БД
-        async with AsyncSessionLocal() as session:
-            # Role и Rules понадобятся для проверки прав
-            stmt = (
-                select(User)
-                .options(selectinload(User.role))
-                .where(User.id == user_id_int)  # ← убрал лишний int()
+        # Тенант запроса - из claim токена
+        tenant_id = payload.get("tid")
+        if not isinstance(tenant_id, int):
+            return JSONResponse(
+                status_code=401, content={"detail": "Invalid tenant in token"}
             )
 
-            result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
+        # Чтения запроса идут в primary, если тенант или пользователь
+        # только что что-то записали
+        set_read_principal(tenant_id, user_id_int)
 
+        # Недавно не найденный или неактивный пользователь - без запроса в БД
+        rejected = rejected_users.get(user_id_int)
+        if rejected is not None:
+            return JSONResponse(status_code=401, content={"detail": rejected})
+
+        # Поиск пользователя в БД (в рамках бюджета), при деградации - из кэша
+        try:
+            user = await self.fetch_user(user_id_int)
+        except ServiceUnavailableError:
+            user = principal_cache.get_stale(
+                user_id_int, settings.DEGRADED_MAX_STALENESS_SECONDS
+            )
+            if user is None:
+                return JSONResponse(
+                    status_code=503,
+                    content={"detail": "Service temporarily unavailable"},
+                    headers={
+                        "Retry-After": str(settings.CIRCUIT_BREAKER_RESET_SECONDS)
+                    },
+                )
+            metrics.inc("degraded_principal_decisions")
+        else:
             # Проверки безопасности
             if not user:
+                principal_cache.discard(user_id_int)
+                rejected_users.add(user_id_int, "User not found")
                 return JSONResponse(
                     status_code=401, content={"detail": "User not found"}
                 )
-
+            principal_cache.put(user)
             if not user.is_active:
-                return JSONResponse(
-                    status_code=401, content={"detail": "User is inactive"}
-                )
+                rejected_users.add(user_id_int, "User is inactive")
 
-            # отсоединить объект от сессии, чтобы использовать его в роутах
-            request.state.user = user
+        if not user.is_active:
+            return JSONResponse(status_code=401, content={"detail": "User is inactive"})
+
+        # Токен, выданный в другом тенанте, не подходит
+        if user.tenant_id != tenant_id:
+            return JSONResponse(
+                status_code=401, content={"detail": "Invalid tenant in token"}
+            )
+
+        # объект отсоединен от сессии (expire_on_commit=False), его можно использовать в роутах
+        request.state.user = user
+        request.state.tenant_id = tenant_id
 
         # Передача управления дальше
         response = await call_next(request)
         return response
+
+    @staticmethod
+    async def fetch_user(user_id: int) -> User | None:
+        """
+        Пользователь из БД в рамках бюджета; одновременные запросы одного
+        пользователя ждут один SELECT.
+        None - пользователя нет в primary: такой ответ можно класть в
+        негативный кэш. Отстающая реплика может еще не видеть только что
+        зарегистрированного пользователя, поэтому ее "не найден"
+        перепроверяется в primary.
+        :raises ServiceUnavailableError: БД недоступна или не уложилась в бюджет
+        """
+
+        async def load() -> User | None:
+            user = await guarded(lambda: AuthMiddleware.load_user(user_id))
+            if user is None and replica_router.replicas:
+                metrics.inc("user_not_found_primary_rechecks")
+                user = await guarded(
+                    lambda: AuthMiddleware.load_user(user_id, primary=True)
+                )
+            return user
+
+        return await user_loads.do(user_id, load)
+
+    @staticmethod
+    async def load_user(user_id: int, primary: bool = False) -> User | None:
+        async with AsyncSessionLocal() if primary else read_session() as session:
+            # Role и Rules понадобятся для проверки прав
+            stmt = (
+                select(User).options(selectinload(User.role)).where(User.id == user_id)
+            )
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
@@ -0,0 +1,157 @@
+"""
+Forward-auth для reverse proxy (nginx auth_request, Envoy ext_authz HTTP).
+
+GET /internal/authz/check обрабатывается на уровне ASGI, до роутинга
+FastAPI, AuthMiddleware и Pydantic. Вход - заголовки проксируемого запроса:
+    Authorization: Bearer <token>
+    X-Resource: ключ элемента (orders), X-Action: create|read|update|delete
+    X-Owner-Id: владелец объекта (необязательно)
+Ответ без тела: 200 с X-User-Id / X-User-Role-Id / X-User-Role / X-Tenant-Id,
+401 - нет или невалиден токен, 403 - доступ запрещен, 503 - БД недоступна
+и нет свежего кэша.
+
+В горячем пути нет обращений к БД: токен - из TokenCache, пользователь -
+из PrincipalCache (не старше FORWARD_AUTH_PRINCIPAL_TTL_SECONDS), решение -
+из mmap-снимка или актуального PolicyCache.
+"""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.db.replicas import set_read_principal
+from app.middleware.authentication import AuthMiddleware
+from app.models.users import User
+from app.services.audit_ops import audit_buffer
+from app.services.degraded_ops import principal_cache
+from app.services.negative_cache import rejected_users
+from app.services.permission_ops import ACTION_BITS, PermissionService
+from app.services.token_cache import token_cache
+
+FORWARD_AUTH_PATH = "/internal/authz/check"
+
+_BODY = {"type": "http.response.body", "body": b""}
+
+
+async def _respond(send: Send, status: int, headers: list[tuple[bytes, bytes]]) -> None:
+    headers.append((b"content-length", b"0"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send(_BODY)
+
+
+async def _resolve_user(user_id: int) -> User | None:
+    """Пользователь из кэша, при промахе - из БД, при деградации - last-known-good."""
+    if rejected_users.get(user_id) is not None:
+        return None
+    user = principal_cache.get_stale(
+        user_id, settings.FORWARD_AUTH_PRINCIPAL_TTL_SECONDS
+    )
+    if user is not None:
+        return user
+    try:
+        user = await AuthMiddleware.fetch_user(user_id)
+    except ServiceUnavailableError:
+        user = principal_cache.get_stale(
+            user_id, settings.DEGRADED_MAX_STALENESS_SECONDS
+        )
+        if user is None:
+            raise
+        metrics.inc("degraded_principal_decisions")
+        return user
+    if user is None:
+        principal_cache.discard(user_id)
+        rejected_users.add(user_id, "User not found")
+    else:
+        principal_cache.put(user)
+        if not user.is_active:
+            rejected_users.add(user_id, "User is inactive")
+    return user
+
+
+class ForwardAuthMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] != FORWARD_AUTH_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] not in ("GET", "HEAD"):
+            await _respond(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        try:
+            status, headers = await self._check(scope)
+        except ServiceUnavailableError:
+            status = 503
+            headers = [
+                (b"retry-after", str(settings.CIRCUIT_BREAKER_RESET_SECONDS).encode())
+            ]
+        metrics.inc(f"forward_auth_{status}")
+        await _respond(send, status, headers)
+
+    @staticmethod
+    async def _check(scope: Scope) -> tuple[int, list[tuple[bytes, bytes]]]:
+        authorization = resource_key = action = owner = None
+        # Заголовки в ASGI уже в нижнем регистре
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+            elif name == b"x-resource":
+                resource_key = value
+            elif name == b"x-action":
+                action = value
+            elif name == b"x-owner-id":
+                owner = value
+
+        if authorization is None or authorization[:7].lower() != b"bearer ":
+            return 401, [(b"www-authenticate", b"Bearer")]
+        payload = token_cache.decode(authorization[7:].strip().decode("latin-1"))
+        user_id = payload.get("sub") if payload else None
+        tenant_id = payload.get("tid") if payload else None
+        if (
+            not isinstance(user_id, str)
+            or not user_id.isdigit()
+            or not isinstance(tenant_id, int)
+        ):
+            return 401, [(b"www-authenticate", b"Bearer")]
+
+        set_read_principal(tenant_id, int(user_id))
+        user = await _resolve_user(int(user_id))
+        if user is None or not user.is_active or user.tenant_id != tenant_id:
+            return 401, [(b"www-authenticate", b"Bearer")]
+
+        # Неизвестный ресурс/действие - отказ по умолчанию
+        key = resource_key.decode("latin-1") if resource_key else ""
+        act = action.decode("latin-1").lower() if action else ""
+        owner_id = int(owner) if owner and owner.isdigit() else None
+        if not key or act not in ACTION_BITS:
+            return 403, []
+
+        allowed = PermissionService.decide_cached(user, key, act, owner_id)
+        if allowed is None:
+            # Кэш матрицы отстает - решение через БД (реплику)
+            allowed = await PermissionService.has_permission(
+                user, key, act, owner_id, source="forward_auth"
+            )
+        else:
+            audit_buffer.record(
+                user.id,
+                user.role_id,
+                key,
+                act,
+                allowed,
+                source="forward_auth",
+                owner_id=owner_id,
+            )
+        if not allowed:
+            return 403, []
+
+        return 200, [
+            (b"x-user-id", str(user.id).encode()),
+            (b"x-user-role-id", str(user.role_id).encode()),
+            (b"x-user-role", user.role.name.encode()),
+            (b"x-tenant-id", str(tenant_id).encode()),
+        ]
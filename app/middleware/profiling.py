@@ -0,0 +1,103 @@
+"""
+Профилирование запроса по требованию.
+
+Запрос профилируется, если:
+    - пришел заголовок X-Profile: 1 от пользователя с ролью Admin, или
+    - он попал в долю PROFILER_SAMPLE_RATE (любой пользователь).
+Результат сохраняется в кольцо профилей (app/services/profiler_ops.py),
+id возвращается в заголовке X-Profile-Id; профиль доступен через
+GET /api/v1/admin/profiles/{id}.
+
+Выключенный путь - одно сравнение с долей и просмотр заголовков запроса,
+без аллокаций и без потоков.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.profiler_ops import StackSampler, new_profile_id, profile_store
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _requested_by_admin(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            if value != b"1":
+                return False
+            # Пользователя кладет AuthMiddleware (выполняется раньше)
+            user = scope.get("state", {}).get("user")
+            return user is not None and user.role.name == "Admin"
+    return False
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.sample_rate = settings.PROFILER_SAMPLE_RATE
+        self.interval_ms = settings.PROFILER_INTERVAL_MS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            trigger = "sampled"
+        elif _requested_by_admin(scope):
+            trigger = "header"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        await self._profile(scope, receive, send, trigger)
+
+    async def _profile(
+        self, scope: Scope, receive: Receive, send: Send, trigger: str
+    ) -> None:
+        profile_id = new_profile_id()
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), self.interval_ms / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            stacks = sampler.stop()
+            user = scope.get("state", {}).get("user")
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(duration_ms, 2),
+                "interval_ms": self.interval_ms,
+                "trigger": trigger,
+                "user_id": user.id if user is not None else None,
+                "created_at": time.time(),
+            }
+            # Запись на диск - вне event loop; ошибка диска не ломает запрос
+            try:
+                await asyncio.to_thread(profile_store.save, profile_id, stacks, meta)
+            except OSError:
+                logger.warning("Profile %s was not saved", profile_id, exc_info=True)
+            else:
+                metrics.inc("profiles_recorded")
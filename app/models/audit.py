@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class AuthzAuditLog(Base):
+    """
+    Журнал решений авторизации (allow/deny).
+    Пишется пачками из фонового буфера (app/services/audit_ops.py).
+    """
+
+    __tablename__ = "authz_audit_log"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    role_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    resource_key: Mapped[str] = mapped_column(String(50), nullable=False)
+    action: Mapped[str] = mapped_column(String(20), nullable=False)
+    owner_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    allowed: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    # Где принято решение: "dependency" (RequirePermission) или "service"
+    source: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<AuthzAuditLog(user={self.user_id}, {self.action} "
+            f"{self.resource_key}, allowed={self.allowed})>"
+        )
@@ -0,0 +1,25 @@
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class Order(Base):
+    """Заказ - эталонный ресурс для проверки RBAC (element key "orders")."""
+
+    __tablename__ = "orders"
+
+    # (owner_id, id): выборка "только свои" и keyset-пагинация одним индексом,
+    # (tenant_id, id): то же для read_all в пределах тенанта
+    __table_args__ = (
+        Index("ix_orders_owner_id", "owner_id", "id"),
+        Index("ix_orders_tenant_id", "tenant_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Order(id={self.id}, owner={self.owner_id})>"
@@ -1,6 +1,15 @@
-from typing import TYPE_CHECKING
-
-from sqlalchemy import Boolean, ForeignKey, String, UniqueConstraint
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -8,12 +17,39 @@ from app.models.base import Base
 if TYPE_CHECKING:
     from app.models.user import User  # type: ignore[import-untyped]
 
+# Упакованная маска прав: по одному биту на флаг AccessRolesRules
+CREATE = 1 << 0
+READ = 1 << 1
+READ_ALL = 1 << 2
+UPDATE = 1 << 3
+UPDATE_ALL = 1 << 4
+DELETE = 1 << 5
+DELETE_ALL = 1 << 6
+# У правила есть ABAC-условия: одной маски для решения недостаточно
+HAS_CONDITIONS = 1 << 7
+
+_FLAG_BITS = (
+    ("create_permission", CREATE),
+    ("read_permission", READ),
+    ("read_all_permission", READ_ALL),
+    ("update_permission", UPDATE),
+    ("update_all_permission", UPDATE_ALL),
+    ("delete_permission", DELETE),
+    ("delete_all_permission", DELETE_ALL),
+)
+
 
 class Role(Base):
     __tablename__ = "roles"
 
+    # Имя роли уникально в пределах тенанта
+    __table_args__ = (
+        Index("ix_roles_tenant_id_name", "tenant_id", "name", unique=True),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    name: Mapped[str] = mapped_column(String(50), unique=True, index=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+    name: Mapped[str] = mapped_column(String(50))
 
     users: Mapped[list["User"]] = relationship(back_populates="role")
 
@@ -23,10 +59,12 @@ class Role(Base):
     )
 
     def __repr__(self) -> str:
-        return f"<Role(id={self.id}, name={self.name})>"
+        return f"<Role(id={self.id}, tenant={self.tenant_id}, name={self.name})>"
 
 
 class BusinessElement(Base):
+    """Тип ресурса. Общий для всех тенантов: ключи задает код приложения."""
+
     __tablename__ = "business_elements"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
@@ -43,6 +81,7 @@ class AccessRolesRules(Base):
     """
     Таблица прав доступа (Matrix).
     Определяет, какие права есть у Role X на Element Y.
+    Тенант правила - тенант его роли.
     """
 
     __tablename__ = "access_roles_rules"
@@ -83,5 +122,77 @@ class AccessRolesRules(Base):
     delete_permission: Mapped[bool] = mapped_column(Boolean, default=False)
     delete_all_permission: Mapped[bool] = mapped_column(Boolean, default=False)
 
+    # ABAC-условия (см. app/services/abac_ops.py), None - без условий
+    conditions: Mapped[list[dict[str, Any]] | None] = mapped_column(JSON, nullable=True)
+
+    # Версия политики, в которой правило менялось последний раз
+    version: Mapped[int] = mapped_column(
+        Integer, default=1, server_default="1", index=True
+    )
+
+    @property
+    def permission_mask(self) -> int:
+        """CRUD-флаги правила, упакованные в маску."""
+        mask = 0
+        for field, bit in _FLAG_BITS:
+            if getattr(self, field):
+                mask |= bit
+        if self.conditions:
+            mask |= HAS_CONDITIONS
+        return mask
+
     def __repr__(self) -> str:
         return f"<Rule(role={self.role_id}, elem={self.element_id}, R={self.read_permission})>"
+
+
+class PolicyVersion(Base):
+    """
+    Версия политики тенанта (по строке на тенант).
+    Увеличивается в той же транзакции, что и любое изменение правил тенанта,
+    поэтому изменения одного тенанта не затрагивают кэши других.
+    """
+
+    __tablename__ = "policy_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(
+        ForeignKey("tenants.id"), unique=True, nullable=False
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<PolicyVersion(tenant={self.tenant_id}, version={self.version})>"
+
+
+class EffectivePermission(Base):
+    """
+    Денормализованная матрица прав: (role_id, element_key) -> маска.
+    Поддерживается триггерами БД из access_roles_rules, roles и
+    business_elements (миграция 9b3e4f7a1c58), приложение сюда не пишет.
+    Маска считается в триггере по тем же битам, что и permission_mask.
+    Тенант берется из роли; догрузка кэша идет по (tenant_id, version).
+    """
+
+    __tablename__ = "effective_permissions"
+
+    __table_args__ = (
+        Index("ix_effective_permissions_tenant_id_version", "tenant_id", "version"),
+    )
+
+    role_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    element_key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    rule_id: Mapped[int] = mapped_column(Integer, nullable=False, unique=True)
+    mask: Mapped[int] = mapped_column(Integer, nullable=False)
+    conditions: Mapped[list[dict[str, Any]] | None] = mapped_column(JSON, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    role_name: Mapped[str] = mapped_column(String(50), nullable=False)
+    element_name: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    @property
+    def flags(self) -> dict[str, bool]:
+        """CRUD-флаги в виде полей AccessRolesRules."""
+        return {field: bool(self.mask & bit) for field, bit in _FLAG_BITS}
+
+    def __repr__(self) -> str:
+        return f"<EffectivePermission(role={self.role_id}, key={self.element_key}, mask={self.mask})>"
@@ -0,0 +1,22 @@
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class Tenant(Base):
+    """
+    Организация-клиент. Пользователи, роли и правила принадлежат тенанту,
+    бизнес-элементы (типы ресурсов) общие для всех.
+    """
+
+    __tablename__ = "tenants"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    slug: Mapped[str] = mapped_column(
+        String(50), unique=True, index=True, nullable=False
+    )
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Tenant(id={self.id}, slug={self.slug})>"
@@ -1,6 +1,6 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import Boolean, ForeignKey, String
+from sqlalchemy import JSON, Boolean, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -12,12 +12,36 @@ if TYPE_CHECKING:
 class User(Base):
     __tablename__ = "users"
 
+    # Email уникален в пределах тенанта; индекс ведется по тенанту.
+    # (role_id, id): пользователи ролей keyset-страницами (обратный индекс прав).
+    # Справочник пользователей в админке: keyset по id внутри тенанта,
+    # активные пользователи роли - частичный индекс, префикс email -
+    # varchar_pattern_ops (побайтовое сравнение, не зависит от collation)
+    __table_args__ = (
+        Index("ix_users_tenant_id_email", "tenant_id", "email", unique=True),
+        Index("ix_users_role_id", "role_id", "id"),
+        Index("ix_users_tenant_id_id", "tenant_id", "id"),
+        Index(
+            "ix_users_role_id_active",
+            "role_id",
+            "id",
+            postgresql_where=text("is_active"),
+        ),
+        Index(
+            "ix_users_tenant_id_email_pattern",
+            "tenant_id",
+            "email",
+            postgresql_ops={"email": "varchar_pattern_ops"},
+        ),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
+    # Организация пользователя (claim "tid" в токене)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+
     # Личные данные
-    email: Mapped[str] = mapped_column(
-        String(255), unique=True, index=True, nullable=False
-    )
+    email: Mapped[str] = mapped_column(String(255), nullable=False)
     hashed_password: Mapped[str] = mapped_column(String, nullable=False)
     first_name: Mapped[str | None] = mapped_column(String(100), nullable=True)
     last_name: Mapped[str | None] = mapped_column(String(100), nullable=True)
@@ -25,6 +49,14 @@ class User(Base):
     # Системные поля
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
+    # Версия строки: растет при каждом изменении профиля (ETag /users/profile)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
+
+    # Произвольные атрибуты для ABAC-условий (department, region, ...)
+    attributes: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+
     # Внешний ключ на роль
     role_id: Mapped[int] = mapped_column(ForeignKey("roles.id"), nullable=False)
 
@@ -32,4 +64,7 @@ class User(Base):
     role: Mapped["Role"] = relationship(back_populates="users", lazy="joined")
 
     def __repr__(self) -> str:
-        return f"<User(id={self.id}, email={self.email}, active={self.is_active})>"
+        return (
+            f"<User(id={self.id}, tenant={self.tenant_id}, email={self.email}, "
+            f"active={self.is_active})>"
+        )
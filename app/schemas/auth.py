@@ -4,9 +4,22 @@ from pydantic import BaseModel
 class LoginRequest(BaseModel):
     email: str
     password: str
+    # slug организации, None - DEFAULT_TENANT
+    tenant: str | None = None
 
 
 class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
+
+
+# Ответ интроспекции (RFC 7662); у неактивного токена - только active=false
+class IntrospectionResponse(BaseModel):
+    active: bool
+    sub: str | None = None
+    role_id: int | None = None
+    tid: int | None = None
+    exp: int | None = None
+    # Права роли через пробел: orders:read (любые), orders:update:own (свои)
+    scope: str | None = None
@@ -0,0 +1,15 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class OrderRead(BaseModel):
+    id: int
+    title: str
+    owner_id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Страница списка (keyset: следующий запрос с after_id=next_after_id)
+class OrderPage(BaseModel):
+    items: list[OrderRead]
+    next_after_id: int | None = None
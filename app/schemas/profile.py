@@ -0,0 +1,17 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+# Метаданные сохраненного профиля запроса
+class ProfileInfo(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    interval_ms: float
+    samples: int
+    trigger: Literal["header", "sampled"]
+    user_id: int | None = None
+    created_at: float
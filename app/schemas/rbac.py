@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -11,6 +13,9 @@ class RuleBase(BaseModel):
     delete_permission: bool = False
     delete_all_permission: bool = False
 
+    # ABAC-условия, формат см. app/services/abac_ops.py
+    conditions: list[dict[str, Any]] | None = None
+
 
 # Схема для обновления
 class RuleUpdate(RuleBase):
@@ -24,3 +29,18 @@ class RuleRead(RuleBase):
     element_name: str
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# Пользователь, которому разрешено действие (обратный индекс прав)
+class AuthorizedUser(BaseModel):
+    id: int
+    email: str
+    role_id: int
+    all_scope: bool  # *_all_permission: любые объекты, иначе только свои
+    conditional: bool  # право ограничено ABAC-условиями правила
+
+
+# Страница (keyset: следующий запрос с after_id=next_after_id)
+class AuthorizedUserPage(BaseModel):
+    items: list[AuthorizedUser]
+    next_after_id: int | None = None
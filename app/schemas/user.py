@@ -1,4 +1,11 @@
-from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Self
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
+
+# Готовый bcrypt-хеш при переносе пользователей из другой системы
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+# bcrypt принимает не больше 72 байт пароля (bcrypt 5 на длинном - ValueError)
+_BCRYPT_MAX_PASSWORD_BYTES = 72
 
 
 # Базовая схема
@@ -12,6 +19,7 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
     password_confirm: str  # Поле для проверки, но в БД не пойдет
+    tenant: str | None = None  # slug организации; публично - только DEFAULT_TENANT
 
 
 # Схема для чтения
@@ -19,6 +27,54 @@ class UserRead(UserBase):
     id: int
     is_active: bool
     role_id: int
+    tenant_id: int
 
     # Настройка для работы с ORM объектами
     model_config = ConfigDict(from_attributes=True)
+
+
+# Строка справочника пользователей в админке (без пароля и ABAC-атрибутов)
+class UserDirectoryEntry(BaseModel):
+    id: int
+    email: str
+    first_name: str | None = None
+    last_name: str | None = None
+    is_active: bool
+    role_id: int
+    role_name: str
+
+
+# Страница (keyset: следующий запрос с after_id=next_after_id)
+class UserDirectoryPage(BaseModel):
+    items: list[UserDirectoryEntry]
+    next_after_id: int | None = None
+
+
+# Строка массового импорта (CSV/NDJSON): пароль или готовый bcrypt-хеш
+class UserImportRow(BaseModel):
+    email: EmailStr
+    password: str | None = None
+    password_hash: str | None = Field(default=None, min_length=60, max_length=60)
+    first_name: str | None = Field(default=None, max_length=100)
+    last_name: str | None = Field(default=None, max_length=100)
+    role: str | None = None  # имя роли тенанта, None - роль по умолчанию
+    is_active: bool = True
+
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    @model_validator(mode="after")
+    def check_password(self) -> Self:
+        if (self.password is None) == (self.password_hash is None):
+            raise ValueError("Exactly one of password and password_hash is required")
+        if (
+            self.password is not None
+            and len(self.password.encode("utf-8")) > _BCRYPT_MAX_PASSWORD_BYTES
+        ):
+            raise ValueError(
+                f"password must be at most {_BCRYPT_MAX_PASSWORD_BYTES} bytes"
+            )
+        if self.password_hash is not None and not self.password_hash.startswith(
+            _BCRYPT_PREFIXES
+        ):
+            raise ValueError("password_hash must be a bcrypt hash")
+        return self
@@ -0,0 +1,245 @@
+"""
+ABAC-условия поверх CRUD-матрицы.
+
+Условие правила хранится декларативно (JSON-список клауз) в
+`AccessRolesRules.conditions` и один раз компилируется в замыкание.
+Скомпилированные проверки кэшируются по (rule_id, version), поэтому
+на каждую проверку прав не происходит ни разбора JSON, ни аллокаций.
+
+Поддерживаемые клаузы:
+    {"op": "eq", "user": "department", "resource": "department"}
+    {"op": "eq", "resource": "status", "value": "draft"}
+    {"op": "ne" | "lt" | "lte" | "gt" | "gte", "resource": "amount", "value": 1000}
+    {"op": "in", "user": "region", "value": ["eu", "us"]}
+    {"op": "time_window", "start": "09:00", "end": "18:00", "weekdays": [0, 4]}
+
+Окно через полночь (start > end) и дни через воскресенье ([5, 1] -
+пятница..вторник) переходят через границу.
+"""
+
+import operator
+from collections.abc import Callable, Mapping
+from datetime import UTC, datetime, time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.models.users import User
+
+Condition = Callable[["User", Mapping[str, Any]], bool]
+Getter = Callable[["User", Mapping[str, Any]], Any]
+
+# Пустой ресурс без аллокации на каждый вызов
+EMPTY_RESOURCE: Mapping[str, Any] = MappingProxyType({})
+
+# Атрибуты пользователя, которые читаются напрямую с модели,
+# остальные ищутся в User.attributes
+_USER_COLUMNS = frozenset({"id", "email", "role_id", "tenant_id", "is_active"})
+
+_COMPARATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+
+_MISSING = object()
+
+
+class ConditionError(ValueError):
+    """Некорректное описание условия правила."""
+
+
+def _user_getter(name: str) -> Getter:
+    if name in _USER_COLUMNS:
+        getter = operator.attrgetter(name)
+        return lambda user, resource: getter(user)
+
+    def get_attribute(user: "User", resource: Mapping[str, Any]) -> Any:
+        attributes = user.attributes
+        if not attributes:
+            return _MISSING
+        return attributes.get(name, _MISSING)
+
+    return get_attribute
+
+
+def _resource_getter(name: str) -> Getter:
+    return lambda user, resource: resource.get(name, _MISSING)
+
+
+def _operands(clause: Mapping[str, Any]) -> tuple[Getter, Getter | None, Any]:
+    """Левый операнд всегда атрибут, правый - атрибут или константа."""
+    user_attr = clause.get("user")
+    resource_attr = clause.get("resource")
+
+    if user_attr is not None and resource_attr is not None:
+        return _user_getter(str(user_attr)), _resource_getter(str(resource_attr)), None
+    if "value" not in clause:
+        raise ConditionError(f"Clause {clause!r} needs 'value' or both attributes")
+    if user_attr is not None:
+        return _user_getter(str(user_attr)), None, clause["value"]
+    if resource_attr is not None:
+        return _resource_getter(str(resource_attr)), None, clause["value"]
+    raise ConditionError(f"Clause {clause!r} has no 'user' or 'resource' attribute")
+
+
+def _parse_time(value: Any) -> time:
+    try:
+        return time.fromisoformat(str(value))
+    except ValueError as exc:
+        raise ConditionError(f"Invalid time {value!r}") from exc
+
+
+def _compile_time_window(
+    clause: Mapping[str, Any], clock: Callable[[], datetime]
+) -> Condition:
+    start = _parse_time(clause.get("start", "00:00"))
+    end = _parse_time(clause.get("end", "23:59:59"))
+    weekdays_raw = clause.get("weekdays")
+    if weekdays_raw is not None:
+        # [from, to] включительно, 0 - понедельник; from > to - через воскресенье
+        try:
+            first, last = (int(day) for day in weekdays_raw)
+        except (TypeError, ValueError) as exc:
+            raise ConditionError(f"Invalid weekdays {weekdays_raw!r}") from exc
+        if not (0 <= first <= 6 and 0 <= last <= 6):
+            raise ConditionError(f"Weekdays must be in 0..6, got {weekdays_raw!r}")
+        weekdays = frozenset((first + day) % 7 for day in range((last - first) % 7 + 1))
+    else:
+        weekdays = frozenset(range(7))
+
+    overnight = start > end
+
+    def in_window(user: "User", resource: Mapping[str, Any]) -> bool:
+        now = clock()
+        if now.weekday() not in weekdays:
+            return False
+        current = now.time()
+        if overnight:
+            return current >= start or current <= end
+        return start <= current <= end
+
+    return in_window
+
+
+def _compile_clause(
+    clause: Mapping[str, Any], clock: Callable[[], datetime]
+) -> Condition:
+    if not isinstance(clause, Mapping):
+        raise ConditionError(f"Clause must be an object, got {clause!r}")
+
+    op = clause.get("op")
+    if op == "time_window":
+        return _compile_time_window(clause, clock)
+
+    left, right, constant = _operands(clause)
+
+    if op == "in":
+        if right is not None:
+            raise ConditionError("'in' compares an attribute with a constant list")
+        # Строка тоже итерируема: frozenset("eu") - это {"e", "u"}
+        if not isinstance(constant, list):
+            raise ConditionError(f"'in' expects a list, got {constant!r}")
+        try:
+            allowed = frozenset(constant)
+        except TypeError as exc:
+            raise ConditionError(
+                f"'in' expects scalar values, got {constant!r}"
+            ) from exc
+
+        def contains(user: "User", resource: Mapping[str, Any]) -> bool:
+            value = left(user, resource)
+            if value is _MISSING:
+                return False
+            # Атрибут - произвольный JSON: список или объект не хешируются
+            try:
+                return value in allowed
+            except TypeError:
+                return False
+
+        return contains
+
+    compare = _COMPARATORS.get(str(op))
+    if compare is None:
+        raise ConditionError(f"Unknown condition operator {op!r}")
+
+    if right is None:
+
+        def compare_constant(user: "User", resource: Mapping[str, Any]) -> bool:
+            value = left(user, resource)
+            if value is _MISSING or value is None:
+                return False
+            try:
+                return compare(value, constant)
+            except TypeError:
+                return False
+
+        return compare_constant
+
+    def compare_attributes(user: "User", resource: Mapping[str, Any]) -> bool:
+        left_value = left(user, resource)
+        right_value = right(user, resource)
+        if left_value is _MISSING or right_value is _MISSING:
+            return False
+        try:
+            return compare(left_value, right_value)
+        except TypeError:
+            return False
+
+    return compare_attributes
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def compile_conditions(
+    spec: list[dict[str, Any]], clock: Callable[[], datetime] = _utcnow
+) -> Condition:
+    """
+    Компиляция списка клауз в одну проверку (логическое И).
+    :raises ConditionError: если описание некорректно
+    """
+    if not isinstance(spec, list):
+        raise ConditionError("Conditions must be a list of clauses")
+
+    checks = tuple(_compile_clause(clause, clock) for clause in spec)
+
+    if not checks:
+        return lambda user, resource: True
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(user: "User", resource: Mapping[str, Any]) -> bool:
+        for check in checks:
+            if not check(user, resource):
+                return False
+        return True
+
+    return check_all
+
+
+class ConditionCache:
+    """Кэш скомпилированных условий по (rule_id, version)."""
+
+    def __init__(self) -> None:
+        self._compiled: dict[int, tuple[int, Condition]] = {}
+
+    def get(self, rule_id: int, version: int, spec: list[dict[str, Any]]) -> Condition:
+        cached = self._compiled.get(rule_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        condition = compile_conditions(spec)
+        # Старая версия вытесняется: одна запись на правило
+        self._compiled[rule_id] = (version, condition)
+        return condition
+
+    def clear(self) -> None:
+        self._compiled.clear()
+
+
+condition_cache = ConditionCache()
@@ -0,0 +1,168 @@
+"""
+Admission control: сколько запросов каждого класса выполняется одновременно
+и кто ждет освободившееся место первым.
+
+Под перегрузкой дорогие /auth/login и /auth/register (bcrypt) не должны
+конкурировать на равных с дешевыми чтениями по токену. Поэтому:
+    - общий лимит capacity на все запросы в работе;
+    - у класса свой лимит (credentials - несколько слотов, не больше);
+    - ожидающие стоят в очереди своего класса, освободившийся слот получает
+      голова очереди самого приоритетного класса, у которого есть место;
+    - очередь ограничена по длине и по времени ожидания: переполнение или
+      истекший дедлайн - быстрый отказ (503), а не рост латентности всех.
+
+Все вызовы - из одного event loop, блокировки не нужны.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable
+from functools import partial
+from typing import NamedTuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class RouteClass(NamedTuple):
+    name: str
+    # Меньше - важнее
+    priority: int
+    # Запросов класса в работе одновременно
+    limit: int
+    queue_size: int
+    queue_timeout: float
+
+
+class AdmissionController:
+    def __init__(self, capacity: int, classes: Iterable[RouteClass]) -> None:
+        self.capacity = capacity
+        self.classes = {route.name: route for route in classes}
+        self._by_priority = sorted(self.classes.values(), key=lambda r: r.priority)
+        self.inflight = 0
+        self._inflight = dict.fromkeys(self.classes, 0)
+        self._queues: dict[str, deque[asyncio.Future[None]]] = {
+            name: deque() for name in self.classes
+        }
+        for name in self.classes:
+            metrics.register_gauge(
+                f"admission_{name}_inflight", partial(self.inflight_of, name)
+            )
+            metrics.register_gauge(
+                f"admission_{name}_queued", partial(self.queued_of, name)
+            )
+
+    def inflight_of(self, name: str) -> float:
+        return float(self._inflight[name])
+
+    def queued_of(self, name: str) -> float:
+        return float(len(self._queues[name]))
+
+    def _has_room(self, route: RouteClass) -> bool:
+        return (
+            self.inflight < self.capacity and self._inflight[route.name] < route.limit
+        )
+
+    def _waiting_ahead(self, route: RouteClass) -> bool:
+        """Есть ли ожидающие того же или более важного класса, которых можно пустить."""
+        for other in self._by_priority:
+            if other.priority > route.priority:
+                return False
+            if self._queues[other.name] and self._inflight[other.name] < other.limit:
+                return True
+        return False
+
+    def _admit(self, route: RouteClass) -> None:
+        self.inflight += 1
+        self._inflight[route.name] += 1
+
+    async def acquire(self, name: str) -> bool:
+        """
+        Занять слот класса, при необходимости подождав в очереди.
+        :return: False - запрос нужно отбросить (очередь полна или дедлайн истек)
+        """
+        route = self.classes[name]
+        if self._has_room(route) and not self._waiting_ahead(route):
+            self._admit(route)
+            return True
+
+        queue = self._queues[name]
+        if len(queue) >= route.queue_size:
+            metrics.inc(f"admission_{name}_shed_queue_full")
+            return False
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, route.queue_timeout)
+        except TimeoutError:
+            # Слот мог достаться в момент истечения дедлайна - тогда он наш
+            if waiter.done() and not waiter.cancelled():
+                return True
+            self._discard(queue, waiter)
+            metrics.inc(f"admission_{name}_shed_deadline")
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(name)
+            else:
+                self._discard(queue, waiter)
+            raise
+        metrics.inc(f"admission_{name}_waited")
+        return True
+
+    @staticmethod
+    def _discard(
+        queue: deque[asyncio.Future[None]], waiter: asyncio.Future[None]
+    ) -> None:
+        # Отмененного ожидающего мог уже снять _dispatch
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, name: str) -> None:
+        self.inflight -= 1
+        self._inflight[name] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Освободившиеся слоты - головам очередей по приоритету классов."""
+        for route in self._by_priority:
+            queue = self._queues[route.name]
+            while queue and self._has_room(route):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self._admit(route)
+                waiter.set_result(None)
+            if self.inflight >= self.capacity:
+                return
+
+
+admission = AdmissionController(
+    capacity=settings.ADMISSION_MAX_CONCURRENCY,
+    classes=(
+        RouteClass(
+            "reads",
+            priority=0,
+            limit=settings.ADMISSION_MAX_CONCURRENCY,
+            queue_size=settings.ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        ),
+        RouteClass(
+            "default",
+            priority=1,
+            limit=settings.ADMISSION_MAX_CONCURRENCY,
+            queue_size=settings.ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        ),
+        RouteClass(
+            "credentials",
+            priority=2,
+            limit=settings.ADMISSION_CREDENTIALS_CONCURRENCY,
+            queue_size=settings.ADMISSION_CREDENTIALS_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_CREDENTIALS_QUEUE_TIMEOUT_MS / 1000,
+        ),
+    ),
+)
@@ -0,0 +1,148 @@
+"""
+Аудит решений авторизации с отложенной пакетной записью (write-behind).
+
+Решения складываются в кольцевой буфер в памяти процесса: все deny
+и доля allow (AUDIT_ALLOW_SAMPLE_RATE). Фоновая задача сбрасывает буфер
+в БД пачками одним bulk INSERT, поэтому запрос не ждет записи аудита.
+При переполнении буфера самые старые записи вытесняются и учитываются
+в счетчике audit_dropped.
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+from collections import deque
+from datetime import UTC, datetime
+from typing import NamedTuple
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import AsyncSessionLocal
+from app.models.audit import AuthzAuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditRecord(NamedTuple):
+    created_at: datetime
+    user_id: int | None
+    role_id: int | None
+    resource_key: str
+    action: str
+    owner_id: int | None
+    allowed: bool
+    source: str
+
+
+class AuditBuffer:
+    def __init__(self, capacity: int, batch_size: int, allow_sample_rate: float):
+        self.batch_size = batch_size
+        self.allow_sample_rate = allow_sample_rate
+        self._records: deque[AuditRecord] = deque(maxlen=capacity)
+        self._batch_ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def record(
+        self,
+        user_id: int | None,
+        role_id: int | None,
+        resource_key: str,
+        action: str,
+        allowed: bool,
+        source: str,
+        owner_id: int | None = None,
+    ) -> None:
+        """Учесть решение. Не ходит в БД и не блокирует запрос."""
+        if allowed and (
+            self.allow_sample_rate <= 0 or random.random() >= self.allow_sample_rate
+        ):
+            return
+
+        if len(self._records) == self._records.maxlen:
+            # deque с maxlen сам вытеснит самую старую запись
+            metrics.inc("audit_dropped")
+
+        self._records.append(
+            AuditRecord(
+                datetime.now(UTC),
+                user_id,
+                role_id,
+                resource_key,
+                action,
+                owner_id,
+                allowed,
+                source,
+            )
+        )
+        if len(self._records) >= self.batch_size:
+            self._batch_ready.set()
+
+    def drain(self) -> list[AuditRecord]:
+        """Забрать из буфера не больше batch_size записей."""
+        count = min(self.batch_size, len(self._records))
+        batch = [self._records.popleft() for _ in range(count)]
+        if len(self._records) < self.batch_size:
+            self._batch_ready.clear()
+        return batch
+
+    async def wait_batch(self, timeout: float) -> None:
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._batch_ready.wait(), timeout=timeout)
+
+    async def flush(self) -> int:
+        """Записать все накопленное пачками. Возвращает число записей."""
+        written = 0
+        while batch := self.drain():
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(
+                        insert(AuthzAuditLog), [r._asdict() for r in batch]
+                    )
+                    await session.commit()
+            except Exception:
+                # Пачка теряется: память буфера не должна расти из-за сбоя БД
+                metrics.inc("audit_flush_errors")
+                metrics.inc("audit_dropped", len(batch))
+                logger.exception("Audit flush failed, %s records dropped", len(batch))
+                break
+            written += len(batch)
+            metrics.inc("audit_written", len(batch))
+        return written
+
+
+audit_buffer = AuditBuffer(
+    capacity=settings.AUDIT_BUFFER_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    allow_sample_rate=settings.AUDIT_ALLOW_SAMPLE_RATE,
+)
+metrics.register_gauge("audit_buffered", lambda: float(len(audit_buffer)))
+
+_flush_task: asyncio.Task[None] | None = None
+
+
+async def _flush_loop() -> None:
+    while True:
+        await audit_buffer.wait_batch(settings.AUDIT_FLUSH_INTERVAL_SECONDS)
+        await audit_buffer.flush()
+
+
+async def start_audit_writer() -> None:
+    global _flush_task
+    if _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_audit_writer() -> None:
+    """Остановить фоновую запись и сбросить остаток буфера."""
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _flush_task
+        _flush_task = None
+    await audit_buffer.flush()
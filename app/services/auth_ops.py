@@ -1,10 +1,74 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
+from functools import cache
 from typing import Any
 
 import bcrypt
 from jose import ExpiredSignatureError, JWTError, jwt
+from sqlalchemy import update
 
 from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.db.session import AsyncSessionLocal
+from app.models.users import User
+
+logger = logging.getLogger(__name__)
+
+# bcrypt отпускает GIL, поэтому хеширование идет в отдельном пуле потоков,
+# а не в event loop. Размер пула ограничивает одновременное хеширование
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+# Запросы на хеширование (в работе + в очереди пула)
+_hash_pending = 0
+
+metrics.register_gauge("password_hash_pending", lambda: float(_hash_pending))
+
+
+@cache
+def _dummy_hash() -> bytes:
+    """
+    Хеш-заглушка для несуществующих email (считается один раз).
+    Стоимость - целевая, как у хешей реальных пользователей. Считается
+    в warm_up до приема трафика: иначе первый вход с неизвестным email
+    платил бы за два bcrypt и выдавал бы себя по времени.
+    """
+    return bcrypt.hashpw(
+        b"policymesh-dummy-password",
+        bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS),
+    )
+
+
+def _check_password(plain_password: str, hashed_password: str | None) -> bool:
+    if hashed_password is None:
+        # Та же работа, что и для существующего пользователя
+        bcrypt.checkpw(plain_password.encode("utf-8"), _dummy_hash())
+        return False
+    return bcrypt.checkpw(
+        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+    )
+
+
+async def _run_hashing[T](func: Callable[..., T], *args: Any) -> T:
+    """
+    Admission control для bcrypt: при переполнении очереди - быстрый отказ,
+    чтобы атака перебором не превращалась в DoS.
+    """
+    global _hash_pending
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        metrics.inc("password_hash_rejected")
+        raise ServiceUnavailableError("Password hashing capacity exhausted", 1)
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
 
 
 class AuthService:
@@ -17,11 +81,72 @@ class AuthService:
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        """Генерация хеша из пароля."""
-        salt = bcrypt.gensalt()
+        """Генерация хеша из пароля с целевой стоимостью (PASSWORD_HASH_ROUNDS)."""
+        salt = bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
         hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
         return hashed.decode("utf-8")
 
+    @staticmethod
+    async def verify_password_async(
+        plain_password: str, hashed_password: str | None
+    ) -> bool:
+        """
+        Сверка пароля в ограниченном пуле.
+        Для hashed_password=None (email не найден) выполняется сверка с заглушкой,
+        чтобы время ответа не выдавало существование аккаунта.
+        """
+        return await _run_hashing(_check_password, plain_password, hashed_password)
+
+    @staticmethod
+    async def prepare_dummy_hash() -> None:
+        """Посчитать хеш-заглушку заранее (прогрев при старте)."""
+        await asyncio.to_thread(_dummy_hash)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """Генерация хеша в ограниченном пуле."""
+        return await _run_hashing(AuthService.get_password_hash, password)
+
+    @staticmethod
+    def hash_rounds(hashed_password: str) -> int | None:
+        """Стоимость из хеша вида $2b$12$... (None, если формат не bcrypt)."""
+        parts = hashed_password.split("$")
+        if len(parts) != 4 or not parts[2].isdigit():
+            return None
+        return int(parts[2])
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        return AuthService.hash_rounds(hashed_password) != settings.PASSWORD_HASH_ROUNDS
+
+    @staticmethod
+    async def rehash_password(user_id: int, plain_password: str, old_hash: str) -> None:
+        """
+        Пересчитать хеш с целевой стоимостью (фоном после успешного входа).
+        Запись условная: если хеш успели сменить (смена пароля, параллельный
+        вход), новое значение не затирает его.
+        """
+        try:
+            new_hash = await AuthService.get_password_hash_async(plain_password)
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    update(User)
+                    .where(User.id == user_id, User.hashed_password == old_hash)
+                    .values(hashed_password=new_hash)
+                )
+                await session.commit()
+        except ServiceUnavailableError:
+            # Пул занят - пересчет случится при одном из следующих входов
+            metrics.inc("password_rehash_skipped")
+            return
+        except Exception:
+            metrics.inc("password_rehash_failed")
+            logger.exception("Password rehash failed for user %s", user_id)
+            return
+
+        if result.rowcount:  # type: ignore[attr-defined]
+            metrics.inc("password_rehashed")
+
     @staticmethod
     def create_access_token(
         data: dict[str, Any], expires_delta: timedelta | None = None
@@ -0,0 +1,80 @@
+"""
+Подбор стоимости bcrypt под бюджет задержки входа на текущем хосте.
+
+Замеряет время hashpw для последовательных значений rounds и рекомендует
+наибольшее, укладывающееся в бюджет. Запускать на железе, где работает
+сервис (стоимость зависит от CPU), результат - PASSWORD_HASH_ROUNDS.
+
+Запуск: poetry run python -m app.services.bcrypt_calibration --budget-ms 250
+"""
+
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+from app.core.config import settings
+
+_PASSWORD = b"calibration-password"
+
+
+def measure(rounds: int, samples: int) -> float:
+    """Медианное время одного hashpw (секунды)."""
+    timings = []
+    for _ in range(samples):
+        salt = bcrypt.gensalt(rounds=rounds)
+        started = time.perf_counter()
+        bcrypt.hashpw(_PASSWORD, salt)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(
+    budget_seconds: float, samples: int, min_rounds: int = 4
+) -> tuple[int, dict[int, float]]:
+    """
+    :return: рекомендованные rounds и замеры {rounds: секунды}
+    """
+    timings: dict[int, float] = {}
+    recommended = min_rounds
+    for rounds in range(min_rounds, 32):
+        timings[rounds] = measure(rounds, samples)
+        if timings[rounds] > budget_seconds:
+            break
+        recommended = rounds
+        # Каждый шаг удваивает время: следующий заведомо выйдет за бюджет
+        if timings[rounds] * 2 > budget_seconds * 1.5:
+            break
+    return recommended, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=250.0,
+        help="Допустимое время одной проверки пароля, мс",
+    )
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    recommended, timings = calibrate(args.budget_ms / 1000, args.samples)
+    for rounds, seconds in timings.items():
+        marker = "  <- recommended" if rounds == recommended else ""
+        if rounds == settings.PASSWORD_HASH_ROUNDS:
+            marker += "  (current)"
+        print(f"rounds={rounds:<3} {seconds * 1000:>9.1f} ms{marker}")
+
+    seconds = timings[recommended]
+    workers = settings.PASSWORD_HASH_WORKERS
+    print(
+        f"\nPASSWORD_HASH_ROUNDS={recommended}\n"
+        f"~{workers / seconds:.0f} logins/s per process "
+        f"with PASSWORD_HASH_WORKERS={workers}"
+    )
+
+
+if __name__ == "__main__":
+    main()
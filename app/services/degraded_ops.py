@@ -0,0 +1,161 @@
+"""
+Last-known-good режим при деградации БД.
+
+Каждый запрос авторизации к БД выполняется с бюджетом по времени
+(DB_LATENCY_BUDGET_MS) через circuit breaker. Если запрос не уложился
+в бюджет или упал, решение принимается по последнему успешно
+загруженному состоянию (пользователь из PrincipalCache, правила из
+PolicyCache), но не старше DEGRADED_MAX_STALENESS_SECONDS.
+
+Запрос под бюджетом выполняется в своей короткой сессии (read_session),
+а не в сессии роута: отмена по таймауту посреди запроса оставляет
+AsyncSession/соединение в неопределенном состоянии, и роут, продолжающий
+с ней работать, получил бы сломанную сессию.
+
+Пока breaker открыт, запросы пользователей в БД не ходят вообще.
+Проверкой восстановления (half-open) занимается только фоновая
+синхронизация политики, а не запросы пользователей.
+
+Фоновые загрузки (партиция тенанта целиком) идут со своим бюджетом
+DB_BACKGROUND_BUDGET_SECONDS: большая загрузка не укладывается в бюджет
+запроса, и ее таймаут не считается отказом БД для breaker-а.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.models.users import User
+
+# Ошибки, которые считаются деградацией БД, а не багом в запросе
+_DB_FAILURES = (TimeoutError, OperationalError, InterfaceError, OSError)
+
+
+class BreakerState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow(self, probe: bool = False) -> bool:
+        """
+        Можно ли идти в БД.
+        :param probe: вызов из фоновой задачи, которой разрешено проверять
+            восстановление после reset_timeout
+        """
+        if self.state is BreakerState.CLOSED:
+            return True
+        if (
+            probe
+            and self.state is BreakerState.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self.state = BreakerState.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self.state = BreakerState.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if (
+            self.state is BreakerState.HALF_OPEN
+            or self._failures >= self.failure_threshold
+        ):
+            if self.state is not BreakerState.OPEN:
+                metrics.inc("db_breaker_opened")
+            self.state = BreakerState.OPEN
+            self._opened_at = time.monotonic()
+
+
+db_breaker = CircuitBreaker(
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+)
+metrics.register_gauge(
+    "db_breaker_open", lambda: float(db_breaker.state is not BreakerState.CLOSED)
+)
+
+
+async def guarded[T](
+    call: Callable[[], Awaitable[T]], probe: bool = False, background: bool = False
+) -> T:
+    """
+    Выполнить обращение к БД с бюджетом по времени через breaker.
+    :param background: фоновая загрузка - бюджет DB_BACKGROUND_BUDGET_SECONDS,
+        таймаут не открывает breaker (ошибки соединения - открывают)
+    :raises ServiceUnavailableError: breaker открыт, таймаут или ошибка БД
+    """
+    if not db_breaker.allow(probe):
+        metrics.inc("db_breaker_rejected")
+        raise ServiceUnavailableError("Database circuit is open")
+
+    budget = (
+        settings.DB_BACKGROUND_BUDGET_SECONDS
+        if background
+        else settings.DB_LATENCY_BUDGET_MS / 1000
+    )
+    try:
+        result = await asyncio.wait_for(call(), timeout=budget)
+    except TimeoutError as exc:
+        if background:
+            metrics.inc("db_background_timeouts")
+            raise ServiceUnavailableError(
+                "Database background budget exceeded"
+            ) from exc
+        metrics.inc("db_timeouts")
+        db_breaker.record_failure()
+        raise ServiceUnavailableError("Database latency budget exceeded") from exc
+    except _DB_FAILURES as exc:
+        metrics.inc("db_errors")
+        db_breaker.record_failure()
+        raise ServiceUnavailableError("Database is unavailable") from exc
+
+    db_breaker.record_success()
+    return result
+
+
+class PrincipalCache:
+    """LRU последних успешно загруженных пользователей (last-known-good)."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._users: OrderedDict[int, tuple[User, float]] = OrderedDict()
+
+    def put(self, user: User) -> None:
+        self._users[user.id] = (user, time.monotonic())
+        self._users.move_to_end(user.id)
+        if len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def get_stale(self, user_id: int, max_age: float) -> User | None:
+        cached = self._users.get(user_id)
+        if cached is None:
+            return None
+        user, loaded_at = cached
+        if time.monotonic() - loaded_at > max_age:
+            return None
+        return user
+
+    def discard(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE)
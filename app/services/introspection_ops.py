@@ -0,0 +1,248 @@
+"""
+Интроспекция токенов (RFC 7662) для resource server-ов без общего HS256-ключа.
+
+Ответ зависит от подписи и exp токена (TokenCache), активности пользователя
+и прав его роли. Он кэшируется по дайджесту токена на
+INTROSPECTION_CACHE_TTL_SECONDS (не дольше exp), поэтому нагрузка на БД
+растет с числом разных токенов, а не с числом запросов интроспекции.
+
+Сброс:
+    - logout: токен отзывается до своего exp (ответ active=false). Отзыв
+      рассылается всем воркерам через нотификатор политики и хранится
+      отдельно от LRU ответов: вытеснение его не отменяет;
+    - удаление профиля: сбрасываются ответы всех токенов пользователя.
+Кэш ответов - в памяти процесса, как и остальные кэши авторизации: в других
+воркерах ответ устаревает не дольше TTL.
+"""
+
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.db.replicas import read_session
+from app.middleware.authentication import AuthMiddleware
+from app.models.rbac import EffectivePermission
+from app.models.users import User
+from app.schemas.auth import IntrospectionResponse
+from app.services.degraded_ops import guarded, principal_cache
+from app.services.negative_cache import rejected_users, token_digest
+from app.services.permission_ops import ACTION_BITS
+from app.services.policy_cache import policy_cache
+from app.services.policy_version_ops import get_notifier
+from app.services.token_cache import token_cache
+
+logger = logging.getLogger(__name__)
+
+INACTIVE = IntrospectionResponse(active=False)
+
+
+def permission_scope(rules: Iterable[tuple[str, int]]) -> str:
+    """Маски роли -> scope: "orders:read" - любые объекты, "orders:read:own" - свои."""
+    parts = []
+    for key, mask in sorted(rules):
+        for action, (own_bit, all_bit) in ACTION_BITS.items():
+            if mask & all_bit:
+                parts.append(f"{key}:{action}")
+            elif mask & own_bit:
+                parts.append(f"{key}:{action}:own")
+    return " ".join(parts)
+
+
+class IntrospectionCache:
+    """LRU ответов по дайджесту токена с индексом токенов пользователя."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        # дайджест -> (ответ, момент истечения, id пользователя)
+        self._entries: OrderedDict[
+            bytes, tuple[IntrospectionResponse, float, int | None]
+        ] = OrderedDict()
+        self._by_user: defaultdict[int, set[bytes]] = defaultdict(set)
+        # Отозванные токены: дайджест -> exp. Не вытесняются, истекшие
+        # удаляются, когда словарь вырастает вдвое
+        self._revoked: dict[bytes, float] = {}
+        self._prune_at = 1024
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: bytes) -> IntrospectionResponse | None:
+        exp = self._revoked.get(digest)
+        if exp is not None and time.time() < exp:
+            return INACTIVE
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        response, expires_at, _ = entry
+        if time.time() >= expires_at:
+            self._drop(digest)
+            return None
+        self._entries.move_to_end(digest)
+        return response
+
+    def put(
+        self,
+        digest: bytes,
+        response: IntrospectionResponse,
+        expires_at: float,
+        user_id: int | None = None,
+    ) -> None:
+        self._drop(digest)
+        self._entries[digest] = (response, expires_at, user_id)
+        if user_id is not None:
+            self._by_user[user_id].add(digest)
+        if len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def revoke(self, digest: bytes, exp: float) -> None:
+        """Отозванный токен неактивен до своего exp."""
+        self._drop(digest)
+        self._revoked[digest] = exp
+        if len(self._revoked) >= self._prune_at:
+            now = time.time()
+            self._revoked = {d: e for d, e in self._revoked.items() if e > now}
+            self._prune_at = max(1024, 2 * len(self._revoked))
+
+    def invalidate_user(self, user_id: int) -> None:
+        for digest in self._by_user.pop(user_id, ()):
+            self._entries.pop(digest, None)
+
+    def _drop(self, digest: bytes) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is None or entry[2] is None:
+            return
+        digests = self._by_user.get(entry[2])
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[entry[2]]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+        self._revoked.clear()
+
+
+introspection_cache = IntrospectionCache(
+    settings.INTROSPECTION_CACHE_SIZE, settings.INTROSPECTION_CACHE_TTL_SECONDS
+)
+metrics.register_gauge(
+    "introspection_cache_size", lambda: float(len(introspection_cache))
+)
+
+
+def start_revocation_sync() -> None:
+    """Принимать отзывы токенов от других воркеров (до запуска нотификатора)."""
+    get_notifier().subscribe_revocations(introspection_cache.revoke)
+
+
+class IntrospectionService:
+    @staticmethod
+    async def revoke(token: str, exp: float) -> None:
+        """Отозвать токен до exp в этом воркере и разослать отзыв остальным."""
+        digest = token_digest(token)
+        introspection_cache.revoke(digest, exp)
+        try:
+            await get_notifier().publish_revocation(digest, exp)
+        except Exception:
+            metrics.inc("token_revocation_publish_failures")
+            logger.warning("Token revocation not propagated", exc_info=True)
+
+    @staticmethod
+    async def introspect(token: str) -> IntrospectionResponse:
+        digest = token_digest(token)
+        cached = introspection_cache.get(digest)
+        if cached is not None:
+            metrics.inc("introspection_cache_hits")
+            return cached
+        metrics.inc("introspection_cache_misses")
+
+        # Подпись и exp; невалидный токен запоминает негативный кэш
+        payload = token_cache.decode(token)
+        if payload is None:
+            return INACTIVE
+        user_id, tenant_id, exp = (
+            payload.get("sub"),
+            payload.get("tid"),
+            payload.get("exp"),
+        )
+        if (
+            not isinstance(user_id, str)
+            or not user_id.isdigit()
+            or not isinstance(tenant_id, int)
+            # Токен без exp не выдается - такой считается неактивным
+            or not isinstance(exp, int)
+        ):
+            return INACTIVE
+
+        user = await IntrospectionService._user(int(user_id))
+        expires_at = min(time.time() + introspection_cache.ttl, exp)
+        if user is None or not user.is_active or user.tenant_id != tenant_id:
+            if user is not None:
+                introspection_cache.put(digest, INACTIVE, expires_at, user.id)
+            return INACTIVE
+
+        response = IntrospectionResponse(
+            active=True,
+            sub=user_id,
+            role_id=user.role_id,
+            tid=tenant_id,
+            exp=exp,
+            scope=permission_scope(
+                await IntrospectionService._role_masks(tenant_id, user.role_id)
+            ),
+        )
+        introspection_cache.put(digest, response, expires_at, user.id)
+        return response
+
+    @staticmethod
+    async def _user(user_id: int) -> User | None:
+        """Пользователь из БД (single-flight), при деградации - last-known-good."""
+        if rejected_users.get(user_id) is not None:
+            return None
+        try:
+            user = await AuthMiddleware.fetch_user(user_id)
+        except ServiceUnavailableError:
+            user = principal_cache.get_stale(
+                user_id, settings.DEGRADED_MAX_STALENESS_SECONDS
+            )
+            if user is None:
+                raise
+            metrics.inc("degraded_principal_decisions")
+            return user
+        if user is None:
+            rejected_users.add(user_id, "User not found")
+        else:
+            principal_cache.put(user)
+            if not user.is_active:
+                rejected_users.add(user_id, "User is inactive")
+        return user
+
+    @staticmethod
+    async def _role_masks(tenant_id: int, role_id: int) -> list[tuple[str, int]]:
+        """Маски роли на элементы: из актуальной матрицы тенанта, иначе из БД."""
+        matrix = policy_cache.matrix(tenant_id)
+        if matrix is not None:
+            _, rules = matrix
+            return [
+                (key, entry.mask)
+                for (rid, key), entry in rules.items()
+                if rid == role_id
+            ]
+
+        stmt = select(EffectivePermission.element_key, EffectivePermission.mask).where(
+            EffectivePermission.role_id == role_id
+        )
+
+        async def query() -> list[tuple[str, int]]:
+            async with read_session() as session:
+                return list((await session.execute(stmt)).tuples())
+
+        return await guarded(query)
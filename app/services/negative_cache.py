@@ -0,0 +1,82 @@
+"""
+Негативный кэш: недавно отвергнутые токены и пользователи.
+
+Повтор заведомо плохих учетных данных (битый/чужой/просроченный JWT,
+удаленный или деактивированный пользователь) получает 401 без проверки
+подписи и без SELECT в users.
+
+Кэш отдельный от позитивных (TokenCache, PrincipalCache) и ограничен по
+размеру: поток мусорных токенов вытесняет только старые негативные записи.
+TTL у всех записей одинаковый, поэтому порядок вставки совпадает с порядком
+истечения и вытесняется всегда самая старая запись (FIFO).
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class NegativeCache:
+    def __init__(self, name: str, max_size: int, ttl: float) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._hits = f"negative_cache_{name}_hits"
+        self._inserts = f"negative_cache_{name}_inserts"
+        self._evictions = f"negative_cache_{name}_evictions"
+        # ключ -> (причина отказа, момент истечения)
+        self._entries: OrderedDict[Hashable, tuple[str, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> str | None:
+        """Причина недавнего отказа или None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        reason, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        metrics.inc(self._hits)
+        return reason
+
+    def add(self, key: Hashable, reason: str) -> None:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            # Живая запись не продлевается: порядок вставки = порядок истечения
+            if now < entry[1]:
+                return
+            del self._entries[key]
+        self._entries[key] = (reason, now + self.ttl)
+        metrics.inc(self._inserts)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            metrics.inc(self._evictions)
+
+    def discard(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def token_digest(token: str) -> bytes:
+    """Ключ для токена: сам токен в памяти не храним."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+bad_tokens = NegativeCache(
+    "tokens", settings.NEGATIVE_CACHE_SIZE, settings.NEGATIVE_CACHE_TTL_SECONDS
+)
+rejected_users = NegativeCache(
+    "users", settings.NEGATIVE_CACHE_SIZE, settings.NEGATIVE_CACHE_TTL_SECONDS
+)
+metrics.register_gauge("negative_cache_tokens_size", lambda: float(len(bad_tokens)))
+metrics.register_gauge("negative_cache_users_size", lambda: float(len(rejected_users)))
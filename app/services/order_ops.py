@@ -0,0 +1,122 @@
+"""
+Репозиторий заказов.
+
+SqlOrderRepository - основная реализация поверх таблицы orders.
+InMemoryOrderRepository - для тестов: словарь по id + вторичные индексы
+по тенанту и владельцу, id выдаются атомарным счетчиком и никогда не
+повторяются. Обе реализации отдают keyset-страницы (id > after_id ORDER BY id)
+и не видят заказы чужого тенанта.
+"""
+
+import itertools
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.orders import Order
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class OrderRepository(ABC):
+    @abstractmethod
+    async def get(self, order_id: int, tenant_id: int) -> Order | None: ...
+
+    @abstractmethod
+    async def create(self, title: str, owner_id: int, tenant_id: int) -> Order: ...
+
+    @abstractmethod
+    async def delete(self, order_id: int) -> bool: ...
+
+    @abstractmethod
+    async def list(
+        self, tenant_id: int, owner_id: int | None, after_id: int | None, limit: int
+    ) -> list[Order]:
+        """
+        Страница заказов тенанта по возрастанию id.
+        :param owner_id: только заказы владельца (None - все заказы тенанта)
+        :param after_id: последний id предыдущей страницы
+        """
+
+
+class SqlOrderRepository(OrderRepository):
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def get(self, order_id: int, tenant_id: int) -> Order | None:
+        order = await self.db.get(Order, order_id)
+        return order if order is not None and order.tenant_id == tenant_id else None
+
+    async def create(self, title: str, owner_id: int, tenant_id: int) -> Order:
+        # id выдает последовательность БД - без коллизий после удаления
+        order = Order(title=title, owner_id=owner_id, tenant_id=tenant_id)
+        self.db.add(order)
+        await self.db.commit()
+        await self.db.refresh(order)
+        return order
+
+    async def delete(self, order_id: int) -> bool:
+        result = await self.db.execute(delete(Order).where(Order.id == order_id))
+        await self.db.commit()
+        return bool(result.rowcount)  # type: ignore[attr-defined]
+
+    async def list(
+        self, tenant_id: int, owner_id: int | None, after_id: int | None, limit: int
+    ) -> list[Order]:
+        stmt = select(Order).order_by(Order.id).limit(limit)
+        if owner_id is not None:
+            # Индекс (owner_id, id); владелец всегда из того же тенанта
+            stmt = stmt.where(Order.owner_id == owner_id)
+        else:
+            # Индекс (tenant_id, id)
+            stmt = stmt.where(Order.tenant_id == tenant_id)
+        if after_id is not None:
+            stmt = stmt.where(Order.id > after_id)
+        return list((await self.db.execute(stmt)).scalars().all())
+
+
+class InMemoryOrderRepository(OrderRepository):
+    def __init__(self) -> None:
+        self._orders: dict[int, Order] = {}
+        # Вторичные индексы: dict как упорядоченное множество id. id монотонно
+        # растут, поэтому порядок вставки совпадает с сортировкой, а удаление -
+        # O(1)
+        self._by_tenant: dict[int, dict[int, None]] = {}
+        self._by_owner: dict[int, dict[int, None]] = {}
+        self._next_id = itertools.count(1)
+
+    async def get(self, order_id: int, tenant_id: int) -> Order | None:
+        order = self._orders.get(order_id)
+        return order if order is not None and order.tenant_id == tenant_id else None
+
+    async def create(self, title: str, owner_id: int, tenant_id: int) -> Order:
+        order = Order(
+            id=next(self._next_id), title=title, owner_id=owner_id, tenant_id=tenant_id
+        )
+        self._orders[order.id] = order
+        self._by_tenant.setdefault(tenant_id, {})[order.id] = None
+        self._by_owner.setdefault(owner_id, {})[order.id] = None
+        return order
+
+    async def delete(self, order_id: int) -> bool:
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        self._by_tenant[order.tenant_id].pop(order_id, None)
+        self._by_owner[order.owner_id].pop(order_id, None)
+        return True
+
+    async def list(
+        self, tenant_id: int, owner_id: int | None, after_id: int | None, limit: int
+    ) -> list[Order]:
+        if owner_id is None:
+            ids = self._by_tenant.get(tenant_id, {})
+        else:
+            ids = self._by_owner.get(owner_id, {})
+        page: Iterator[int] = iter(ids)
+        if after_id is not None:
+            page = itertools.dropwhile(lambda order_id: order_id <= after_id, page)
+        return [self._orders[order_id] for order_id in itertools.islice(page, limit)]
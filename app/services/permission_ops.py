@@ -1,79 +1,277 @@
+from collections.abc import Mapping
+from typing import Any
+
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.rbac import AccessRolesRules, BusinessElement
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.db.replicas import read_session
+from app.models.rbac import (
+    CREATE,
+    DELETE,
+    DELETE_ALL,
+    HAS_CONDITIONS,
+    READ,
+    READ_ALL,
+    UPDATE,
+    UPDATE_ALL,
+    EffectivePermission,
+)
 from app.models.users import User
+from app.services.abac_ops import EMPTY_RESOURCE, condition_cache
+from app.services.audit_ops import audit_buffer
+from app.services.degraded_ops import guarded
+from app.services.policy_cache import RuleEntry, policy_cache
+from app.services.policy_snapshot import get_snapshot_reader
+from app.services.single_flight import mask_loads, rule_loads
+
+# action -> (бит "свои", бит "все"). Для create владелец не проверяется
+ACTION_BITS: dict[str, tuple[int, int]] = {
+    "create": (0, CREATE),
+    "read": (READ, READ_ALL),
+    "update": (UPDATE, UPDATE_ALL),
+    "delete": (DELETE, DELETE_ALL),
+}
+
+
+def check_mask(mask: int, action: str, user_id: int, owner_id: int | None) -> bool:
+    """
+    Проверка действия по маске с учетом владения объектом.
+    Сначала глобальное право (`_all`), затем локальное + владение.
+    """
+    bits = ACTION_BITS.get(action)
+    if bits is None:
+        return False
+    own_bit, all_bit = bits
+
+    if mask & all_bit:
+        return True
+    if mask & own_bit and owner_id is not None:
+        return user_id == owner_id
+    return False
+
+
+def mask_allows_any(mask: int, action: str) -> bool:
+    """Есть ли у маски ЛИБО локальное, ЛИБО глобальное право на действие."""
+    own_bit, all_bit = ACTION_BITS[action]
+    return bool(mask & (own_bit | all_bit))
 
 
 class PermissionService:
     @staticmethod
     async def has_permission(
-        db: AsyncSession,
         user: User,
         resource_key: str,
         action: str,
         owner_id: int | None = None,
+        resource: Mapping[str, Any] | None = None,
+        source: str = "service",
     ) -> bool:
         """
         Главная функция авторизации.
-        :param db: Сессия БД
         :param user: Объект пользователя
         :param resource_key: Ключ элемента (например, "orders")
         :param action: "create", "read", "update", "delete"
         :param owner_id: ID владельца объекта (если применимо)
+        :param resource: Атрибуты объекта для ABAC-условий правила
+        :param source: Точка проверки для аудита
         """
+        allowed = await PermissionService._decide(
+            user, resource_key, action, owner_id, resource
+        )
+        audit_buffer.record(
+            user.id,
+            user.role_id,
+            resource_key,
+            action,
+            allowed,
+            source=source,
+            owner_id=owner_id,
+        )
+        return allowed
 
+    @staticmethod
+    def decide_cached(
+        user: User,
+        resource_key: str,
+        action: str,
+        owner_id: int | None = None,
+        resource: Mapping[str, Any] | None = None,
+    ) -> bool | None:
+        """
+        Решение без обращения к БД: по mmap-снимку или актуальному кэшу матрицы.
+        :return: None, если кэш отстает и нужен запрос в БД
+        """
         # Если пользователь неактивен — отказ сразу
         if not user.is_active:
             return False
 
-        # Поиск правила для роли пользователя и конкретного ресурса
-        # Join с BusinessElement нужен, чтобы найти по строке, а не ID
-        stmt = (
-            select(AccessRolesRules)
-            .join(BusinessElement)
-            .where(
-                AccessRolesRules.role_id == user.role_id,
-                BusinessElement.key == resource_key,
-            )
+        # Правило без ABAC-условий решается по маске из mmap-снимка.
+        # Снимок общий для тенантов: role_id не повторяется между ними
+        mask = PermissionService._snapshot_mask(
+            user.tenant_id, user.role_id, resource_key
+        )
+        if mask is not None and not mask & HAS_CONDITIONS:
+            return check_mask(mask, action, user.id, owner_id)
+
+        if not policy_cache.is_fresh(user.tenant_id):
+            return None
+        return PermissionService._decide_entry(
+            policy_cache.get(user.tenant_id, user.role_id, resource_key),
+            user,
+            action,
+            owner_id,
+            resource,
+        )
+
+    @staticmethod
+    def _snapshot_mask(tenant_id: int, role_id: int, resource_key: str) -> int | None:
+        """
+        Маска из mmap-снимка, если он собран не раньше последней известной
+        узлу версии политики тенанта. None - снимка нет или он отстает.
+        """
+        reader = get_snapshot_reader()
+        latest = policy_cache.latest(tenant_id)
+        if reader is None or latest is None:
+            return None
+        return reader.lookup(role_id, resource_key, tenant_id, latest)
+
+    @staticmethod
+    async def _decide(
+        user: User,
+        resource_key: str,
+        action: str,
+        owner_id: int | None,
+        resource: Mapping[str, Any] | None,
+    ) -> bool:
+        decision = PermissionService.decide_cached(
+            user, resource_key, action, owner_id, resource
         )
+        if decision is not None:
+            return decision
 
-        result = await db.execute(stmt)
-        rule = result.scalar_one_or_none()
+        entry = await PermissionService.get_rule(
+            user.tenant_id, user.role_id, resource_key
+        )
+        return PermissionService._decide_entry(entry, user, action, owner_id, resource)
 
+    @staticmethod
+    def _decide_entry(
+        entry: RuleEntry | None,
+        user: User,
+        action: str,
+        owner_id: int | None,
+        resource: Mapping[str, Any] | None,
+    ) -> bool:
         # Если правила нет в БД — доступ запрещен
-        if not rule:
+        if entry is None:
             return False
 
         # Логика проверки прав
+        if not check_mask(entry.mask, action, user.id, owner_id):
+            return False
+
+        # ABAC-условия проверяются только если флаги уже разрешили доступ
+        if entry.conditions:
+            condition = condition_cache.get(
+                entry.rule_id, entry.version, entry.conditions
+            )
+            return condition(user, resource if resource is not None else EMPTY_RESOURCE)
+
+        return True
+
+    @staticmethod
+    async def get_rule(
+        tenant_id: int, role_id: int, resource_key: str
+    ) -> RuleEntry | None:
+        """
+        Правило роли на элемент: из кэша матрицы тенанта, если он актуален,
+        иначе из БД (своя сессия на реплике, в рамках бюджета).
+        """
+        if policy_cache.is_fresh(tenant_id):
+            return policy_cache.get(tenant_id, role_id, resource_key)
+        policy_cache.request(tenant_id)
+
+        # Денормализованная матрица: поиск по первичному ключу без join
+        stmt = select(
+            EffectivePermission.rule_id,
+            EffectivePermission.version,
+            EffectivePermission.mask,
+            EffectivePermission.conditions,
+        ).where(
+            EffectivePermission.role_id == role_id,
+            EffectivePermission.element_key == resource_key,
+        )
+
+        async def query() -> RuleEntry | None:
+            async with read_session() as session:
+                row = (await session.execute(stmt)).one_or_none()
+            return RuleEntry(*row) if row is not None else None
+
+        async def load() -> RuleEntry | None:
+            return await guarded(query)
+
+        # Одновременные промахи по одному правилу - один запрос в БД
+        try:
+            return await rule_loads.do((tenant_id, role_id, resource_key), load)
+        except ServiceUnavailableError as exc:
+            return PermissionService._last_known_rule(
+                tenant_id, role_id, resource_key, exc
+            )
+
+    @staticmethod
+    def _last_known_rule(
+        tenant_id: int,
+        role_id: int,
+        resource_key: str,
+        error: ServiceUnavailableError,
+    ) -> RuleEntry | None:
+        """
+        Last-known-good: решение по последней загруженной матрице тенанта.
+        Если она не загружена или слишком старая - исходная ошибка БД.
+        """
+        if (
+            not policy_cache.is_loaded(tenant_id)
+            or policy_cache.age(tenant_id) > settings.DEGRADED_MAX_STALENESS_SECONDS
+        ):
+            raise error
+        metrics.inc("degraded_permission_decisions")
+        return policy_cache.get(tenant_id, role_id, resource_key)
+
+    @staticmethod
+    async def get_mask(tenant_id: int, role_id: int, resource_key: str) -> int:
+        """Маска прав роли тенанта на элемент (0 - правила нет)."""
+        snapshot_mask = PermissionService._snapshot_mask(
+            tenant_id, role_id, resource_key
+        )
+        if snapshot_mask is not None:
+            return snapshot_mask
+
+        if policy_cache.is_fresh(tenant_id):
+            entry = policy_cache.get(tenant_id, role_id, resource_key)
+            return entry.mask if entry is not None else 0
+        policy_cache.request(tenant_id)
+
+        # Маска входит в INCLUDE первичного ключа: index-only scan
+        stmt = select(EffectivePermission.mask).where(
+            EffectivePermission.role_id == role_id,
+            EffectivePermission.element_key == resource_key,
+        )
+
+        async def query() -> int | None:
+            async with read_session() as session:
+                return (await session.execute(stmt)).scalar_one_or_none()
+
+        async def load() -> int | None:
+            return await guarded(query)
+
+        try:
+            mask = await mask_loads.do((tenant_id, role_id, resource_key), load)
+        except ServiceUnavailableError as exc:
+            entry = PermissionService._last_known_rule(
+                tenant_id, role_id, resource_key, exc
+            )
+            return entry.mask if entry is not None else 0
 
-        match action:
-            case "create":
-                # Для создания без проверки владельца
-                return rule.create_permission
-
-            case "read":
-                # проверка глобального права
-                if rule.read_all_permission:
-                    return True
-                # Если глобального нет, проверяем локальное ("Читать свои") + владение
-                if rule.read_permission and owner_id is not None:
-                    return user.id == owner_id
-                return False
-
-            case "update":
-                if rule.update_all_permission:
-                    return True
-                if rule.update_permission and owner_id is not None:
-                    return user.id == owner_id
-                return False
-
-            case "delete":
-                if rule.delete_all_permission:
-                    return True
-                if rule.delete_permission and owner_id is not None:
-                    return user.id == owner_id
-                return False
-
-            case _:
-                return False
+        return mask if mask is not None else 0
@@ -0,0 +1,392 @@
+"""
+In-process кэш матрицы прав с когерентностью по версии политики тенанта.
+
+Кэш разбит на партиции по тенантам: у каждой своя матрица
+(role_id, element_key) -> RuleEntry и номер версии тенанта, до которой она
+загружена. Новая версия приходит через нотификатор или периодический опрос
+и помечает устаревшей только партицию своего тенанта; затем догружаются
+строки `EffectivePermission.version > загруженной версии` этого тенанта.
+Удаление строки или смена ее ключа (переименование элемента) так не видны:
+если после догрузки число строк партиции разошлось с числом строк тенанта
+в БД, партиция перезагружается целиком. Пока партиция отстает, проверки прав тенанта идут в БД напрямую, остальные
+тенанты продолжают работать из кэша.
+
+Проверки прав только читают кэш. Тенант без партиции проверяется через БД
+и просит загрузку (request); принимает его фоновая синхронизация. Партиции
+вытесняются целиком (POLICY_CACHE_MAX_TENANTS), и только простаивающие
+дольше POLICY_CACHE_IDLE_SECONDS: когда активных тенантов больше лимита,
+лишние работают через БД, а не вытесняют друг друга по кругу.
+
+Последняя известная версия ведется для всех тенантов, а не только
+загруженных: по ней проверяется mmap-снимок матрицы. Снимок, отстающий от
+нее, не используется и пересобирается фоновой синхронизацией.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Mapping, Sequence
+from functools import partial
+from typing import Any, NamedTuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.db.replicas import read_session
+from app.models.rbac import EffectivePermission
+from app.services.degraded_ops import guarded
+from app.services.policy_snapshot import get_snapshot_reader, rebuild_snapshot
+from app.services.policy_version_ops import PolicyVersionService, get_notifier
+
+logger = logging.getLogger(__name__)
+
+
+class RuleEntry(NamedTuple):
+    rule_id: int
+    version: int
+    mask: int
+    conditions: list[dict[str, Any]] | None
+
+
+class TenantPolicy:
+    """Партиция кэша: матрица одного тенанта."""
+
+    __slots__ = (
+        "rules",
+        "version",
+        "latest",
+        "loaded",
+        "refreshed_at",
+        "used_at",
+        "lock",
+    )
+
+    def __init__(self) -> None:
+        self.rules: dict[tuple[int, str], RuleEntry] = {}
+        self.version = 0
+        self.latest = 0
+        self.loaded = False
+        self.refreshed_at = 0.0
+        self.used_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded and self.version >= self.latest
+
+
+def _apply(
+    rules: dict[tuple[int, str], RuleEntry], rows: Sequence[Row[Any]]
+) -> dict[tuple[int, str], RuleEntry]:
+    for role_id, key, rule_id, version, mask, conditions in rows:
+        rules[(role_id, key)] = RuleEntry(rule_id, version, mask, conditions)
+    return rules
+
+
+class PolicyCache:
+    def __init__(self, max_tenants: int, idle_seconds: float) -> None:
+        self.max_tenants = max_tenants
+        self.idle_seconds = idle_seconds
+        self._tenants: dict[int, TenantPolicy] = {}
+        # Тенанты без партиции, которых проверяли через БД
+        self._requested: set[int] = set()
+        # Последние известные версии всех тенантов (из опроса и уведомлений)
+        self._latest: dict[int, int] = {}
+        self._synced = False
+        # Будит фоновую синхронизацию: новая версия или новый тенант
+        self.wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    def request(self, tenant_id: int) -> None:
+        """Попросить фоновую синхронизацию загрузить партицию тенанта."""
+        if tenant_id in self._tenants or tenant_id in self._requested:
+            return
+        if len(self._requested) < self.max_tenants:
+            self._requested.add(tenant_id)
+            self.wakeup.set()
+
+    def _admit(self, tenant_id: int) -> bool:
+        """
+        Завести партицию тенанта. При заполненном кэше вытесняется самая
+        давно не использованная, если она простаивает дольше idle_seconds.
+        """
+        if tenant_id in self._tenants:
+            return True
+        if len(self._tenants) >= self.max_tenants:
+            victim = min(self._tenants, key=lambda t: self._tenants[t].used_at)
+            if time.monotonic() - self._tenants[victim].used_at < self.idle_seconds:
+                metrics.inc("policy_cache_admissions_denied")
+                return False
+            del self._tenants[victim]
+            metrics.inc("policy_cache_tenant_evictions")
+        self._tenants[tenant_id] = TenantPolicy()
+        return True
+
+    def is_fresh(self, tenant_id: int) -> bool:
+        """Партиция загружена и не отстает от последней известной версии."""
+        partition = self._tenants.get(tenant_id)
+        return partition is not None and partition.is_fresh
+
+    def is_loaded(self, tenant_id: int) -> bool:
+        partition = self._tenants.get(tenant_id)
+        return partition is not None and partition.loaded
+
+    def latest(self, tenant_id: int) -> int | None:
+        """Последняя известная версия политики тенанта (None - еще не сверялись)."""
+        version = self._latest.get(tenant_id)
+        if version is None and self._synced:
+            return 0
+        return version
+
+    @property
+    def latest_versions(self) -> Mapping[int, int]:
+        return self._latest
+
+    def _observe(self, tenant_id: int, version: int) -> bool:
+        """Учесть версию тенанта из БД или уведомления; True - она новее."""
+        if version <= self._latest.get(tenant_id, 0):
+            return False
+        self._latest[tenant_id] = version
+        return True
+
+    def age(self, tenant_id: int) -> float:
+        """Секунд с последней успешной сверки партиции с БД."""
+        partition = self._tenants.get(tenant_id)
+        if partition is None:
+            return float("inf")
+        return time.monotonic() - partition.refreshed_at
+
+    def get(self, tenant_id: int, role_id: int, element_key: str) -> RuleEntry | None:
+        partition = self._tenants.get(tenant_id)
+        if partition is None:
+            return None
+        partition.used_at = time.monotonic()
+        return partition.rules.get((role_id, element_key))
+
+    def matrix(
+        self, tenant_id: int
+    ) -> tuple[int, Mapping[tuple[int, str], RuleEntry]] | None:
+        """Актуальная матрица тенанта и ее версия (None - партиция отстает)."""
+        if not self.is_fresh(tenant_id):
+            return None
+        partition = self._tenants[tenant_id]
+        partition.used_at = time.monotonic()
+        return partition.version, partition.rules
+
+    def notify(self, tenant_id: int, version: int) -> None:
+        """Новая версия политики тенанта - его партиция устарела до refresh."""
+        newer = self._observe(tenant_id, version)
+        partition = self._tenants.get(tenant_id)
+        if partition is not None and version > partition.latest:
+            partition.latest = version
+        # Незагруженный тенант нечего догружать, но снимок нужно пересобрать
+        if newer:
+            self.wakeup.set()
+
+    async def refresh(self, db: AsyncSession, tenant_id: int) -> int | None:
+        """
+        Догрузить изменившиеся строки тенанта, если его версия в БД выросла.
+        :return: загруженная версия (None - партиции нет в кэше)
+        """
+        partition = self._tenants.get(tenant_id)
+        if partition is None:
+            return None
+        async with partition.lock:
+            latest = await PolicyVersionService.current(db, tenant_id)
+            self._observe(tenant_id, latest)
+            if latest > partition.latest:
+                partition.latest = latest
+            if partition.loaded and latest <= partition.version:
+                partition.refreshed_at = time.monotonic()
+                return partition.version
+
+            stmt = select(
+                EffectivePermission.role_id,
+                EffectivePermission.element_key,
+                EffectivePermission.rule_id,
+                EffectivePermission.version,
+                EffectivePermission.mask,
+                EffectivePermission.conditions,
+            ).where(EffectivePermission.tenant_id == tenant_id)
+            if partition.loaded:
+                # Число строк считается до догрузки: строка, добавленная
+                # между запросами, даст лишнюю полную перезагрузку, а не
+                # пропущенное удаление
+                total = await db.scalar(
+                    select(func.count())
+                    .select_from(EffectivePermission)
+                    .where(EffectivePermission.tenant_id == tenant_id)
+                )
+                # Только строки, изменившиеся после загруженной версии (индекс
+                # (tenant_id, version))
+                rows = (
+                    await db.execute(
+                        stmt.where(EffectivePermission.version > partition.version)
+                    )
+                ).all()
+                rules = _apply(partition.rules, rows)
+                if len(rules) != total:
+                    # Строки удалены или сменили ключ - догрузка их не видит
+                    metrics.inc("policy_cache_full_reloads")
+                    rows = (await db.execute(stmt)).all()
+                    rules = _apply({}, rows)
+            else:
+                rows = (await db.execute(stmt)).all()
+                rules = _apply({}, rows)
+
+            partition.rules = rules
+            partition.version = latest
+            partition.loaded = True
+            partition.refreshed_at = time.monotonic()
+            logger.info(
+                "Policy cache for tenant %s at version %s (%s rows)",
+                tenant_id,
+                latest,
+                len(rows),
+            )
+            return latest
+
+    async def sync(self, db: AsyncSession, preload: bool = False) -> None:
+        """
+        Сверить версии всех тенантов одним запросом и догрузить отстающие партиции.
+        :param preload: зарегистрировать все тенанты из БД (прогрев при старте)
+        """
+        versions = await PolicyVersionService.versions(db)
+        for tenant_id in self.reconcile(versions, preload):
+            await self.refresh(db, tenant_id)
+
+    def reconcile(
+        self, versions: Mapping[int, int], preload: bool = False
+    ) -> list[int]:
+        """
+        Учесть версии всех тенантов из БД и принять запрошенных тенантов.
+        :return: тенанты, чьи партиции нужно догрузить
+        """
+        for tenant_id, version in versions.items():
+            self._observe(tenant_id, version)
+        self._synced = True
+        if preload:
+            self._requested.update(list(versions)[: self.max_tenants])
+        for tenant_id in self._requested:
+            self._admit(tenant_id)
+        self._requested.clear()
+
+        now = time.monotonic()
+        stale = []
+        for tenant_id, partition in self._tenants.items():
+            latest = versions.get(tenant_id, 0)
+            if latest > partition.latest:
+                partition.latest = latest
+            if partition.is_fresh:
+                partition.refreshed_at = now
+            else:
+                stale.append(tenant_id)
+        return stale
+
+    def evict(self, tenant_id: int) -> None:
+        """Выбросить партицию тенанта (остальные тенанты не затрагиваются)."""
+        self._tenants.pop(tenant_id, None)
+
+    def clear(self) -> None:
+        self._tenants.clear()
+        self._requested.clear()
+        self._latest.clear()
+        self._synced = False
+
+
+policy_cache = PolicyCache(
+    settings.POLICY_CACHE_MAX_TENANTS, settings.POLICY_CACHE_IDLE_SECONDS
+)
+metrics.register_gauge("policy_cache_tenants", lambda: float(len(policy_cache)))
+
+_sync_task: asyncio.Task[None] | None = None
+
+
+async def _refresh_tenant(tenant_id: int) -> None:
+    async with read_session() as session:
+        await policy_cache.refresh(session, tenant_id)
+
+
+async def _sync_once() -> None:
+    """
+    Сверка версий - проба восстановления БД с бюджетом запроса. Догрузка
+    каждой партиции - отдельно, в своей сессии и с фоновым бюджетом: большой
+    тенант не валит сверку остальных и не открывает breaker таймаутом.
+    """
+    async with read_session() as session:
+        # Фоновая задача - единственная, кто проверяет восстановление БД
+        versions = await guarded(
+            lambda: PolicyVersionService.versions(session), probe=True
+        )
+    for tenant_id in policy_cache.reconcile(versions):
+        try:
+            await guarded(partial(_refresh_tenant, tenant_id), background=True)
+        except ServiceUnavailableError as exc:
+            logger.warning(
+                "Policy cache refresh for tenant %s skipped: %s", tenant_id, exc
+            )
+
+
+async def _sync_loop() -> None:
+    wakeup = policy_cache.wakeup
+    while True:
+        wakeup.clear()
+        try:
+            await _sync_once()
+        except ServiceUnavailableError:
+            logger.warning("Policy cache refresh skipped: database unavailable")
+        except Exception:
+            logger.exception("Policy cache refresh failed")
+        else:
+            await _refresh_snapshot()
+
+        # Ожидание уведомления или следующего опроса
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(
+                wakeup.wait(), timeout=settings.POLICY_POLL_INTERVAL_SECONDS
+            )
+
+
+async def _refresh_snapshot() -> None:
+    """Пересобрать mmap-снимок, если он отстает от известных версий тенантов."""
+    reader = get_snapshot_reader()
+    if reader is None or reader.covers(policy_cache.latest_versions):
+        return
+    try:
+        # Отстающая реплика даст снимок старше известной версии - он не
+        # будет использован, и пересборка повторится при следующей сверке
+        async with read_session() as session:
+            number = await rebuild_snapshot(session)
+    except Exception:
+        logger.exception("Policy snapshot rebuild failed")
+        return
+    logger.info("Policy snapshot %s rebuilt by sync", number)
+
+
+async def start_policy_sync() -> None:
+    """Подписка на нотификатор и запуск фонового опроса версий."""
+    global _sync_task
+    if _sync_task is not None:
+        return
+
+    notifier = get_notifier()
+    notifier.subscribe(policy_cache.notify)
+    await notifier.start()
+    _sync_task = asyncio.create_task(_sync_loop())
+
+
+async def stop_policy_sync() -> None:
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _sync_task
+        _sync_task = None
+    await get_notifier().stop()
@@ -0,0 +1,362 @@
+"""
+Снимок матрицы прав в разделяемой памяти (mmap) для нескольких воркеров.
+
+Файлы в POLICY_SNAPSHOT_DIR:
+    policy.ctl            - заголовок: magic + номер текущего снимка (u64)
+    policy-<number>.snap  - бинарный снимок с этим номером
+
+Формат снимка: заголовок `<4sHQII` (magic, формат, номер, число тенантов,
+число записей), таблица версий политики `<IQ` (tenant_id, версия), по
+которым собран снимок, далее записи фиксированной длины `<I50sB` (role_id,
+element_key, маска), отсортированные по (role_id, element_key). Воркеры
+ищут запись бинарным поиском прямо в mmap, без копирования матрицы.
+
+Писатель (под flock на policy.ctl) пишет новый снимок во временный файл,
+атомарно переименовывает его (os.replace) и только затем увеличивает
+номер в policy.ctl. Снимок, собранный по более старым версиям, чем
+текущий, не публикуется: две одновременные пересборки не откатывают
+матрицу. Читатели сравнивают номер при каждой проверке и переоткрывают
+снимок, если он изменился; снимок с версией тенанта ниже известной
+узлу для этого тенанта не используется.
+"""
+
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.rbac import EffectivePermission
+from app.services.policy_version_ops import PolicyVersionService
+
+CTL_MAGIC = b"PMCT"
+SNAPSHOT_MAGIC = b"PMSN"
+FORMAT_VERSION = 2
+
+_CTL = struct.Struct("<4sQ")
+_HEADER = struct.Struct("<4sHQII")
+_TENANT = struct.Struct("<IQ")
+_RECORD = struct.Struct("<I50sB")
+_KEY_SIZE = 50
+
+CTL_FILE = "policy.ctl"
+# Сколько предыдущих снимков оставлять для отстающих читателей
+_KEEP_SNAPSHOTS = 2
+
+
+def _snapshot_path(directory: Path, number: int) -> Path:
+    return directory / f"policy-{number}.snap"
+
+
+def encode_snapshot(
+    number: int, versions: Mapping[int, int], rules: list[tuple[int, str, int]]
+) -> bytes:
+    """
+    Сериализация списка (role_id, element_key, mask) в бинарный снимок.
+    :param versions: версии политики тенантов, по которым собраны правила
+    """
+    records = sorted(
+        (role_id, key.encode("utf-8"), mask) for role_id, key, mask in rules
+    )
+    tenants = sorted(versions.items())
+    buffer = bytearray(
+        _HEADER.size + _TENANT.size * len(tenants) + _RECORD.size * len(records)
+    )
+    _HEADER.pack_into(
+        buffer,
+        0,
+        SNAPSHOT_MAGIC,
+        FORMAT_VERSION,
+        number,
+        len(tenants),
+        len(records),
+    )
+
+    offset = _HEADER.size
+    for tenant_id, version in tenants:
+        _TENANT.pack_into(buffer, offset, tenant_id, version)
+        offset += _TENANT.size
+    for role_id, key, mask in records:
+        if len(key) > _KEY_SIZE:
+            raise ValueError(f"Element key too long for snapshot: {key!r}")
+        _RECORD.pack_into(buffer, offset, role_id, key, mask)
+        offset += _RECORD.size
+    return bytes(buffer)
+
+
+def decode_versions(data: bytes | mmap.mmap) -> dict[int, int] | None:
+    """Версии тенантов из заголовка снимка (None - не снимок этого формата)."""
+    if len(data) < _HEADER.size:
+        return None
+    magic, fmt, _, tenants, _ = _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or fmt != FORMAT_VERSION:
+        return None
+    return dict(
+        _TENANT.unpack_from(data, _HEADER.size + index * _TENANT.size)
+        for index in range(tenants)
+    )
+
+
+def is_older(versions: Mapping[int, int], current: Mapping[int, int]) -> bool:
+    """
+    Собран ли снимок по более старой политике, чем текущий.
+    Версии тенанта в БД только растут, поэтому откат хотя бы одного
+    тенанта означает, что правила прочитаны раньше.
+    """
+    return any(
+        version < current[tenant_id]
+        for tenant_id, version in versions.items()
+        if tenant_id in current
+    )
+
+
+class PolicySnapshotWriter:
+    """Пересборка снимка. Запись сериализуется через flock на policy.ctl."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def write(
+        self, versions: Mapping[int, int], rules: list[tuple[int, str, int]]
+    ) -> int:
+        """
+        Записать новый снимок и опубликовать его номер.
+        Если текущий снимок собран по тем же или более новым версиям,
+        он остается на месте.
+        :return: номер опубликованного снимка
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory / CTL_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+
+        with os.fdopen(fd, "r+b") as ctl:
+            fcntl.flock(ctl, fcntl.LOCK_EX)
+            try:
+                # Первый писатель инициализирует заголовок под блокировкой
+                if os.fstat(ctl.fileno()).st_size < _CTL.size:
+                    ctl.write(_CTL.pack(CTL_MAGIC, 0))
+                    ctl.flush()
+
+                with mmap.mmap(ctl.fileno(), _CTL.size) as header:
+                    _, current = _CTL.unpack_from(header, 0)
+                    published = self._versions(current)
+                    if published is not None and (
+                        published == versions or is_older(versions, published)
+                    ):
+                        # Другой писатель уже опубликовал эту или более новую политику
+                        metrics.inc("policy_snapshot_stale_writes")
+                        return int(current)
+                    number: int = current + 1
+
+                    target = _snapshot_path(self.directory, number)
+                    tmp = target.with_suffix(".tmp")
+                    with open(tmp, "wb") as f:
+                        f.write(encode_snapshot(number, versions, rules))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp, target)
+
+                    # Публикация: счетчик меняется только после rename
+                    _CTL.pack_into(header, 0, CTL_MAGIC, number)
+                    header.flush()
+            finally:
+                fcntl.flock(ctl, fcntl.LOCK_UN)
+
+        self._cleanup(number)
+        return number
+
+    def _versions(self, number: int) -> dict[int, int] | None:
+        """Версии тенантов опубликованного снимка (вызывается под flock)."""
+        if number == 0:
+            return None
+        try:
+            with (
+                open(_snapshot_path(self.directory, number), "rb") as f,
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+            ):
+                return decode_versions(data)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _cleanup(self, number: int) -> None:
+        for old in range(number - _KEEP_SNAPSHOTS, 0, -1):
+            path = _snapshot_path(self.directory, old)
+            if not path.exists():
+                break
+            # Открытые у читателей mmap остаются валидными после unlink
+            path.unlink(missing_ok=True)
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Загрузить матрицу из БД и записать новый снимок."""
+        # Версии читаются до строк: правила снимка не старше его версий
+        versions = await PolicyVersionService.versions(db)
+        stmt = select(
+            EffectivePermission.role_id,
+            EffectivePermission.element_key,
+            EffectivePermission.mask,
+        )
+        rules = list((await db.execute(stmt)).tuples().all())
+        return await asyncio.to_thread(self.write, versions, rules)
+
+
+class PolicySnapshotReader:
+    """Чтение снимка воркером: zero-copy поиск по mmap."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self._ctl: mmap.mmap | None = None
+        self._data: mmap.mmap | None = None
+        self._number = 0
+        self._versions: dict[int, int] = {}
+        self._records = 0
+        self._count = 0
+
+    @property
+    def number(self) -> int:
+        return self._number
+
+    @property
+    def versions(self) -> Mapping[int, int]:
+        """Версии политики тенантов, по которым собран открытый снимок."""
+        return self._versions
+
+    def _open_ctl(self) -> mmap.mmap | None:
+        ctl_path = self.directory / CTL_FILE
+        try:
+            with open(ctl_path, "rb") as f:
+                ctl = mmap.mmap(f.fileno(), _CTL.size, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        if _CTL.unpack_from(ctl, 0)[0] != CTL_MAGIC:
+            ctl.close()
+            return None
+        return ctl
+
+    def _remap(self, number: int) -> bool:
+        try:
+            with open(_snapshot_path(self.directory, number), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return False
+
+        versions = decode_versions(data)
+        if versions is None or _HEADER.unpack_from(data, 0)[2] != number:
+            data.close()
+            return False
+
+        if self._data is not None:
+            self._data.close()
+        self._data = data
+        self._number = number
+        self._versions = versions
+        self._records = _HEADER.size + _TENANT.size * len(versions)
+        self._count = _HEADER.unpack_from(data, 0)[4]
+        return True
+
+    def _refresh(self) -> bool:
+        """Проверка номера в заголовке, переоткрытие снимка при его смене."""
+        if self._ctl is None:
+            self._ctl = self._open_ctl()
+            if self._ctl is None:
+                return False
+
+        number: int = _CTL.unpack_from(self._ctl, 0)[1]
+        if number == 0:
+            return False
+        if number != self._number and not self._remap(number):
+            # Снимок успели удалить - перечитать номер один раз
+            number = _CTL.unpack_from(self._ctl, 0)[1]
+            if not self._remap(number):
+                return self._data is not None
+        return True
+
+    def covers(self, latest: Mapping[int, int]) -> bool:
+        """Снимок не старше известных версий политики всех тенантов."""
+        if not self._refresh():
+            return False
+        return all(
+            self._versions.get(tenant_id, 0) >= version
+            for tenant_id, version in latest.items()
+        )
+
+    def lookup(
+        self, role_id: int, element_key: str, tenant_id: int, min_version: int
+    ) -> int | None:
+        """
+        Маска прав роли тенанта на элемент.
+        :param min_version: известная узлу версия политики тенанта
+        :return: маска (0 - правила нет) или None, если снимок недоступен
+            или собран по более старой версии тенанта
+        """
+        if not self._refresh():
+            return None
+        if self._versions.get(tenant_id, 0) < min_version:
+            metrics.inc("policy_snapshot_stale_reads")
+            return None
+
+        data = self._data
+        assert data is not None
+        target = (role_id, element_key.encode("utf-8").ljust(_KEY_SIZE, b"\0"))
+
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._records + middle * _RECORD.size
+            current = (
+                struct.unpack_from("<I", data, offset)[0],
+                data[offset + 4 : offset + 4 + _KEY_SIZE],
+            )
+            if current < target:
+                low = middle + 1
+            elif current > target:
+                high = middle
+            else:
+                mask: int = data[offset + 4 + _KEY_SIZE]
+                return mask
+        return 0
+
+    def close(self) -> None:
+        for mapped in (self._data, self._ctl):
+            if mapped is not None:
+                mapped.close()
+        self._data = self._ctl = None
+        self._number = 0
+        self._versions = {}
+
+
+_reader: PolicySnapshotReader | None = None
+
+
+def get_snapshot_reader() -> PolicySnapshotReader | None:
+    """Читатель снимка текущего воркера (None, если снимки отключены)."""
+    global _reader
+    if settings.POLICY_SNAPSHOT_DIR is None:
+        return None
+    if _reader is None:
+        _reader = PolicySnapshotReader(settings.POLICY_SNAPSHOT_DIR)
+    return _reader
+
+
+async def rebuild_snapshot(db: AsyncSession) -> int | None:
+    """Пересобрать снимок после изменения правил (no-op, если отключено)."""
+    if settings.POLICY_SNAPSHOT_DIR is None:
+        return None
+    return await PolicySnapshotWriter(settings.POLICY_SNAPSHOT_DIR).rebuild(db)
+
+
+async def main() -> None:
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        number = await rebuild_snapshot(session)
+    print(f"Policy snapshot: {number}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,195 @@
+"""
+Версия политики и уведомления о ее изменении.
+
+Версия ведется отдельно для каждого тенанта. Любой путь записи правил
+вызывает `PolicyVersionService.bump` в той же транзакции и после commit
+публикует пару (тенант, версия) через нотификатор. Кэши на узлах сравнивают
+версию тенанта и догружают только его измененные строки.
+
+Тем же каналом узлы получают отзыв токенов при logout (дайджест и exp):
+отзыв должен дойти до всех воркеров, а не только до принявшего logout.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.rbac import PolicyVersion
+
+if TYPE_CHECKING:
+    import asyncpg  # type: ignore[import-untyped]
+
+logger = logging.getLogger(__name__)
+
+# (tenant_id, version)
+VersionCallback = Callable[[int, int], None]
+# (дайджест токена, exp)
+RevocationCallback = Callable[[bytes, float], None]
+
+POLICY_CHANNEL = "policy_version"
+# Префикс payload отзыва токена: "revoke:<дайджест hex>:<exp>"
+_REVOKE_PREFIX = "revoke:"
+
+
+class PolicyVersionService:
+    @staticmethod
+    async def bump(db: AsyncSession, tenant_id: int) -> int:
+        """
+        Увеличить версию политики тенанта в текущей транзакции.
+        UPDATE блокирует строку до commit, поэтому версии не повторяются.
+        """
+        stmt = (
+            update(PolicyVersion)
+            .where(PolicyVersion.tenant_id == tenant_id)
+            .values(version=PolicyVersion.version + 1)
+            .returning(PolicyVersion.version)
+        )
+        version = (await db.execute(stmt)).scalar_one_or_none()
+        if version is None:
+            # Первое изменение правил нового тенанта
+            db.add(PolicyVersion(tenant_id=tenant_id, version=1))
+            await db.flush()
+            return 1
+        return int(version)
+
+    @staticmethod
+    async def current(db: AsyncSession, tenant_id: int) -> int:
+        """Текущая версия политики тенанта - один индексный SELECT."""
+        stmt = select(PolicyVersion.version).where(PolicyVersion.tenant_id == tenant_id)
+        version = (await db.execute(stmt)).scalar_one_or_none()
+        return int(version or 0)
+
+    @staticmethod
+    async def versions(db: AsyncSession) -> dict[int, int]:
+        """Версии всех тенантов одним запросом (для периодической сверки)."""
+        stmt = select(PolicyVersion.tenant_id, PolicyVersion.version)
+        rows = (await db.execute(stmt)).tuples().all()
+        return {tenant_id: int(version) for tenant_id, version in rows}
+
+
+class PolicyNotifier(ABC):
+    """Канал доставки новой версии политики на узлы."""
+
+    def __init__(self) -> None:
+        self._callbacks: list[VersionCallback] = []
+        self._revocation_callbacks: list[RevocationCallback] = []
+
+    def subscribe(self, callback: VersionCallback) -> None:
+        self._callbacks.append(callback)
+
+    def subscribe_revocations(self, callback: RevocationCallback) -> None:
+        self._revocation_callbacks.append(callback)
+
+    def _dispatch(self, tenant_id: int, version: int) -> None:
+        for callback in self._callbacks:
+            try:
+                callback(tenant_id, version)
+            except Exception:
+                logger.exception("Policy version callback failed")
+
+    def _dispatch_revocation(self, digest: bytes, exp: float) -> None:
+        for callback in self._revocation_callbacks:
+            try:
+                callback(digest, exp)
+            except Exception:
+                logger.exception("Token revocation callback failed")
+
+    @abstractmethod
+    async def publish(self, tenant_id: int, version: int) -> None:
+        """Сообщить всем подписчикам о новой версии тенанта (после commit)."""
+
+    @abstractmethod
+    async def publish_revocation(self, digest: bytes, exp: float) -> None:
+        """Сообщить всем узлам об отозванном токене."""
+
+    async def start(self) -> None:  # noqa: B027
+        """Подключение к каналу (если требуется)."""
+
+    async def stop(self) -> None:  # noqa: B027
+        """Отключение от канала."""
+
+
+class InProcessNotifier(PolicyNotifier):
+    """Доставка внутри процесса: для тестов и одного воркера."""
+
+    async def publish(self, tenant_id: int, version: int) -> None:
+        self._dispatch(tenant_id, version)
+
+    async def publish_revocation(self, digest: bytes, exp: float) -> None:
+        self._dispatch_revocation(digest, exp)
+
+
+class PostgresNotifier(PolicyNotifier):
+    """
+    Доставка через Postgres LISTEN/NOTIFY, payload "<tenant_id>:<version>"
+    или "revoke:<дайджест hex>:<exp>".
+    """
+
+    def __init__(self, dsn: str, channel: str = POLICY_CHANNEL) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._connection: asyncpg.Connection | None = None
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        if payload.startswith(_REVOKE_PREFIX):
+            digest, _, exp = payload.removeprefix(_REVOKE_PREFIX).partition(":")
+            try:
+                self._dispatch_revocation(bytes.fromhex(digest), float(exp))
+            except ValueError:
+                logger.warning("Malformed revocation payload: %r", payload)
+            return
+        tenant_id, _, version = payload.partition(":")
+        if tenant_id.isdigit() and version.isdigit():
+            self._dispatch(int(tenant_id), int(version))
+
+    async def start(self) -> None:
+        # Драйвер нужен только этому нотификатору - не грузим его при импорте
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.channel, self._on_notify)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def publish(self, tenant_id: int, version: int) -> None:
+        await self._notify(f"{tenant_id}:{version}")
+
+    async def publish_revocation(self, digest: bytes, exp: float) -> None:
+        await self._notify(f"{_REVOKE_PREFIX}{digest.hex()}:{exp}")
+
+    async def _notify(self, payload: str) -> None:
+        import asyncpg
+
+        # Отдельное соединение: слушающее не должно блокироваться записью
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            await connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        finally:
+            await connection.close()
+
+
+_notifier: PolicyNotifier | None = None
+
+
+def get_notifier() -> PolicyNotifier:
+    """Нотификатор, выбранный в настройках (POLICY_NOTIFIER)."""
+    global _notifier
+    if _notifier is None:
+        if settings.POLICY_NOTIFIER == "postgres":
+            # asyncpg принимает DSN без указания драйвера SQLAlchemy
+            dsn = settings.DATABASE_URL.replace(
+                "postgresql+asyncpg://", "postgresql://"
+            )
+            _notifier = PostgresNotifier(dsn)
+        else:
+            _notifier = InProcessNotifier()
+    return _notifier
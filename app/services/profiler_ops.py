@@ -0,0 +1,171 @@
+"""
+Статистический профайлер отдельных запросов.
+
+StackSampler в фоновом потоке раз в PROFILER_INTERVAL_MS снимает стек потока
+event loop (sys._current_frames) и считает одинаковые стеки. Потоку запроса
+это ничего не стоит, кроме GIL на время снятия стека. Семплер видит все, что
+выполняет event loop, поэтому в профиль попадают и параллельные запросы -
+это статистика по потоку, а не трассировка одного запроса.
+
+Результат - collapsed stacks ("a;b;c 42", формат flamegraph.pl, импортируется
+в speedscope) + JSON с метаданными. ProfileStore хранит последние
+PROFILER_RING_SIZE профилей в PROFILER_DIR и удаляет более старые.
+"""
+
+import json
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from app.core.config import settings
+
+_PROFILE_ID = re.compile(r"^\d{19}-[0-9a-f]{8}$")
+_STACKS_SUFFIX = ".collapsed"
+_META_SUFFIX = ".json"
+
+
+def _collapse(frame: FrameType | None) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class StackSampler:
+    """Семплирование стека одного потока до stop()."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self) -> Counter[str]:
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+
+def new_profile_id() -> str:
+    """Идентификатор, сортируемый по времени создания."""
+    return f"{time.time_ns():019d}-{secrets.token_hex(4)}"
+
+
+class ProfileStore:
+    """Кольцо профилей на диске: не больше ring_size последних."""
+
+    def __init__(self, directory: str | Path, ring_size: int) -> None:
+        self.directory = Path(directory)
+        self.ring_size = ring_size
+
+    def save(self, profile_id: str, stacks: Counter[str], meta: dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lines = (f"{stack} {count}\n" for stack, count in stacks.most_common())
+        (self.directory / f"{profile_id}{_STACKS_SUFFIX}").write_text("".join(lines))
+        # Метаданные пишутся последними: по ним профиль считается готовым
+        meta = {"id": profile_id, "samples": sum(stacks.values()), **meta}
+        (self.directory / f"{profile_id}{_META_SUFFIX}").write_text(json.dumps(meta))
+        self._trim()
+
+    def _trim(self) -> None:
+        ids = self._ids()
+        for profile_id in ids[: max(len(ids) - self.ring_size, 0)]:
+            for suffix in (_META_SUFFIX, _STACKS_SUFFIX):
+                (self.directory / f"{profile_id}{suffix}").unlink(missing_ok=True)
+
+    def _ids(self) -> list[str]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.stem for path in self.directory.glob(f"*{_META_SUFFIX}"))
+
+    def entries(self) -> list[dict[str, Any]]:
+        """Метаданные профилей, новые первыми."""
+        result = []
+        for profile_id in reversed(self._ids()):
+            meta = self.meta(profile_id)
+            if meta is not None:
+                result.append(meta)
+        return result
+
+    def meta(self, profile_id: str) -> dict[str, Any] | None:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            text = (self.directory / f"{profile_id}{_META_SUFFIX}").read_text()
+        except FileNotFoundError:
+            return None
+        meta: dict[str, Any] = json.loads(text)
+        return meta
+
+    def collapsed(self, profile_id: str) -> str | None:
+        # id проверяется по шаблону: путь не выходит за пределы каталога
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            return (self.directory / f"{profile_id}{_STACKS_SUFFIX}").read_text()
+        except FileNotFoundError:
+            return None
+
+
+def to_speedscope(name: str, collapsed: str, interval_ms: float) -> dict[str, Any]:
+    """Collapsed stacks -> файл speedscope (sampled-профиль, вес в мс)."""
+    frames: list[dict[str, str]] = []
+    index: dict[str, int] = {}
+    samples: list[list[int]] = []
+    weights: list[float] = []
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if not stack or not count.isdigit():
+            continue
+        sample = []
+        for frame in stack.split(";"):
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(int(count) * interval_ms)
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": settings.PROJECT_NAME,
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+profile_store = ProfileStore(settings.PROFILER_DIR, settings.PROFILER_RING_SIZE)
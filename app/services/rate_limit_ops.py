@@ -0,0 +1,117 @@
+"""
+Ограничение частоты попыток входа (brute-force / credential stuffing).
+
+Проверка выполняется ДО поиска пользователя и bcrypt, поэтому отклоненная
+попытка стоит несколько словарных операций, а не хеширование.
+
+По умолчанию используется приближенный sliding window counter в памяти
+процесса: на ключ хранится только номер окна и два счетчика (текущее и
+предыдущее окно), число ключей ограничено (LRU-вытеснение).
+Бэкенд подключаемый: достаточно реализовать RateLimiter.hit.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class RateLimiter(ABC):
+    @abstractmethod
+    async def hit(self, key: str) -> float:
+        """
+        Учесть попытку по ключу.
+        :return: 0, если попытка разрешена, иначе секунды до следующей попытки
+        """
+
+
+class _Window:
+    __slots__ = ("index", "current", "previous")
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.current = 0
+        self.previous = 0
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """
+    Приближенное скользящее окно: вес предыдущего окна убывает линейно.
+    Память - O(max_keys), самые давние ключи вытесняются первыми.
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int) -> None:
+        self.limit = limit
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._windows: OrderedDict[str, _Window] = OrderedDict()
+
+    async def hit(self, key: str) -> float:
+        now = time.monotonic()
+        index = int(now // self.window)
+
+        window = self._windows.get(key)
+        if window is None:
+            window = _Window(index)
+            self._windows[key] = window
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+            if window.index != index:
+                # Сдвиг окна: старше одного окна - счетчик обнуляется
+                window.previous = window.current if window.index == index - 1 else 0
+                window.current = 0
+                window.index = index
+
+        elapsed = now - index * self.window
+        estimate = window.previous * (1 - elapsed / self.window) + window.current
+        if estimate >= self.limit:
+            return self.window - elapsed
+
+        window.current += 1
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class LoginThrottle:
+    """
+    Лимиты попыток входа по email и по IP клиента. Email уникален только
+    в пределах тенанта, поэтому ключ - (тенант, email): перебор паролей
+    в одном тенанте не блокирует вход одноименного пользователя другого.
+    """
+
+    def __init__(self, per_email: RateLimiter, per_ip: RateLimiter) -> None:
+        self.per_email = per_email
+        self.per_ip = per_ip
+
+    async def check(self, tenant: str, email: str, client_ip: str | None) -> float:
+        """
+        :param tenant: slug тенанта из запроса входа
+        :return: 0, если попытка разрешена, иначе Retry-After в секундах
+        """
+        retry_after = await self.per_email.hit(f"{tenant}:{email.strip().lower()}")
+        if not retry_after and client_ip:
+            retry_after = await self.per_ip.hit(client_ip)
+
+        if retry_after:
+            metrics.inc("login_throttled")
+        return retry_after
+
+
+login_throttle = LoginThrottle(
+    per_email=SlidingWindowLimiter(
+        settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+        settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+        settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+    ),
+    per_ip=SlidingWindowLimiter(
+        settings.LOGIN_RATE_LIMIT_PER_IP,
+        settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+        settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+    ),
+)
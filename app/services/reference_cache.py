@@ -0,0 +1,113 @@
+"""
+Кэш справочников: тенанты (slug -> id), роли ((тенант, имя) -> id) и
+бизнес-элементы (ключ -> id).
+
+Справочники меняются только сидом/миграциями, поэтому загружаются один раз
+при старте (lifespan) и не требуют когерентности по версии политики.
+При промахе (например, роль добавлена после старта) значение читается из БД
+и докладывается в кэш.
+"""
+
+import logging
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.rbac import BusinessElement, Role
+from app.models.tenants import Tenant
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROLE_NAME = "User"
+
+
+class ElementRef(NamedTuple):
+    id: int
+    name: str
+
+
+class ReferenceCache:
+    def __init__(self) -> None:
+        self.tenants: dict[str, int] = {}
+        self.roles: dict[tuple[int, str], int] = {}
+        self.elements: dict[str, ElementRef] = {}
+
+    async def load(self, db: AsyncSession) -> None:
+        tenants = (await db.execute(select(Tenant.slug, Tenant.id))).tuples().all()
+        # Только колонки: Role.rules грузится selectin и здесь не нужен
+        roles = (
+            (await db.execute(select(Role.tenant_id, Role.name, Role.id)))
+            .tuples()
+            .all()
+        )
+        elements = (
+            (
+                await db.execute(
+                    select(
+                        BusinessElement.key, BusinessElement.id, BusinessElement.name
+                    )
+                )
+            )
+            .tuples()
+            .all()
+        )
+        self.tenants = dict(tenants)
+        self.roles = {(tenant_id, name): role_id for tenant_id, name, role_id in roles}
+        self.elements = {key: ElementRef(id_, name) for key, id_, name in elements}
+        logger.info(
+            "Reference cache: %s tenants, %s roles, %s elements",
+            len(tenants),
+            len(roles),
+            len(elements),
+        )
+
+    async def tenant_id(self, db: AsyncSession, slug: str) -> int | None:
+        tenant_id = self.tenants.get(slug)
+        if tenant_id is None:
+            tenant_id = (
+                await db.execute(select(Tenant.id).where(Tenant.slug == slug))
+            ).scalar_one_or_none()
+            if tenant_id is not None:
+                self.tenants[slug] = tenant_id
+        return tenant_id
+
+    async def role_id(self, db: AsyncSession, tenant_id: int, name: str) -> int | None:
+        role_id = self.roles.get((tenant_id, name))
+        if role_id is None:
+            role_id = (
+                await db.execute(
+                    select(Role.id).where(
+                        Role.tenant_id == tenant_id, Role.name == name
+                    )
+                )
+            ).scalar_one_or_none()
+            if role_id is not None:
+                self.roles[(tenant_id, name)] = role_id
+        return role_id
+
+    async def element(self, db: AsyncSession, key: str) -> ElementRef | None:
+        element = self.elements.get(key)
+        if element is None:
+            row = (
+                await db.execute(
+                    select(BusinessElement.id, BusinessElement.name).where(
+                        BusinessElement.key == key
+                    )
+                )
+            ).one_or_none()
+            if row is not None:
+                element = self.elements[key] = ElementRef(row.id, row.name)
+        return element
+
+    async def default_role_id(self, db: AsyncSession, tenant_id: int) -> int | None:
+        """id роли тенанта, выдаваемой при регистрации."""
+        return await self.role_id(db, tenant_id, DEFAULT_ROLE_NAME)
+
+    def clear(self) -> None:
+        self.tenants.clear()
+        self.roles.clear()
+        self.elements.clear()
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,98 @@
+"""
+Обратный индекс авторизации: (element_key, action) -> роли с правом.
+
+Вопрос "кто может удалять orders" не требует проверки каждого пользователя:
+по матрице тенанта находятся роли, а их пользователи выбираются одним
+индексным запросом по users.role_id.
+
+Индекс строится из актуальной партиции PolicyCache и живет до смены ее
+версии. Пока партиция отстает, роли читаются из effective_permissions.
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.rbac import HAS_CONDITIONS, EffectivePermission
+from app.services.permission_ops import ACTION_BITS
+from app.services.policy_cache import RuleEntry, policy_cache
+
+Grants = dict[tuple[str, str], tuple["RoleGrant", ...]]
+
+
+class RoleGrant(NamedTuple):
+    role_id: int
+    # *_all_permission: на любые объекты; иначе только на свои
+    all_scope: bool
+    # У правила есть ABAC-условия: право зависит от атрибутов объекта
+    conditional: bool
+
+
+def grant_for(role_id: int, mask: int, action: str) -> RoleGrant | None:
+    """Право роли на действие по маске (None - права нет)."""
+    own_bit, all_bit = ACTION_BITS[action]
+    if not mask & (own_bit | all_bit):
+        return None
+    return RoleGrant(role_id, bool(mask & all_bit), bool(mask & HAS_CONDITIONS))
+
+
+def build_grants(rules: Iterable[tuple[tuple[int, str], RuleEntry]]) -> Grants:
+    grants: dict[tuple[str, str], list[RoleGrant]] = {}
+    for (role_id, key), entry in rules:
+        for action in ACTION_BITS:
+            grant = grant_for(role_id, entry.mask, action)
+            if grant is not None:
+                grants.setdefault((key, action), []).append(grant)
+    return {index: tuple(sorted(items)) for index, items in grants.items()}
+
+
+class ReverseIndex:
+    def __init__(self, max_tenants: int) -> None:
+        self.max_tenants = max_tenants
+        # tenant_id -> (версия матрицы, индекс)
+        self._tenants: OrderedDict[int, tuple[int, Grants]] = OrderedDict()
+
+    def _from_matrix(
+        self, tenant_id: int, version: int, rules: Mapping[tuple[int, str], RuleEntry]
+    ) -> Grants:
+        built = self._tenants.get(tenant_id)
+        if built is None or built[0] != version:
+            built = self._tenants[tenant_id] = (version, build_grants(rules.items()))
+            if len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+        self._tenants.move_to_end(tenant_id)
+        return built[1]
+
+    async def grants(
+        self, db: AsyncSession, tenant_id: int, element_key: str, action: str
+    ) -> tuple[RoleGrant, ...]:
+        """Роли тенанта, которым разрешено действие над элементом."""
+        matrix = policy_cache.matrix(tenant_id)
+        if matrix is not None:
+            index = self._from_matrix(tenant_id, *matrix)
+            return index.get((element_key, action), ())
+
+        stmt = (
+            select(EffectivePermission.role_id, EffectivePermission.mask)
+            .where(
+                EffectivePermission.tenant_id == tenant_id,
+                EffectivePermission.element_key == element_key,
+            )
+            .order_by(EffectivePermission.role_id)
+        )
+        rows = (await db.execute(stmt)).tuples().all()
+        return tuple(
+            grant
+            for role_id, mask in rows
+            if (grant := grant_for(role_id, mask, action)) is not None
+        )
+
+    def clear(self) -> None:
+        self._tenants.clear()
+
+
+reverse_index = ReverseIndex(settings.POLICY_CACHE_MAX_TENANTS)
@@ -0,0 +1,102 @@
+"""
+Single-flight: один запрос в БД на ключ для одновременных промахов кэша.
+
+После деплоя или инвалидации (admin.update_rule) сотни параллельных
+запросов промахиваются по одному и тому же пользователю или правилу роли.
+Первый вызов по ключу (ведущий) выполняет загрузку сам, остальные ждут его
+результат, а не идут в БД.
+
+Семантика:
+    - ошибка ведущего (в т.ч. ServiceUnavailableError из guarded) получают
+      все ожидающие - дальше каждый сам решает, есть ли last-known-good;
+    - ожидающий ждет не дольше timeout и получает ServiceUnavailableError,
+      ведущий ограничен только своей загрузкой (бюджетом guarded). timeout
+      не меньше худшего пути ведущего, иначе ожидающие получают 503, пока
+      ведущий еще укладывается в свои бюджеты;
+    - если ведущий отменен (клиент ушел), ожидающие не падают, а повторяют
+      загрузку - один из них становится новым ведущим;
+    - результат не кэшируется: ключ удаляется, как только загрузка
+      закончилась. Пришедший позже ждет загрузку, начатую раньше него, -
+      так же, как если бы его запрос просто обогнал коммит.
+
+Загрузка идет в корутине ведущего и открывает свою сессию (см. guarded).
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+from app.models.users import User
+from app.services.policy_cache import RuleEntry
+
+
+class SingleFlight[T]:
+    def __init__(self, name: str, timeout: float) -> None:
+        self.name = name
+        self.timeout = timeout
+        self._leaders = f"single_flight_{name}_leaders"
+        self._shared = f"single_flight_{name}_shared"
+        self._timeouts = f"single_flight_{name}_timeouts"
+        self._flights: dict[Hashable, asyncio.Future[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                return await self._lead(key, load)
+
+            metrics.inc(self._shared)
+            try:
+                # shield: таймаут или отмена ожидающего не отменяют загрузку
+                return await asyncio.wait_for(asyncio.shield(flight), self.timeout)
+            except TimeoutError as exc:
+                metrics.inc(self._timeouts)
+                raise ServiceUnavailableError(
+                    f"Timed out waiting for {self.name} load"
+                ) from exc
+            except asyncio.CancelledError:
+                # Отменен ведущий, а не мы - пробуем еще раз
+                if flight.cancelled() and not _cancelling():
+                    continue
+                raise
+
+    async def _lead(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        flight: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        metrics.inc(self._leaders)
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            # Исключение уже получит вызывающий; без ожидающих не логировать
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+
+def _cancelling() -> bool:
+    task = asyncio.current_task()
+    return task is not None and task.cancelling() > 0
+
+
+# Бюджет ожидающего - как у самого запроса в БД
+_WAIT_TIMEOUT = settings.DB_LATENCY_BUDGET_MS / 1000
+
+# Ключи: user_id; (tenant_id, role_id, resource_key).
+# Ведущий fetch_user делает до двух запросов под бюджетом: реплика и
+# перепроверка "не найден" в primary
+user_loads: SingleFlight[User | None] = SingleFlight("users", 2 * _WAIT_TIMEOUT)
+rule_loads: SingleFlight[RuleEntry | None] = SingleFlight("rules", _WAIT_TIMEOUT)
+mask_loads: SingleFlight[int | None] = SingleFlight("masks", _WAIT_TIMEOUT)
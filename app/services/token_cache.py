@@ -0,0 +1,71 @@
+"""
+Кэш проверенных access-токенов.
+
+Проверка подписи JWT стоит десятки микросекунд на каждый запрос, хотя
+один и тот же токен приходит многократно за время жизни. Кэш хранит
+payload уже проверенного токена до его exp (LRU по числу записей).
+Невалидные токены запоминаются отдельно, в негативном кэше (negative_cache).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.auth_ops import AuthService
+from app.services.negative_cache import bad_tokens, token_digest
+
+
+class TokenCache:
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._tokens: OrderedDict[str, tuple[dict[str, Any], float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        cached = self._tokens.get(token)
+        if cached is None:
+            return None
+        payload, expires_at = cached
+        if time.time() >= expires_at:
+            del self._tokens[token]
+            return None
+        self._tokens.move_to_end(token)
+        return payload
+
+    def put(self, token: str, payload: dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, int | float):
+            return
+        self._tokens[token] = (payload, float(exp))
+        self._tokens.move_to_end(token)
+        if len(self._tokens) > self.max_size:
+            self._tokens.popitem(last=False)
+
+    def decode(self, token: str) -> dict[str, Any] | None:
+        """decode_token с кэшем: подпись проверяется один раз на токен."""
+        payload = self.get(token)
+        if payload is not None:
+            metrics.inc("token_cache_hits")
+            return payload
+        # Недавно отвергнутый токен - без повторной проверки подписи
+        digest = token_digest(token)
+        if bad_tokens.get(digest) is not None:
+            return None
+
+        payload = AuthService.decode_token(token)
+        if payload is None:
+            bad_tokens.add(digest, "Invalid or expired token")
+        else:
+            self.put(token, payload)
+        return payload
+
+    def clear(self) -> None:
+        self._tokens.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+metrics.register_gauge("token_cache_size", lambda: float(len(token_cache)))
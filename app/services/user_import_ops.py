@@ -0,0 +1,381 @@
+"""
+Массовый импорт пользователей тенанта из CSV или NDJSON.
+
+Через /auth/register это bcrypt и четыре запроса к БД на каждого
+пользователя. Импорт читает вход потоком, пачками по --chunk-size строк:
+    - строка валидируется сразу (UserImportRow); ошибки пишутся в отчет
+      (NDJSON: номер строки, email, причина) и не останавливают импорт;
+    - пароли пачки хешируются параллельно в пуле процессов;
+    - пачка вставляется одним INSERT ... ON CONFLICT (tenant_id, email)
+      и коммитится сразу: повторный запуск с --on-conflict skip
+      продолжает прерванный импорт;
+    - ошибка БД на пачке откатывает только ее: строки пачки попадают
+      в отчет, импорт продолжается со следующей.
+В памяти одновременно одна пачка - размер файла роли не играет.
+
+Поля: email, password | password_hash (готовый bcrypt), first_name,
+last_name, role (имя роли тенанта, по умолчанию User), is_active.
+
+Запуск:
+    poetry run python -m app.services.user_import_ops users.csv --tenant acme \\
+        --errors errors.ndjson
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Literal
+
+import bcrypt
+from pydantic import ValidationError
+from sqlalchemy import Boolean, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.users import User
+from app.schemas.user import UserImportRow
+from app.services.reference_cache import reference_cache
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "ndjson"]
+ConflictMode = Literal["skip", "update"]
+
+# 9 колонок на строку, лимит параметров запроса Postgres - 32767
+MAX_CHUNK_SIZE = 3_000
+
+
+class UnknownTenantError(Exception):
+    pass
+
+
+def _hash_passwords(passwords: list[str], rounds: int) -> list[str]:
+    """Выполняется в процессе пула."""
+    return [
+        bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode()
+        for password in passwords
+    ]
+
+
+def read_records(
+    stream: IO[str], fmt: ImportFormat
+) -> Iterator[tuple[int, dict[str, Any] | str]]:
+    """(номер строки, поля записи) или (номер строки, ошибка разбора)."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Лишние ячейки DictReader складывает под ключ None
+            if None in row:
+                yield reader.line_num, "Too many fields"
+                continue
+            # Пустая ячейка - отсутствующее значение
+            yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, f"Invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        yield line_no, record
+
+
+class ImportReport:
+    """Счетчики импорта и построчный отчет об ошибках (NDJSON)."""
+
+    def __init__(self, errors: IO[str]) -> None:
+        self.errors = errors
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.conflicts = 0
+        self.invalid = 0
+
+    def reject(self, line: int, email: str | None, reason: str) -> None:
+        self.invalid += 1
+        self._write(line, email, reason)
+
+    def conflict(self, line: int, email: str) -> None:
+        self.conflicts += 1
+        self._write(line, email, "Email already registered")
+
+    def _write(self, line: int, email: str | None, reason: str) -> None:
+        self.errors.write(
+            json.dumps({"line": line, "email": email, "error": reason}) + "\n"
+        )
+
+    def summary(self) -> str:
+        return (
+            f"processed={self.processed} inserted={self.inserted} "
+            f"updated={self.updated} conflicts={self.conflicts} invalid={self.invalid}"
+        )
+
+
+class UserImporter:
+    def __init__(
+        self,
+        db: AsyncSession,
+        tenant_id: int,
+        report: ImportReport,
+        pool: ProcessPoolExecutor,
+        workers: int,
+        on_conflict: ConflictMode = "skip",
+        chunk_size: int = 1_000,
+    ) -> None:
+        self.db = db
+        self.tenant_id = tenant_id
+        self.report = report
+        self.pool = pool
+        self.workers = workers
+        self.on_conflict = on_conflict
+        self.chunk_size = chunk_size
+
+    async def run(self, records: Iterable[tuple[int, dict[str, Any] | str]]) -> None:
+        chunk: list[tuple[int, UserImportRow]] = []
+        for line_no, record in records:
+            self.report.processed += 1
+            row = self._validate(line_no, record)
+            if row is None:
+                continue
+            chunk.append((line_no, row))
+            if len(chunk) >= self.chunk_size:
+                await self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            await self._import_chunk(chunk)
+
+    def _validate(
+        self, line_no: int, record: dict[str, Any] | str
+    ) -> UserImportRow | None:
+        if isinstance(record, str):
+            self.report.reject(line_no, None, record)
+            return None
+        try:
+            return UserImportRow.model_validate(record)
+        except ValidationError as exc:
+            error = exc.errors(include_url=False)[0]
+            field = ".".join(str(part) for part in error["loc"])
+            reason = f"{field}: {error['msg']}" if field else error["msg"]
+            email = record.get("email")
+            self.report.reject(
+                line_no, email if isinstance(email, str) else None, reason
+            )
+            return None
+
+    async def _import_chunk(self, chunk: list[tuple[int, UserImportRow]]) -> None:
+        # Один email дважды в одном INSERT ... ON CONFLICT - ошибка Postgres
+        lines: dict[str, int] = {}
+        rows: list[tuple[UserImportRow, int]] = []
+        for line_no, row in chunk:
+            if row.email in lines:
+                self.report.reject(line_no, row.email, "Duplicate email in input")
+                continue
+            role_id = await self._role_id(row.role)
+            if role_id is None:
+                self.report.reject(line_no, row.email, f"Unknown role: {row.role}")
+                continue
+            lines[row.email] = line_no
+            rows.append((row, role_id))
+        if not rows:
+            return
+
+        hashes = iter(
+            await self._hash(
+                [row.password for row, _ in rows if row.password is not None]
+            )
+        )
+        values = [
+            {
+                "tenant_id": self.tenant_id,
+                "email": row.email,
+                "hashed_password": (
+                    row.password_hash if row.password_hash is not None else next(hashes)
+                ),
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "role_id": role_id,
+                "is_active": row.is_active,
+            }
+            for row, role_id in rows
+        ]
+
+        try:
+            imported = await self._insert(values)
+            await self.db.commit()
+        except SQLAlchemyError as exc:
+            # Пачка откатывается целиком, предыдущие уже закоммичены
+            await self.db.rollback()
+            logger.warning("Chunk of %s rows failed: %s", len(rows), exc)
+            for email, line_no in lines.items():
+                self.report.reject(
+                    line_no, email, f"Database error: {type(exc).__name__}"
+                )
+            return
+
+        for email, line_no in lines.items():
+            inserted = imported.get(email)
+            if inserted is None:
+                self.report.conflict(line_no, email)
+            elif inserted:
+                self.report.inserted += 1
+            else:
+                self.report.updated += 1
+        logger.info("Imported chunk of %s rows: %s", len(chunk), self.report.summary())
+
+    async def _insert(self, values: list[dict[str, Any]]) -> dict[str, bool]:
+        """
+        INSERT ... ON CONFLICT пачки.
+        :return: email -> True (вставлен) / False (обновлен); пропущенных нет
+        """
+        stmt = insert(User).values(values)
+        conflict_target = [User.tenant_id, User.email]
+        # xmax = 0 только у вставленной строки, у обновленной - id транзакции
+        inserted = literal_column("xmax = 0", Boolean)
+        if self.on_conflict == "skip":
+            upsert = stmt.on_conflict_do_nothing(index_elements=conflict_target)
+        else:
+            excluded = stmt.excluded
+            upsert = stmt.on_conflict_do_update(
+                index_elements=conflict_target,
+                set_={
+                    "hashed_password": excluded.hashed_password,
+                    "first_name": excluded.first_name,
+                    "last_name": excluded.last_name,
+                    "role_id": excluded.role_id,
+                    "is_active": excluded.is_active,
+                    # Профиль изменился - новый ETag
+                    "version": User.version + 1,
+                },
+            )
+        result = await self.db.execute(upsert.returning(User.email, inserted))
+        return dict(result.tuples())
+
+    async def _role_id(self, name: str | None) -> int | None:
+        if name is None:
+            return await reference_cache.default_role_id(self.db, self.tenant_id)
+        return await reference_cache.role_id(self.db, self.tenant_id, name)
+
+    async def _hash(self, passwords: list[str]) -> list[str]:
+        """Пароли пачки - поровну на процессы пула, порядок сохраняется."""
+        if not passwords:
+            return []
+        size = math.ceil(len(passwords) / self.workers)
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.pool,
+                    _hash_passwords,
+                    passwords[start : start + size],
+                    settings.PASSWORD_HASH_ROUNDS,
+                )
+                for start in range(0, len(passwords), size)
+            )
+        )
+        return [hashed for part in parts for hashed in part]
+
+
+async def import_users(
+    stream: IO[str],
+    fmt: ImportFormat,
+    tenant: str,
+    report: ImportReport,
+    on_conflict: ConflictMode = "skip",
+    chunk_size: int = 1_000,
+    workers: int | None = None,
+) -> None:
+    workers = workers or os.cpu_count() or 1
+    async with AsyncSessionLocal() as db:
+        tenant_id = await reference_cache.tenant_id(db, tenant)
+        if tenant_id is None:
+            raise UnknownTenantError(tenant)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            importer = UserImporter(
+                db, tenant_id, report, pool, workers, on_conflict, chunk_size
+            )
+            await importer.run(read_records(stream, fmt))
+
+
+def _detect_format(path: str) -> ImportFormat | None:
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", help="Файл CSV/NDJSON или - для stdin")
+    parser.add_argument("--tenant", default=settings.DEFAULT_TENANT)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default=None)
+    parser.add_argument("--on-conflict", choices=("skip", "update"), default="skip")
+    parser.add_argument(
+        "--errors", default=None, help="Отчет об ошибках (NDJSON), по умолчанию stderr"
+    )
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    fmt = args.format or _detect_format(args.input)
+    if fmt is None:
+        parser.error("--format is required for this input")
+    if not 1 <= args.chunk_size <= MAX_CHUNK_SIZE:
+        parser.error(f"--chunk-size must be between 1 and {MAX_CHUNK_SIZE}")
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    with contextlib.ExitStack() as files:
+        stream = (
+            sys.stdin
+            if args.input == "-"
+            else files.enter_context(open(args.input, newline="", encoding="utf-8"))
+        )
+        errors = (
+            sys.stderr
+            if args.errors is None
+            else files.enter_context(open(args.errors, "w", encoding="utf-8"))
+        )
+        report = ImportReport(errors)
+        try:
+            asyncio.run(
+                import_users(
+                    stream,
+                    fmt,
+                    args.tenant,
+                    report,
+                    args.on_conflict,
+                    args.chunk_size,
+                    args.workers,
+                )
+            )
+        except UnknownTenantError as exc:
+            parser.exit(2, f"Unknown tenant: {exc}\n")
+
+    elapsed = time.perf_counter() - started
+    print(f"{report.summary()} in {elapsed:.1f} s")
+    # Строки с ошибками данных - ненулевой код (конфликты при skip - нет)
+    if report.invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Микробенчмарк ABAC-условий: стоимость одного решения о доступе.
+
+Запуск: poetry run python -m benchmarks.abac_bench
+"""
+
+import timeit
+from types import SimpleNamespace
+from typing import Any
+
+from app.models.rbac import READ
+from app.services.abac_ops import ConditionCache, compile_conditions
+from app.services.permission_ops import check_mask
+
+ITERATIONS = 200_000
+
+CONDITIONS: list[dict[str, Any]] = [
+    {"op": "eq", "user": "department", "resource": "department"},
+    {"op": "lte", "resource": "amount", "value": 10_000},
+    {"op": "time_window", "start": "00:00", "end": "23:59:59"},
+]
+
+
+def _report(name: str, seconds: float, iterations: int) -> None:
+    print(f"{name:<32} {seconds / iterations * 1e9:>10.1f} ns/op")
+
+
+def main() -> None:
+    user: Any = SimpleNamespace(id=2, role_id=2, attributes={"department": "sales"})
+    mask = READ
+    resource = {"owner_id": 2, "department": "sales", "amount": 500}
+
+    compile_time = timeit.timeit(lambda: compile_conditions(CONDITIONS), number=10_000)
+    _report("compile (per rule version)", compile_time, 10_000)
+
+    condition = compile_conditions(CONDITIONS)
+    eval_time = timeit.timeit(lambda: condition(user, resource), number=ITERATIONS)
+    _report("compiled condition", eval_time, ITERATIONS)
+
+    cache = ConditionCache()
+
+    def decide() -> bool:
+        if not check_mask(mask, "read", user.id, 2):
+            return False
+        return cache.get(1, 1, CONDITIONS)(user, resource)
+
+    decide_time = timeit.timeit(decide, number=ITERATIONS)
+    _report("mask + cached condition", decide_time, ITERATIONS)
+
+
+if __name__ == "__main__":
+    main()
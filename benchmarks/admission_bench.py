@@ -0,0 +1,93 @@
+"""
+Перегрузка смешанным трафиком: поток дорогих login (bcrypt) и дешевых
+чтений по токену на узел с ограниченной емкостью. Сравнивается латентность
+чтений без admission control (все конкурируют на равных) и с ним.
+
+Запуск: poetry run python -m benchmarks.admission_bench
+"""
+
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+from app.core.metrics import metrics
+from app.services.admission_ops import AdmissionController, RouteClass
+
+DURATION_S = 2.0
+# Узел держит WORKERS запросов; login занимает слот на LOGIN_S, чтение - на READ_S
+WORKERS = 32
+LOGIN_S = 0.05
+READ_S = 0.002
+# Поступление в секунду: login-ов с запасом больше, чем узел может обработать
+LOGINS_PER_S = 2_000
+READS_PER_S = 2_000
+
+
+async def _run(
+    controller: AdmissionController | None,
+) -> tuple[list[float], Counter[str]]:
+    node = asyncio.Semaphore(WORKERS)
+    read_latency: list[float] = []
+    outcomes: Counter[str] = Counter()
+
+    async def request(name: str, work: float) -> None:
+        started = time.perf_counter()
+        if controller is not None and not await controller.acquire(name):
+            outcomes[f"{name} shed"] += 1
+            return
+        try:
+            async with node:
+                await asyncio.sleep(work)
+        finally:
+            if controller is not None:
+                controller.release(name)
+        outcomes[f"{name} ok"] += 1
+        if name == "reads":
+            read_latency.append(time.perf_counter() - started)
+
+    tasks = []
+    tick = 0.001
+    deadline = time.perf_counter() + DURATION_S
+    while time.perf_counter() < deadline:
+        for _ in range(int(LOGINS_PER_S * tick)):
+            tasks.append(asyncio.create_task(request("credentials", LOGIN_S)))
+        for _ in range(int(READS_PER_S * tick)):
+            tasks.append(asyncio.create_task(request("reads", READ_S)))
+        await asyncio.sleep(tick)
+    await asyncio.gather(*tasks)
+    return read_latency, outcomes
+
+
+def _report(title: str, latency: list[float], outcomes: Counter[str]) -> None:
+    latency.sort()
+    p99 = latency[int(len(latency) * 0.99)] if latency else 0.0
+    print(
+        f"{title:<10} reads p50 {statistics.median(latency) * 1e3:7.1f} ms"
+        f"  p99 {p99 * 1e3:7.1f} ms  {dict(sorted(outcomes.items()))}"
+    )
+
+
+async def main() -> None:
+    _report("no limits", *await _run(None))
+
+    controller = AdmissionController(
+        capacity=WORKERS,
+        classes=(
+            RouteClass("reads", 0, WORKERS, queue_size=1_000, queue_timeout=0.5),
+            RouteClass("credentials", 2, 8, queue_size=32, queue_timeout=0.1),
+        ),
+    )
+    latency, outcomes = await _run(controller)
+    _report("admission", latency, outcomes)
+    assert controller.inflight == 0
+    print(
+        "shed: queue full",
+        metrics.get("admission_credentials_shed_queue_full"),
+        " deadline",
+        metrics.get("admission_credentials_shed_deadline"),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
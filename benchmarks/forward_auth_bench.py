@@ -0,0 +1,93 @@
+"""
+Задержка forward-auth (GET /internal/authz/check) в процессе, без сети:
+прогретые кэши токенов и пользователей, решение по mmap-снимку.
+
+Запуск: poetry run python -m benchmarks.forward_auth_bench
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any
+
+ITERATIONS = 50_000
+
+# Снимок матрицы включается до импорта настроек приложения
+os.environ.setdefault("POLICY_SNAPSHOT_DIR", tempfile.mkdtemp(prefix="fwd-auth-"))
+
+from app.core.config import settings  # noqa: E402
+from app.middleware.forward_auth import (  # noqa: E402
+    FORWARD_AUTH_PATH,
+    ForwardAuthMiddleware,
+)
+from app.models.rbac import READ, Role  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.services.auth_ops import AuthService  # noqa: E402
+from app.services.degraded_ops import principal_cache  # noqa: E402
+from app.services.policy_cache import policy_cache  # noqa: E402
+from app.services.policy_snapshot import PolicySnapshotWriter  # noqa: E402
+
+
+async def _not_found(scope: Any, receive: Any, send: Any) -> None:
+    raise AssertionError("forward-auth request reached the application")
+
+
+async def _receive() -> dict[str, Any]:
+    return {"type": "http.request", "body": b""}
+
+
+def _scope(token: str, owner_id: int) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": FORWARD_AUTH_PATH,
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"x-resource", b"orders"),
+            (b"x-action", b"read"),
+            (b"x-owner-id", str(owner_id).encode()),
+        ],
+    }
+
+
+async def main() -> None:
+    assert settings.POLICY_SNAPSHOT_DIR is not None
+    PolicySnapshotWriter(settings.POLICY_SNAPSHOT_DIR).write(
+        {1: 1}, [(2, "orders", READ)]
+    )
+    # Узел знает версию 1 тенанта - снимок по ней актуален
+    policy_cache.notify(1, 1)
+
+    user = User(id=2, tenant_id=1, email="user@example.com", role_id=2, is_active=True)
+    user.role = Role(id=2, tenant_id=1, name="User")
+    principal_cache.put(user)
+    token = AuthService.create_access_token({"sub": "2", "role_id": 2, "tid": 1})
+
+    handler = ForwardAuthMiddleware(_not_found)
+    statuses: list[int] = []
+
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    for owner_id, expected in ((2, 200), (3, 403)):
+        scope = _scope(token, owner_id)
+        timings = []
+        for _ in range(ITERATIONS):
+            started = time.perf_counter_ns()
+            await handler(scope, _receive, send)
+            timings.append(time.perf_counter_ns() - started)
+        assert statuses[-1] == expected, statuses[-1]
+
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99)]
+        print(
+            f"{expected} p50 {statistics.median(timings) / 1e3:>7.1f} us"
+            f"  p99 {p99 / 1e3:>7.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Время холодного импорта app.main (важно для автоскейлера).
+
+Каждый замер - отдельный интерпретатор, .pyc уже скомпилированы.
+Выводит медиану и самые тяжелые модули по -X importtime.
+
+Запуск: poetry run python -m benchmarks.import_bench
+"""
+
+import statistics
+import subprocess
+import sys
+
+RUNS = 7
+TOP = 10
+
+_MEASURE = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _import_seconds() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _MEASURE], capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _heaviest_modules() -> list[tuple[int, str]]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time: self | cumulative | module"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        # Только модули верхнего уровня вложенности импорта
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(parts[1]), name.strip()))
+    return sorted(rows, reverse=True)[:TOP]
+
+
+def main() -> None:
+    samples = [_import_seconds() for _ in range(RUNS)]
+    print(
+        f"{'import app.main (median)':<32} {statistics.median(samples) * 1e3:>10.1f} ms"
+    )
+    for cumulative_us, name in _heaviest_modules():
+        print(f"  {name:<30} {cumulative_us / 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
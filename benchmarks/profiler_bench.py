@@ -0,0 +1,95 @@
+"""
+Накладные расходы ProfilingMiddleware на выключенном пути (нет X-Profile,
+PROFILER_SAMPLE_RATE=0) и стоимость одного профилированного запроса.
+
+Запуск: poetry run python -m benchmarks.profiler_bench
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any
+
+ITERATIONS = 200_000
+
+os.environ.setdefault("PROFILER_DIR", tempfile.mkdtemp(prefix="profiles-"))
+
+from app.middleware.profiling import ProfilingMiddleware  # noqa: E402
+from app.models.rbac import Role  # noqa: E402
+from app.models.users import User  # noqa: E402
+from app.services.profiler_ops import profile_store  # noqa: E402
+
+_HEADERS = [
+    (b"host", b"localhost"),
+    (b"user-agent", b"bench"),
+    (b"accept", b"application/json"),
+    (b"authorization", b"Bearer token"),
+    (b"x-request-id", b"0123456789abcdef"),
+]
+
+
+async def _app(scope: Any, receive: Any, send: Any) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _slow_app(scope: Any, receive: Any, send: Any) -> None:
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    await _app(scope, receive, send)
+
+
+class _PassThrough:
+    """Пустой ASGI-слой: базовая цена любого middleware."""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        await self.app(scope, receive, send)
+
+
+async def _receive() -> dict[str, Any]:
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message: Any) -> None:
+    return None
+
+
+async def _per_request_ns(app: Any, scope: dict[str, Any]) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(ITERATIONS):
+        await app(scope, _receive, _send)
+    return (time.perf_counter_ns() - started) / ITERATIONS
+
+
+async def main() -> None:
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": _HEADERS}
+
+    bare = await _per_request_ns(_app, scope)
+    layer = await _per_request_ns(_PassThrough(_app), scope)
+    wrapped = await _per_request_ns(ProfilingMiddleware(_app), scope)
+    print(f"bare app          {bare:>8.0f} ns/request")
+    print(f"empty ASGI layer  {layer:>8.0f} ns/request")
+    print(f"profiler disabled {wrapped:>8.0f} ns/request (+{wrapped - layer:.0f} ns)")
+
+    admin = User(id=1, tenant_id=1, email="admin@example.com", role_id=1)
+    admin.role = Role(id=1, tenant_id=1, name="Admin")
+    profiled = {
+        **scope,
+        "headers": [*_HEADERS, (b"x-profile", b"1")],
+        "state": {"user": admin},
+    }
+    await ProfilingMiddleware(_slow_app)(profiled, _receive, _send)
+    latest = profile_store.entries()[0]
+    print(
+        f"profiled 50 ms request: {latest['samples']} samples, "
+        f"{latest['duration_ms']} ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
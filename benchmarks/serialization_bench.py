@@ -0,0 +1,84 @@
+"""
+Микробенчмарк сериализации ответов: стандартный путь FastAPI
+(валидация по response_model + serialize + json.dumps) против заранее
+собранных сериализаторов из app/core/responses.py.
+
+Запуск: poetry run python -m benchmarks.serialization_bench
+"""
+
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+
+from app.core.responses import (
+    JsonSerializer,
+    rule_list_json,
+    token_response_json,
+    user_read_json,
+)
+from app.schemas.auth import TokenResponse
+from app.schemas.rbac import RuleRead
+from app.schemas.user import UserRead
+
+ITERATIONS = 20_000
+
+
+def _report(name: str, seconds: float, iterations: int) -> None:
+    print(f"{name:<32} {seconds / iterations * 1e6:>10.2f} us/response")
+
+
+def _default_path(tp: Any) -> Callable[[Any], JSONResponse]:
+    """То же, что делает fastapi.routing.serialize_response для response_model."""
+    field = create_model_field(name="Response", type_=tp, mode="serialization")
+
+    def respond(content: Any) -> JSONResponse:
+        value, errors = field.validate(content, {}, loc=("response",))
+        assert not errors
+        return JSONResponse(field.serialize(value, by_alias=True))
+
+    return respond
+
+
+def _compare(name: str, tp: Any, serializer: JsonSerializer[Any], value: Any) -> None:
+    default = _default_path(tp)
+    assert default(value).body == serializer.response(value).body
+
+    default_time = timeit.timeit(lambda: default(value), number=ITERATIONS)
+    fast_time = timeit.timeit(lambda: serializer.response(value), number=ITERATIONS)
+    _report(f"{name} default", default_time, ITERATIONS)
+    _report(f"{name} fast", fast_time, ITERATIONS)
+
+
+def main() -> None:
+    user = UserRead(
+        id=1,
+        email="admin@example.com",
+        first_name="Super",
+        last_name="Admin",
+        is_active=True,
+        role_id=1,
+        tenant_id=1,
+    )
+    rules = [
+        RuleRead(
+            role_name="Admin",
+            element_key=f"element_{i}",
+            element_name=f"Элемент {i}",
+            read_permission=True,
+            read_all_permission=True,
+            conditions=[{"op": "lte", "resource": "amount", "value": 10_000}],
+        )
+        for i in range(50)
+    ]
+    token = TokenResponse(access_token="a" * 180, refresh_token="r" * 180)
+
+    _compare("UserRead", UserRead, user_read_json, user)
+    _compare("list[RuleRead] x50", list[RuleRead], rule_list_json, rules)
+    _compare("TokenResponse", TokenResponse, token_response_json, token)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Холодный кэш под конкурентной нагрузкой: время N одновременных промахов по
+одному пользователю и одному правилу роли и число запросов в БД.
+
+БД заменена сессией (read_session), которая считает execute и отвечает
+с задержкой DB_LATENCY_S. Корректность single-flight проверяют тесты
+(tests/test_single_flight.py), здесь - только замер.
+
+Запуск: poetry run python -m benchmarks.single_flight_bench
+"""
+
+import asyncio
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from app.middleware.authentication import AuthMiddleware
+from app.models.rbac import READ, Role
+from app.models.users import User
+from app.services import permission_ops
+from app.services.permission_ops import PermissionService
+
+CONCURRENCY = 500
+DB_LATENCY_S = 0.02
+
+
+class _Result:
+    def __init__(self, row: tuple[Any, ...]) -> None:
+        self.row = row
+
+    def one_or_none(self) -> tuple[Any, ...]:
+        return self.row
+
+    def scalar_one_or_none(self) -> Any:
+        return self.row[0]
+
+
+class _CountingSession:
+    """Сессия, которая только считает запросы."""
+
+    def __init__(self, row: tuple[Any, ...]) -> None:
+        self.row = row
+        self.queries = 0
+
+    async def __aenter__(self) -> "_CountingSession":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+    async def execute(self, stmt: Any) -> _Result:
+        self.queries += 1
+        await asyncio.sleep(DB_LATENCY_S)
+        return _Result(self.row)
+
+
+async def _burst(call: Callable[[], Coroutine[Any, Any, Any]]) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - started
+
+
+async def _users() -> None:
+    queries = 0
+    user = User(id=2, tenant_id=1, email="user@example.com", role_id=2, is_active=True)
+    user.role = Role(id=2, tenant_id=1, name="User")
+
+    async def load_user(user_id: int, primary: bool = False) -> User | None:
+        nonlocal queries
+        queries += 1
+        await asyncio.sleep(DB_LATENCY_S)
+        return user
+
+    AuthMiddleware.load_user = staticmethod(load_user)  # type: ignore[method-assign]
+    elapsed = await _burst(lambda: AuthMiddleware.fetch_user(2))
+    print(f"users  {CONCURRENCY} misses -> {queries} query  {elapsed * 1e3:6.1f} ms")
+
+
+async def _rules() -> None:
+    session = _CountingSession((11, 1, READ, None))
+    permission_ops.read_session = lambda: session  # type: ignore[assignment,return-value]
+
+    elapsed = await _burst(lambda: PermissionService.get_rule(1, 2, "orders"))
+    print(
+        f"rules  {CONCURRENCY} misses -> {session.queries} query"
+        f"  {elapsed * 1e3:6.1f} ms"
+    )
+
+
+async def main() -> None:
+    await _users()
+    await _rules()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
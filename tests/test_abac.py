@@ -0,0 +1,40 @@
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from app.services.abac_ops import ConditionError, compile_conditions
+
+USER: Any = SimpleNamespace(id=1, role_id=2, attributes={})
+
+
+@pytest.mark.parametrize("region", [["eu"], {"eu": 1}])
+def test_in_denies_unhashable_attribute(region: object) -> None:
+    check = compile_conditions([{"op": "in", "resource": "region", "value": ["eu"]}])
+    assert check(USER, {"region": "eu"})
+    assert not check(USER, {"region": region})
+
+
+@pytest.mark.parametrize("value", ["eu", {"eu": 1}, [["eu"]]])
+def test_in_requires_list_of_scalars(value: object) -> None:
+    with pytest.raises(ConditionError):
+        compile_conditions([{"op": "in", "resource": "region", "value": value}])
+
+
+@pytest.mark.parametrize(
+    ("day", "allowed"),
+    # 2026-10-16 - пятница
+    [(16, True), (18, True), (19, True), (20, True), (21, False)],
+)
+def test_weekdays_wrap_around_sunday(day: int, allowed: bool) -> None:
+    check = compile_conditions(
+        [{"op": "time_window", "weekdays": [4, 1]}],
+        clock=lambda: datetime(2026, 10, day, 12, tzinfo=UTC),
+    )
+    assert check(USER, {}) is allowed
+
+
+def test_weekdays_out_of_range() -> None:
+    with pytest.raises(ConditionError):
+        compile_conditions([{"op": "time_window", "weekdays": [0, 7]}])
@@ -0,0 +1,17 @@
+import pytest
+
+from app.api.v1.admin import _prefix_upper_bound
+
+
+@pytest.mark.parametrize(
+    ("prefix", "bound"),
+    [
+        ("ab", "ac"),
+        ("a\U0010ffff", "b"),
+        ("a\U0010ffff\U0010ffff", "b"),
+        ("a\ud7ff", "a\ue000"),
+        ("\U0010ffff", None),
+    ],
+)
+def test_prefix_upper_bound(prefix: str, bound: str | None) -> None:
+    assert _prefix_upper_bound(prefix) == bound
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+from app.schemas.auth import IntrospectionResponse
+from app.services.introspection_ops import (
+    INACTIVE,
+    IntrospectionCache,
+    IntrospectionService,
+)
+from app.services.policy_version_ops import InProcessNotifier, PostgresNotifier
+
+ACTIVE = IntrospectionResponse(active=True, sub="2", tid=1)
+
+
+def test_revocation_survives_lru_eviction() -> None:
+    cache = IntrospectionCache(max_size=2, ttl=5.0)
+    cache.put(b"revoked", ACTIVE, time.time() + 5)
+    cache.revoke(b"revoked", time.time() + 60)
+    for digest in (b"a", b"b", b"c"):
+        cache.put(digest, ACTIVE, time.time() + 5)
+    assert cache.get(b"revoked") is INACTIVE
+
+
+def test_expired_revocation_is_forgotten() -> None:
+    cache = IntrospectionCache(max_size=2, ttl=5.0)
+    cache.revoke(b"old", time.time() - 1)
+    assert cache.get(b"old") is None
+
+
+@pytest.mark.asyncio
+async def test_revocation_reaches_other_workers() -> None:
+    notifier = InProcessNotifier()
+    workers = [IntrospectionCache(max_size=10, ttl=5.0) for _ in range(2)]
+    for cache in workers:
+        cache.put(b"token", ACTIVE, time.time() + 5)
+        notifier.subscribe_revocations(cache.revoke)
+
+    await notifier.publish_revocation(b"token", time.time() + 60)
+    assert all(cache.get(b"token") is INACTIVE for cache in workers)
+
+
+def test_postgres_revocation_payload() -> None:
+    notifier = PostgresNotifier("postgresql://unused")
+    received: list[tuple[bytes, float]] = []
+    notifier.subscribe_revocations(lambda digest, exp: received.append((digest, exp)))
+    notifier.subscribe(lambda tenant_id, version: received.append((b"", version)))
+
+    notifier._on_notify(None, 0, notifier.channel, "revoke:0aff:1700000000")
+    notifier._on_notify(None, 0, notifier.channel, "revoke:zz:1")
+    notifier._on_notify(None, 0, notifier.channel, "1:7")
+    assert received == [(b"\x0a\xff", 1700000000.0), (b"", 7)]
+
+
+@pytest.mark.asyncio
+async def test_token_without_exp_is_inactive() -> None:
+    token = jwt.encode(
+        {"sub": "2", "tid": 1}, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
+    assert await IntrospectionService.introspect(token) is INACTIVE
@@ -0,0 +1,127 @@
+"""
+Роуты заказов поверх InMemoryOrderRepository (dependency_overrides):
+пользователь и правила подменены, БД не нужна.
+"""
+
+from collections.abc import AsyncIterator, Iterator
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.api.deps import get_order_repository
+from app.main import app
+from app.middleware.authentication import AuthMiddleware
+from app.models.rbac import (
+    CREATE,
+    DELETE,
+    DELETE_ALL,
+    READ,
+    READ_ALL,
+    Role,
+)
+from app.models.users import User
+from app.services.auth_ops import AuthService
+from app.services.order_ops import InMemoryOrderRepository
+from app.services.permission_ops import PermissionService
+from app.services.policy_cache import RuleEntry
+
+USERS = {
+    1: User(id=1, tenant_id=1, email="admin@example.com", role_id=1, is_active=True),
+    2: User(id=2, tenant_id=1, email="user@example.com", role_id=2, is_active=True),
+    3: User(id=3, tenant_id=1, email="other@example.com", role_id=2, is_active=True),
+}
+USERS[1].role = Role(id=1, tenant_id=1, name="Admin")
+USERS[2].role = USERS[3].role = Role(id=2, tenant_id=1, name="User")
+
+MASKS = {1: CREATE | READ | READ_ALL | DELETE | DELETE_ALL, 2: CREATE | READ}
+
+
+def auth(user_id: int) -> dict[str, str]:
+    token = AuthService.create_access_token({"sub": str(user_id), "tid": 1})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def orders(monkeypatch: pytest.MonkeyPatch) -> Iterator[InMemoryOrderRepository]:
+    async def fetch_user(user_id: int) -> User | None:
+        return USERS.get(user_id)
+
+    async def get_rule(tenant_id: int, role_id: int, key: str) -> RuleEntry | None:
+        mask = MASKS.get(role_id)
+        return RuleEntry(role_id, 1, mask, None) if mask else None
+
+    async def get_mask(tenant_id: int, role_id: int, key: str) -> int:
+        return MASKS.get(role_id, 0)
+
+    monkeypatch.setattr(AuthMiddleware, "fetch_user", staticmethod(fetch_user))
+    monkeypatch.setattr(PermissionService, "get_rule", staticmethod(get_rule))
+    monkeypatch.setattr(PermissionService, "get_mask", staticmethod(get_mask))
+
+    repository = InMemoryOrderRepository()
+    app.dependency_overrides[get_order_repository] = lambda: repository
+    yield repository
+    app.dependency_overrides.pop(get_order_repository)
+
+
+@pytest_asyncio.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.asyncio
+async def test_user_sees_only_own_orders(
+    orders: InMemoryOrderRepository, client: httpx.AsyncClient
+) -> None:
+    for user_id in (2, 3, 2):
+        r = await client.post("/api/v1/mock-orders/?title=t", headers=auth(user_id))
+        assert r.status_code == 201
+
+    r = await client.get("/api/v1/mock-orders/", headers=auth(2))
+    assert [item["id"] for item in r.json()["items"]] == [1, 3]
+
+    r = await client.get("/api/v1/mock-orders/2", headers=auth(2))
+    assert r.status_code == 403
+
+    r = await client.get("/api/v1/mock-orders/", headers=auth(1))
+    assert [item["id"] for item in r.json()["items"]] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_skip_deleted_orders(
+    orders: InMemoryOrderRepository, client: httpx.AsyncClient
+) -> None:
+    for _ in range(5):
+        await client.post("/api/v1/mock-orders/?title=t", headers=auth(2))
+
+    r = await client.delete("/api/v1/mock-orders/3", headers=auth(2))
+    assert r.status_code == 403
+    r = await client.delete("/api/v1/mock-orders/3", headers=auth(1))
+    assert r.status_code == 204
+
+    r = await client.get("/api/v1/mock-orders/?limit=2", headers=auth(1))
+    page = r.json()
+    assert [item["id"] for item in page["items"]] == [1, 2]
+    r = await client.get(
+        f"/api/v1/mock-orders/?limit=2&after_id={page['next_after_id']}",
+        headers=auth(1),
+    )
+    assert [item["id"] for item in r.json()["items"]] == [4, 5]
+
+    # id удаленного заказа не выдается повторно
+    r = await client.post("/api/v1/mock-orders/?title=t", headers=auth(2))
+    assert r.json()["id"] == 6
+    assert await orders.get(3, tenant_id=1) is None
+
+
+@pytest.mark.asyncio
+async def test_orders_of_other_tenant_are_invisible(
+    orders: InMemoryOrderRepository,
+) -> None:
+    order = await orders.create("t", owner_id=9, tenant_id=2)
+    assert await orders.get(order.id, tenant_id=1) is None
+    assert await orders.list(1, None, None, 10) == []
+    assert await orders.delete(order.id)
+    assert not await orders.delete(order.id)
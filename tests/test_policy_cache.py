@@ -0,0 +1,93 @@
+"""
+Догрузка партиции кэша правил: удаление строки и смена ключа не видны по
+version > загруженной, партиция перезагружается целиком.
+"""
+
+from typing import Any
+
+import pytest
+
+from app.services.policy_cache import PolicyCache, RuleEntry
+
+# (role_id, element_key, rule_id, version, mask, conditions)
+Row = tuple[int, str, int, int, int, None]
+
+
+class _Result:
+    def __init__(self, rows: list[Any]) -> None:
+        self.rows = rows
+
+    def all(self) -> list[Any]:
+        return self.rows
+
+    def scalar_one_or_none(self) -> Any:
+        return self.rows[0] if self.rows else None
+
+
+class _Database:
+    """Версия политики и строки матрицы одного тенанта."""
+
+    def __init__(self, version: int, rows: list[Row]) -> None:
+        self.version = version
+        self.rows = rows
+        self.full_loads = 0
+
+    async def execute(self, stmt: Any) -> _Result:
+        if "policy_version" in str(stmt):
+            return _Result([self.version])
+        params = stmt.compile().params
+        loaded = params.get("version_1")
+        if loaded is None:
+            self.full_loads += 1
+            return _Result(self.rows)
+        return _Result([row for row in self.rows if row[3] > loaded])
+
+    async def scalar(self, stmt: Any) -> int:
+        return len(self.rows)
+
+
+@pytest.fixture
+def cache() -> PolicyCache:
+    cache = PolicyCache(max_tenants=10, idle_seconds=60)
+    cache.request(1)
+    cache.reconcile({1: 1})
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_changed_rows_are_loaded_incrementally(cache: PolicyCache) -> None:
+    db = _Database(1, [(1, "orders", 1, 1, 2, None), (2, "orders", 2, 1, 2, None)])
+    await cache.refresh(db, 1)  # type: ignore[arg-type]
+
+    db.version = 2
+    db.rows[1] = (2, "orders", 2, 2, 0, None)
+    assert await cache.refresh(db, 1) == 2  # type: ignore[arg-type]
+    assert cache.get(1, 2, "orders") == RuleEntry(2, 2, 0, None)
+    assert db.full_loads == 1
+
+
+@pytest.mark.asyncio
+async def test_deleted_row_forces_full_reload(cache: PolicyCache) -> None:
+    db = _Database(1, [(1, "orders", 1, 1, 2, None), (2, "orders", 2, 1, 2, None)])
+    await cache.refresh(db, 1)  # type: ignore[arg-type]
+
+    # Правило роли 2 удалено: версия выросла, измененных строк нет
+    db.version = 2
+    del db.rows[1]
+    await cache.refresh(db, 1)  # type: ignore[arg-type]
+    assert cache.get(1, 2, "orders") is None
+    assert cache.get(1, 1, "orders") is not None
+    assert db.full_loads == 2
+
+
+@pytest.mark.asyncio
+async def test_renamed_key_forces_full_reload(cache: PolicyCache) -> None:
+    db = _Database(1, [(1, "orders", 1, 1, 2, None)])
+    await cache.refresh(db, 1)  # type: ignore[arg-type]
+
+    # Элемент переименован: строка сменила ключ и получила новую версию
+    db.version = 2
+    db.rows[0] = (1, "purchases", 1, 2, 2, None)
+    await cache.refresh(db, 1)  # type: ignore[arg-type]
+    assert cache.get(1, 1, "orders") is None
+    assert cache.get(1, 1, "purchases") is not None
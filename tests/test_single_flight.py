@@ -0,0 +1,157 @@
+"""
+Холодный кэш под конкурентной нагрузкой: N одновременных промахов по одному
+ключу дают ровно один запрос в БД. БД заменена сессией, которая считает
+execute, - проверяется число запросов, а не драйвер.
+"""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.core.config import settings
+from app.db.replicas import replica_router
+from app.middleware.authentication import AuthMiddleware
+from app.models.rbac import READ, Role
+from app.models.users import User
+from app.services import permission_ops
+from app.services.permission_ops import PermissionService
+from app.services.single_flight import SingleFlight
+
+CONCURRENCY = 500
+DB_LATENCY_S = 0.02
+
+
+class _Result:
+    def __init__(self, row: tuple[Any, ...]) -> None:
+        self.row = row
+
+    def one_or_none(self) -> tuple[Any, ...]:
+        return self.row
+
+    def scalar_one_or_none(self) -> Any:
+        return self.row[0]
+
+
+class _CountingSession:
+    """Сессия, которая только считает запросы."""
+
+    def __init__(self, row: tuple[Any, ...]) -> None:
+        self.row = row
+        self.queries = 0
+
+    async def __aenter__(self) -> "_CountingSession":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+    async def execute(self, stmt: Any) -> _Result:
+        self.queries += 1
+        await asyncio.sleep(DB_LATENCY_S)
+        return _Result(self.row)
+
+
+@pytest.fixture
+def session(monkeypatch: pytest.MonkeyPatch) -> _CountingSession:
+    counting = _CountingSession((11, 1, READ, None))
+    monkeypatch.setattr(permission_ops, "read_session", lambda: counting)
+    return counting
+
+
+@pytest.mark.asyncio
+async def test_user_misses_share_one_query(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries = 0
+    user = User(id=2, tenant_id=1, email="user@example.com", role_id=2, is_active=True)
+    user.role = Role(id=2, tenant_id=1, name="User")
+
+    async def load_user(user_id: int, primary: bool = False) -> User | None:
+        nonlocal queries
+        queries += 1
+        await asyncio.sleep(DB_LATENCY_S)
+        return user
+
+    monkeypatch.setattr(AuthMiddleware, "load_user", staticmethod(load_user))
+    results = await asyncio.gather(
+        *(AuthMiddleware.fetch_user(2) for _ in range(CONCURRENCY))
+    )
+    assert all(result is user for result in results)
+    assert queries == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_outlast_primary_recheck(monkeypatch: pytest.MonkeyPatch) -> None:
+    user = User(id=3, tenant_id=1, email="new@example.com", role_id=2, is_active=True)
+    # Каждый запрос укладывается в бюджет, оба вместе - нет
+    latency = settings.DB_LATENCY_BUDGET_MS / 1000 * 0.8
+
+    async def load_user(user_id: int, primary: bool = False) -> User | None:
+        await asyncio.sleep(latency)
+        # Реплика еще не видит нового пользователя
+        return user if primary else None
+
+    monkeypatch.setattr(AuthMiddleware, "load_user", staticmethod(load_user))
+    monkeypatch.setattr(replica_router, "replicas", [object()])
+    results = await asyncio.gather(*(AuthMiddleware.fetch_user(3) for _ in range(10)))
+    assert all(result is user for result in results)
+
+
+@pytest.mark.asyncio
+async def test_rule_misses_share_one_query(session: _CountingSession) -> None:
+    results = await asyncio.gather(
+        *(PermissionService.get_rule(1, 2, "orders") for _ in range(CONCURRENCY))
+    )
+    assert all(result == results[0] for result in results)
+    assert session.queries == 1
+
+    # Промах в новом "окне" - новый запрос: результат не кэшируется
+    await PermissionService.get_rule(1, 2, "orders")
+    assert session.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_coalesced(session: _CountingSession) -> None:
+    await asyncio.gather(
+        *(PermissionService.get_mask(1, role_id, "orders") for role_id in range(10))
+    )
+    assert session.queries == 10
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared_by_all_waiters() -> None:
+    flight: SingleFlight[int] = SingleFlight("test", timeout=1.0)
+    loads = 0
+
+    async def failing() -> int:
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(DB_LATENCY_S)
+        raise RuntimeError("db error")
+
+    results = await asyncio.gather(
+        *(flight.do("k", failing) for _ in range(CONCURRENCY)),
+        return_exceptions=True,
+    )
+    assert loads == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_is_replaced_once() -> None:
+    flight: SingleFlight[int] = SingleFlight("test", timeout=1.0)
+    loads = 0
+
+    async def slow() -> int:
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(DB_LATENCY_S)
+        return 42
+
+    leader = asyncio.create_task(flight.do("k", slow))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.do("k", slow)) for _ in range(10)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    # Ожидающие повторяют загрузку, а не получают CancelledError
+    assert await asyncio.gather(*followers) == [42] * 10
+    assert loads == 2
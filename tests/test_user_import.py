@@ -0,0 +1,83 @@
+"""
+Импорт пользователей: ошибки строки и пачки попадают в отчет, импорт
+продолжается. БД подменена: проверяется обработка ошибок, а не SQL.
+"""
+
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.services.reference_cache import reference_cache
+from app.services.user_import_ops import ImportReport, UserImporter, read_records
+
+
+class _Session:
+    def __init__(self) -> None:
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+@pytest.mark.asyncio
+async def test_bad_rows_and_failed_chunk_do_not_stop_import(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def default_role_id(db: Any, tenant_id: int) -> int:
+        return 2
+
+    monkeypatch.setattr(reference_cache, "default_role_id", default_role_id)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ROUNDS", 4)
+
+    lines = [
+        {"email": "a@example.com", "password": "secret"},
+        # Длиннее лимита bcrypt в 72 байта (кириллица - по 2 байта)
+        {"email": "long@example.com", "password": "ж" * 37},
+        {"email": "b@example.com", "password": "secret"},
+        {"email": "c@example.com", "password": "secret"},
+    ]
+    stream = io.StringIO("".join(json.dumps(line) + "\n" for line in lines))
+    errors = io.StringIO()
+    report = ImportReport(errors)
+    session = _Session()
+
+    chunks: list[list[str]] = []
+
+    async def insert(values: list[dict[str, Any]]) -> dict[str, bool]:
+        chunks.append([value["email"] for value in values])
+        if len(chunks) == 2:
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+        return {value["email"]: True for value in values}
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        importer = UserImporter(
+            session,  # type: ignore[arg-type]
+            1,
+            report,
+            pool,
+            workers=1,
+            chunk_size=1,
+        )
+        monkeypatch.setattr(importer, "_insert", insert)
+        await importer.run(read_records(stream, "ndjson"))
+
+    assert chunks == [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+    assert (report.processed, report.inserted, report.invalid) == (4, 2, 2)
+    assert (session.commits, session.rollbacks) == (2, 1)
+
+    rejected = [json.loads(line) for line in errors.getvalue().splitlines()]
+    assert [(r["line"], r["email"]) for r in rejected] == [
+        (2, "long@example.com"),
+        (3, "b@example.com"),
+    ]
+    assert "72 bytes" in rejected[0]["error"]
+    assert rejected[1]["error"] == "Database error: OperationalError"